@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the memory used by terms kept as the dicts returned by the service
+with terms kept as compact records.
+
+Run with::
+
+    python benchmarks/bench_memory.py --size 20000
+
+For every representation, this reports the memory allocated for all terms
+of a synthetic thesaurus and the average per term. Requires Python 3.4 or
+later for :mod:`tracemalloc`.
+'''
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from skosprovider_oe.record import TermRecord
+from skosprovider_oe.testing import generate_thesaurus
+
+
+def measure(build):
+    '''
+    Measure the memory allocated by a callable and still in use by the
+    object it returns.
+
+    :returns: A tuple of the object and the number of bytes.
+    '''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def run(args):
+    terms = generate_thesaurus(
+        size=args.size,
+        depth=args.depth,
+        branching=args.branching,
+        seed=args.seed
+    )
+    # Decode every term separately, like terms fetched from the service.
+    data = [json.dumps(t) for t in terms.values()]
+    representations = [
+        ('dict', lambda: [json.loads(d) for d in data]),
+        ('TermRecord', lambda: [TermRecord(json.loads(d)) for d in data]),
+    ]
+    print('Thesaurus with %d terms.' % len(data))
+    print('%-14s %12s %10s %8s' % ('representation', 'bytes', 'per term',
+                                   'ratio'))
+    baseline = None
+    for name, build in representations:
+        result, size = measure(build)
+        if baseline is None:
+            baseline = size
+        print('%-14s %12d %10.1f %8.2f' % (
+            name, size, size / float(len(data)), size / float(baseline)
+        ))
+        del result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=10000,
+                        help='Number of terms in the thesaurus.')
+    parser.add_argument('--depth', type=int, default=6,
+                        help='Depth of the hierarchy.')
+    parser.add_argument('--branching', type=int, default=8,
+                        help='Maximum number of narrower terms per term.')
+    parser.add_argument('--seed', type=int, default=0)
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the OnroerendErfgoedProvider against a local stand-in for the
+thesaurus services.
+
+Run with::
+
+    python benchmarks/bench_providers.py --size 500 --latency 0.005
+
+For every provider configuration and every operation, this reports the
+number of calls, the number of requests the service received, latency
+percentiles and throughput.
+'''
+
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from skosprovider_oe.providers import OnroerendErfgoedProvider
+from skosprovider_oe.testing import FakeThesaurusServer, generate_thesaurus
+
+
+CONFIGURATIONS = [
+    ('default', {}),
+    ('cache', {'cache': True}),
+    ('http_cache', {'http_cache': True}),
+    ('snapshot', {'snapshot': True}),
+    ('local_search', {'local_search': True}),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0
+    k = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def get_operations(terms, calls, seed):
+    rnd = random.Random(seed)
+    ids = [t['id'] for t in terms.values()]
+    parents = [t['id'] for t in terms.values() if 'narrower_terms' in t]
+    collections = [
+        t['id'] for t in terms.values()
+        if t['term_type'] in ('HR', 'NL') and 'narrower_terms' in t
+    ]
+    labels = [t['term'].split()[0][:4] for t in terms.values()]
+    return [
+        ('get_by_id', [
+            (lambda p, id=rnd.choice(ids): p.get_by_id(id))
+            for i in range(calls)
+        ]),
+        ('find', [
+            (lambda p, l=rnd.choice(labels): p.find({'label': l}))
+            for i in range(calls)
+        ]),
+        ('find_in_collection', [
+            (lambda p, c=rnd.choice(collections): p.find({
+                'type': 'concept',
+                'collection': {'id': c, 'depth': 'all'}
+            })) for i in range(calls)
+        ]),
+        ('expand', [
+            (lambda p, id=rnd.choice(parents): p.expand(id))
+            for i in range(calls)
+        ]),
+        ('get_top_concepts', [
+            (lambda p: p.get_top_concepts()) for i in range(max(1, calls // 10))
+        ]),
+        ('get_children_display', [
+            (lambda p, id=rnd.choice(parents): p.get_children_display(id))
+            for i in range(calls)
+        ]),
+    ]
+
+
+def run(args):
+    terms = generate_thesaurus(
+        size=args.size,
+        depth=args.depth,
+        branching=args.branching,
+        seed=args.seed
+    )
+    server = FakeThesaurusServer(
+        {'bench': terms},
+        latency=args.latency,
+        max_age=args.max_age
+    )
+    print(
+        'Thesaurus with %d terms, latency %.1f ms.' %
+        (len(terms), args.latency * 1000)
+    )
+    print(
+        '%-14s %-22s %6s %8s %9s %9s %9s %10s' % (
+            'config', 'operation', 'calls', 'requests',
+            'p50 ms', 'p90 ms', 'p99 ms', 'calls/s'
+        )
+    )
+    with server:
+        for name, kwargs in CONFIGURATIONS:
+            if args.config and name not in args.config:
+                continue
+            provider = OnroerendErfgoedProvider(
+                {'id': 'BENCH'},
+                base_url=server.base_url,
+                thesaurus='bench',
+                **kwargs
+            )
+            if provider.snapshot:
+                provider.refresh_snapshot()
+            for operation, calls in get_operations(terms, args.calls, args.seed):
+                server.reset()
+                timings = []
+                start = time.time()
+                for call in calls:
+                    t = time.time()
+                    call(provider)
+                    timings.append((time.time() - t) * 1000)
+                elapsed = time.time() - start
+                print(
+                    '%-14s %-22s %6d %8d %9.2f %9.2f %9.2f %10.1f' % (
+                        name, operation, len(calls), len(server.requests),
+                        percentile(timings, 50), percentile(timings, 90),
+                        percentile(timings, 99),
+                        len(calls) / elapsed if elapsed else 0
+                    )
+                )
+            provider.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=300,
+                        help='Number of terms in the thesaurus.')
+    parser.add_argument('--depth', type=int, default=4,
+                        help='Depth of the hierarchy.')
+    parser.add_argument('--branching', type=int, default=6,
+                        help='Maximum number of narrower terms per term.')
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='Latency of the service in seconds.')
+    parser.add_argument('--max-age', type=int, default=None,
+                        help='max-age the service sends for its responses.')
+    parser.add_argument('--calls', type=int, default=50,
+                        help='Number of calls per operation.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', action='append',
+                        help='Only run this configuration, can be repeated.')
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
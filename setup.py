@@ -15,7 +15,8 @@ packages = [
 
 requires = [
     'skosprovider>=0.6.0',
-    'requests>=1.0.0'
+    'requests>=2.10',
+    'futures; python_version < "3.2"'
 ]
 
 setup(
@@ -32,6 +33,12 @@ setup(
     package_dir={'skosprovider_oe': 'skosprovider_oe'},
     include_package_data=True,
     install_requires = requires,
+    entry_points={
+        'console_scripts': [
+            'skosprovider_oe_export = skosprovider_oe.export:main',
+            'skosprovider_oe_warmup = skosprovider_oe.warmup:main'
+        ]
+    },
     license='MIT',
     zip_safe=False,
     classifiers=[
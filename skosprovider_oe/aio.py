@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+'''
+An :mod:`asyncio` variant of the
+:class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+
+This module requires Python 3.5 or higher.
+'''
+
+import asyncio
+import functools
+import weakref
+
+from skosprovider_oe.display import build_node
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider,
+    _request_key
+)
+
+
+class AsyncSingleFlight(object):
+    '''
+    Makes sure that concurrent calls for the same key, within the same event
+    loop, result in only a single call of the underlying coroutine function.
+
+    This is the :mod:`asyncio` counterpart of
+    :class:`~skosprovider_oe.cache.SingleFlight`.
+    '''
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, func, *args):
+        '''
+        Await `func` called with `args`, unless a call for the same key is
+        already in flight.
+
+        :param key: A hashable identifying the call.
+        :returns: Whatever `func` returns.
+        '''
+        calls = self._calls.setdefault(asyncio.get_event_loop(), {})
+        future = calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+        self.calls += 1
+        future = calls[key] = asyncio.ensure_future(func(*args))
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if calls.get(key) is future:
+                del calls[key]
+
+    @property
+    def stats(self):
+        '''
+        A dict with the number of `calls` performed and the number of
+        callers that `shared` the result of a call in flight.
+        '''
+        return {
+            'calls': self.calls,
+            'shared': self.shared
+        }
+
+
+class AsyncOnroerendErfgoedProvider(OnroerendErfgoedProvider):
+    '''A provider that can work with the REST-services of
+    https://inventaris.onroerenderfgoed.be/thesaurus from within an
+    :mod:`asyncio` event loop.
+
+    All public methods of the
+    :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider` are
+    coroutines here and return exactly the same results. Requests that do
+    not depend on each other, such as looking up all narrower terms of a
+    concept, are performed concurrently.
+
+    The requests themselves are performed by the same
+    :class:`requests.Session` in an executor, so caching and snapshots work
+    the same as for the synchronous provider.
+    '''
+
+    def __init__(self, metadata, **kwargs):
+        '''
+        Accepts the same parameters as
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider` and:
+
+        :param int max_concurrency: Maximum number of requests performed at
+            the same time. Defaults to 10.
+        :param executor: A :class:`concurrent.futures.Executor` to perform
+            the requests in. Defaults to the default executor of the event
+            loop.
+        '''
+        self.max_concurrency = kwargs.get('max_concurrency', 10)
+        self.executor = kwargs.get('executor', None)
+        self._semaphores = weakref.WeakKeyDictionary()
+        super(AsyncOnroerendErfgoedProvider, self).__init__(metadata, **kwargs)
+        self.async_single_flight = None
+        if self.single_flight is not None:
+            self.async_single_flight = AsyncSingleFlight()
+
+    def _get_semaphore(self, loop):
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    async def _run(self, func, *args):
+        '''
+        Run a blocking function in the executor, respecting the maximum
+        concurrency.
+        '''
+        loop = asyncio.get_event_loop()
+        async with self._get_semaphore(loop):
+            return await loop.run_in_executor(
+                self.executor, functools.partial(func, *args)
+            )
+
+    async def _run_once(self, key, func, *args):
+        '''
+        Like :meth:`_run`, but let concurrent calls with the same key share
+        a single call, unless request coalescing has been disabled.
+        '''
+        if self.async_single_flight is None:
+            return await self._run(func, *args)
+        return await self.async_single_flight.do(key, self._run, func, *args)
+
+    async def _aget_term_by_id(self, id):
+        return await self._run_once(
+            ('term', str(id)), self._get_term_by_id, id
+        )
+
+    async def _aget_list(self, types, term=None):
+        return await self._run_once(
+            ('list', _request_key('lijst', {'type[]': types, 'term': term})),
+            self._get_list, types, term
+        )
+
+    async def _aget_terms_by_ids(self, ids):
+        terms = await asyncio.gather(
+            *[self._aget_term_by_id(id) for id in ids]
+        )
+        return dict((str(id), term) for id, term in zip(ids, terms))
+
+    async def _aget_broader_terms(self, result):
+        if 'broader_term' not in result:
+            return None, None
+        term = await self._aget_term_by_id(result['broader_term'])
+        # Should not be possible, but you never know
+        if term['term_type'] == 'ND': # pragma: no cover
+            term = await self._aget_term_by_id(term['use'])
+        if term['term_type'] == 'PT':
+            return term, term['id']
+        bt = term
+        while bt and 'broader_term' in bt:
+            bt = await self._aget_term_by_id(bt['broader_term'])
+            if bt and bt['term_type'] == 'PT':
+                return term, bt['id']
+        return term, None
+
+    async def get_by_id(self, id):
+        result = await self._aget_term_by_id(id)
+        if not result:
+            return False
+        if result['term_type'] == 'ND':
+            return await self.get_by_id(result['use'])
+        (broader, ancestor), terms = await asyncio.gather(
+            self._aget_broader_terms(result),
+            self._aget_terms_by_ids(self._get_related_ids(result))
+        )
+        return self._from_dict(
+            self._build_concept(result, broader, ancestor, terms)
+        )
+
+    async def get_by_ids(self, ids):
+        '''
+        Get all information on a number of concepts or collections at once.
+
+        :rtype: A list with a :class:`skosprovider.skos.Concept`,
+            :class:`skosprovider.skos.Collection` or `False` for every id.
+        '''
+        return await asyncio.gather(*[self.get_by_id(id) for id in ids])
+
+    async def get_by_uri(self, uri):
+        return super(AsyncOnroerendErfgoedProvider, self).get_by_uri(uri)
+
+    async def find(self, query, **kwargs):
+        return await self._do_query(query, limit=kwargs.get('limit', None))
+
+    async def get_all(self):
+        return await self._do_query()
+
+    async def _do_query(self, query=None, limit=None):
+        types, term = self._get_query_args(query)
+        if term is not None and self.local_search:
+            items = await self._run(
+                lambda: self._get_label_index().search(term, types)
+            )
+        else:
+            items = await self._aget_list(types, term)
+        if query is not None and 'collection' in query:
+            #Restrict results to element of collection
+            coll = await self.get_by_id(query['collection']['id'])
+            self._check_collection(coll)
+            if 'depth' in query['collection'] and query['collection']['depth'] == 'all':
+                members = set(await self.expand(coll.id))
+            else:
+                members = set(coll.members)
+            items = [x for x in items if x['id'] in members]
+        if limit is not None:
+            items = items[:limit]
+        return self._format_items(items)
+
+    async def expand_concept(self, id):
+        return await self.expand(id)
+
+    async def expand(self, id):
+        return await self._run_once(
+            ('subtree', str(id)), self._get_subtree, id
+        )
+
+    async def _aget_preferred_term(self, id):
+        result = await self._aget_term_by_id(id)
+        while result and result['term_type'] == 'ND':
+            result = await self._aget_term_by_id(result['use'])
+        return result
+
+    async def _aget_display_nodes(self, ids):
+        '''
+        The :mod:`asyncio` counterpart of
+        :meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider._get_display_nodes`.
+        '''
+        tree = await self._run(self._get_display_tree)
+        if tree is not None:
+            return [tree.get(id) for id in ids]
+        results = await asyncio.gather(
+            *[self._aget_preferred_term(id) for id in ids]
+        )
+        terms = await self._aget_terms_by_ids(
+            [tid for r in results if r for tid in self._get_related_ids(r)]
+        )
+        return [build_node(r, terms) if r else False for r in results]
+
+    async def _aget_top_node(self):
+        items = await self._aget_list(['HR'])
+        return (await self._aget_display_nodes([items[0]['id']]))[0]
+
+    async def get_top_concepts(self, **kwargs):
+        language = self._get_language(**kwargs)
+        async def expand_coll(node):
+            res = []
+            for c in await self._aget_display_nodes(node.children):
+                if not c:
+                    continue
+                if c.type == 'collection':
+                    res.extend(await expand_coll(c))
+                else:
+                    res.append(c.display(language))
+            return res
+        return await expand_coll(await self._aget_top_node())
+
+    async def get_top_display(self, **kwargs):
+        language = self._get_language(**kwargs)
+        top = await self._aget_top_node()
+        return [
+            c.display(language)
+            for c in await self._aget_display_nodes(top.children) if c
+        ]
+
+    async def get_children_display(self, id, **kwargs):
+        language = self._get_language(**kwargs)
+        node = (await self._aget_display_nodes([id]))[0]
+        if not node:
+            return False
+        return [
+            c.display(language)
+            for c in await self._aget_display_nodes(node.children) if c
+        ]
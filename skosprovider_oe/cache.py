@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+'''
+Caching utilities for the
+:class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+'''
+
+import copy
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class CacheBackend(object):
+    '''
+    The interface of the cache used by the
+    :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider` for terms,
+    lists of terms, subtrees and the data derived from them.
+
+    Keys are tuples that start with the url of a thesaurus, values are
+    anything that can be pickled. A backend keeps at most a fixed number of
+    entries and can let entries expire after a time to live.
+
+    :class:`TermCache` keeps the entries in memory, :class:`SQLiteCache`
+    keeps them in a file that can be shared by several processes.
+    '''
+
+    def get(self, key, default=None):
+        '''
+        Get an entry from the cache.
+
+        :param key: The key to look up.
+        :param default: What to return if the key is unknown or expired.
+        '''
+        raise NotImplementedError
+
+    def get_stale(self, key, max_stale=None, default=None):
+        '''
+        Get an entry from the cache, even if it has expired.
+
+        :param key: The key to look up.
+        :param float max_stale: Maximum number of seconds an entry may have
+            been expired for. `None` means there is no maximum.
+        :param default: What to return if the key is unknown or has been
+            expired for too long.
+        :returns: A tuple of the value and whether it has expired.
+        '''
+        raise NotImplementedError
+
+    def set(self, key, value):
+        '''
+        Add an entry to the cache, evicting the least recently used entries
+        if the cache is full.
+        '''
+        raise NotImplementedError
+
+    def delete(self, key):
+        '''
+        Remove an entry from the cache, if present.
+        '''
+        raise NotImplementedError
+
+    def clear(self, namespace=None):
+        '''
+        Remove all entries from the cache and reset the statistics.
+
+        :param namespace: Only remove the entries with a tuple as key that
+            starts with this value, eg. the url of a thesaurus. The
+            statistics are kept.
+        '''
+        raise NotImplementedError
+
+    @property
+    def stats(self):
+        '''
+        A dict with the current number of `entries`, `hits`, `misses`
+        and `evictions`.
+        '''
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class TermCache(CacheBackend):
+    '''
+    An in-memory :class:`CacheBackend` for data fetched from the thesaurus
+    service.
+
+    Entries are kept in least recently used order. When the cache grows
+    beyond `maxsize` entries, the least recently used entry is evicted. When
+    a `ttl` has been set, entries older than `ttl` seconds are considered
+    expired and will not be returned anymore.
+
+    The provider uses keys that start with the url of the thesaurus, so one
+    cache can be shared between providers for different thesauri. Terms are
+    stored as :class:`~skosprovider_oe.record.TermRecord` instances under
+    the url and the id of the term, next to the display nodes and the other
+    values the provider derives from them.
+
+    :param int maxsize: Maximum number of entries. `None` means unbounded.
+    :param float ttl: Time to live of an entry in seconds. `None` means
+        entries never expire.
+    :param timer: A callable returning the current time in seconds.
+        Defaults to :func:`time.time`.
+    '''
+
+    def __init__(self, maxsize=1000, ttl=None, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        '''
+        Get an entry from the cache.
+
+        :param key: The key to look up.
+        :param default: What to return if the key is unknown or expired.
+        '''
+        with self._lock:
+            try:
+                stored, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self.timer() - stored > self.ttl:
+                self.misses += 1
+                return default
+            self._data[key] = (stored, value)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key, max_stale=None, default=None):
+        '''
+        Get an entry from the cache, even if it has expired.
+
+        :param key: The key to look up.
+        :param float max_stale: Maximum number of seconds an entry may have
+            been expired for. `None` means there is no maximum.
+        :param default: What to return if the key is unknown or has been
+            expired for too long.
+        :returns: A tuple of the value and whether it has expired.
+        '''
+        with self._lock:
+            try:
+                stored, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default, False
+            age = self.timer() - stored
+            expired = self.ttl is not None and age > self.ttl
+            if expired and max_stale is not None and age - self.ttl > max_stale:
+                self.misses += 1
+                return default, False
+            self._data[key] = (stored, value)
+            self.hits += 1
+            return value, expired
+
+    def set(self, key, value):
+        '''
+        Add an entry to the cache, evicting the least recently used entries
+        if the cache is full.
+        '''
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (self.timer(), value)
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        '''
+        Remove an entry from the cache, if present.
+        '''
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, namespace=None):
+        '''
+        Remove all entries from the cache and reset the statistics.
+
+        :param namespace: Only remove the entries with a tuple as key that
+            starts with this value, eg. the url of a thesaurus. The
+            statistics are kept.
+        '''
+        with self._lock:
+            if namespace is not None:
+                for key in [
+                    k for k in self._data
+                    if isinstance(k, tuple) and k and k[0] == namespace
+                ]:
+                    del self._data[key]
+                return
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    @property
+    def stats(self):
+        '''
+        A dict with the current number of `entries`, `hits`, `misses`
+        and `evictions`.
+        '''
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            if key not in self._data:
+                return False
+            stored, value = self._data[key]
+            return self.ttl is None or self.timer() - stored <= self.ttl
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    '''
+    A :class:`CacheBackend` that keeps its entries in an SQLite database
+    file, so all processes on a host can share them. What one process has
+    fetched from the service can be used by all others.
+
+    Every change is a transaction of its own, so processes never see a
+    partially written entry. The database is used in write-ahead logging
+    mode, so reading does not wait for writing.
+
+    When there are more than `maxsize` entries, the least recently used
+    entries are evicted. To avoid a write for every read, the time an entry
+    was last used is only updated when it's more than `touch_interval`
+    seconds old.
+
+    Every process and every thread gets a connection of its own. The
+    statistics are kept per process, except for the number of entries.
+
+    :param str path: Location of the database file. It's created when it
+        doesn't exist.
+    :param int maxsize: Maximum number of entries. `None` means unbounded.
+    :param float ttl: Time to live of an entry in seconds. `None` means
+        entries never expire.
+    :param float timeout: Number of seconds to wait for a lock held by
+        another process.
+    :param float touch_interval: See above.
+    :param timer: A callable returning the current time in seconds.
+        Defaults to :func:`time.time`.
+    '''
+
+    def __init__(self, path, maxsize=10000, ttl=None, timeout=30,
+                 touch_interval=60, timer=time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._transaction() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, namespace TEXT, value BLOB, '
+                'stored REAL, used REAL)'
+            )
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS entries_used ON entries (used)'
+            )
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS entries_namespace '
+                'ON entries (namespace)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS size (entries INTEGER)'
+            )
+            if db.execute('SELECT entries FROM size').fetchone() is None:
+                db.execute(
+                    'INSERT INTO size SELECT COUNT(*) FROM entries'
+                )
+            db.execute(
+                'CREATE TRIGGER IF NOT EXISTS entries_insert '
+                'AFTER INSERT ON entries '
+                'BEGIN UPDATE size SET entries = entries + 1; END'
+            )
+            db.execute(
+                'CREATE TRIGGER IF NOT EXISTS entries_delete '
+                'AFTER DELETE ON entries '
+                'BEGIN UPDATE size SET entries = entries - 1; END'
+            )
+
+    def _connect(self):
+        '''
+        Get the connection of the current thread, opening a new one in a
+        new process.
+        '''
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connect())
+
+    def _key(self, key):
+        namespace = None
+        if isinstance(key, tuple) and key:
+            namespace = key[0]
+        return json.dumps(key, separators=(',', ':')), namespace
+
+    def _count(self, **kwargs):
+        with self._lock:
+            for name, value in kwargs.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def get(self, key, default=None):
+        value, expired = self.get_stale(key, 0, default)
+        if expired:
+            return default
+        return value
+
+    def get_stale(self, key, max_stale=None, default=None):
+        k, namespace = self._key(key)
+        row = self._connect().execute(
+            'SELECT value, stored, used FROM entries WHERE key = ?', (k, )
+        ).fetchone()
+        if row is None:
+            self._count(misses=1)
+            return default, False
+        now = self.timer()
+        age = now - row[1]
+        expired = self.ttl is not None and age > self.ttl
+        if expired and max_stale is not None and age - self.ttl > max_stale:
+            self._count(misses=1)
+            return default, False
+        if now - row[2] > self.touch_interval:
+            with self._transaction() as db:
+                db.execute(
+                    'UPDATE entries SET used = ? WHERE key = ?', (now, k)
+                )
+        self._count(hits=1)
+        return pickle.loads(bytes(row[0])), expired
+
+    def set(self, key, value):
+        k, namespace = self._key(key)
+        data = sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        now = self.timer()
+        with self._transaction() as db:
+            updated = db.execute(
+                'UPDATE entries SET value = ?, stored = ?, used = ? '
+                'WHERE key = ?', (data, now, now, k)
+            ).rowcount
+            if not updated:
+                db.execute(
+                    'INSERT INTO entries (key, namespace, value, stored, used) '
+                    'VALUES (?, ?, ?, ?, ?)', (k, namespace, data, now, now)
+                )
+            if self.maxsize is not None:
+                excess = db.execute(
+                    'SELECT entries FROM size'
+                ).fetchone()[0] - self.maxsize
+                if excess > 0:
+                    db.execute(
+                        'DELETE FROM entries WHERE key IN ('
+                        'SELECT key FROM entries ORDER BY used LIMIT ?)',
+                        (excess, )
+                    )
+                    self._count(evictions=excess)
+
+    def delete(self, key):
+        k, namespace = self._key(key)
+        with self._transaction() as db:
+            db.execute('DELETE FROM entries WHERE key = ?', (k, ))
+
+    def clear(self, namespace=None):
+        with self._transaction() as db:
+            if namespace is not None:
+                db.execute(
+                    'DELETE FROM entries WHERE namespace = ?', (namespace, )
+                )
+                return
+            db.execute('DELETE FROM entries')
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def __contains__(self, key):
+        k, namespace = self._key(key)
+        row = self._connect().execute(
+            'SELECT stored FROM entries WHERE key = ?', (k, )
+        ).fetchone()
+        if row is None:
+            return False
+        return self.ttl is None or self.timer() - row[0] <= self.ttl
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT entries FROM size'
+        ).fetchone()[0]
+
+    def close(self):
+        '''
+        Close the connection of the current thread.
+        '''
+        db = getattr(self._local, 'db', None)
+        if db is not None and self._local.pid == os.getpid():
+            db.close()
+        self._local.db = None
+
+
+class _Transaction(object):
+    '''
+    Runs a block of statements in a transaction that holds the write lock
+    of the database from the start.
+    '''
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.db.execute('COMMIT')
+        else:
+            self.db.execute('ROLLBACK')
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    '''
+    Makes sure that concurrent calls for the same key result in only a
+    single call of the underlying function.
+
+    The first thread to ask for a key performs the call, all other threads
+    asking for the same key while that call is in flight wait for it and
+    share its result (or its exception). Every waiting thread gets its own
+    copy of the result, so none of them can change what the others see.
+    '''
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        '''
+        Call `func` with `args` and `kwargs`, unless a call for the same key
+        is already in flight.
+
+        :param key: A hashable identifying the call.
+        :returns: Whatever `func` returns, or a deep copy of it when the
+            result of another call is shared.
+        '''
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    @property
+    def stats(self):
+        '''
+        A dict with the number of `calls` performed and the number of
+        callers that `shared` the result of a call in flight.
+        '''
+        return {
+            'calls': self.calls,
+            'shared': self.shared
+        }
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+Detecting changes in a thesaurus by comparing lists of terms, as returned by
+the `lijst.json` service.
+'''
+
+
+class Changes(object):
+    '''
+    The changes in a thesaurus found by
+    :meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider.delta_refresh`.
+
+    A change that does not affect the label or type of a term, such as a new
+    note, can only be detected by fetching the term itself, so it's not
+    reported.
+    '''
+
+    def __init__(self, added=None, removed=None, changed=None,
+                 refetched=None):
+        #: Ids of terms that are new.
+        self.added = added or []
+        #: Ids of terms that no longer exist.
+        self.removed = removed or []
+        #: Ids of terms with a new label or type.
+        self.changed = changed or []
+        #: Ids of all terms that were fetched again: the new and changed
+        #: terms and the terms above them.
+        self.refetched = refetched or []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return 'Changes(added=%r, removed=%r, changed=%r)' % (
+            self.added, self.removed, self.changed
+        )
+
+
+def listing_state(items):
+    '''
+    Summarize a list of terms for comparing it with :func:`diff_listings`.
+
+    :param items: An iterable of dicts as returned by the `lijst.json`
+        service or of hierarchy entries of a
+        :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+    :rtype: A dict mapping stringified ids to tuples `(id, label, type)`.
+    '''
+    state = {}
+    for item in items:
+        if isinstance(item, dict):
+            item = (item['id'], item['omschrijving'], item['type'])
+        state[str(item[0])] = tuple(item[:3])
+    return state
+
+
+def diff_listings(old, new):
+    '''
+    Compare two states built by :func:`listing_state`.
+
+    :rtype: :class:`Changes`
+    '''
+    return Changes(
+        added=[new[k][0] for k in sorted(new) if k not in old],
+        removed=[old[k][0] for k in sorted(old) if k not in new],
+        changed=[
+            new[k][0] for k in sorted(new)
+            if k in old and new[k][1:] != old[k][1:]
+        ]
+    )
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+A lightweight index on the display hierarchy of a thesaurus, used to answer
+:meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider.get_top_display`,
+:meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider.get_children_display`
+and
+:meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider.get_top_concepts`
+without building complete concepts and collections.
+'''
+
+from skosprovider.skos import (
+    Label,
+    label
+)
+
+
+class DisplayNode(object):
+    '''
+    A concept or collection as far as it's needed to display it in a tree.
+
+    :param id: Id of the concept or collection.
+    :param str type: `concept` or `collection`.
+    :param list labels: The preferred and alternative labels, as
+        :class:`skosprovider.skos.Label` instances.
+    :param list children: Ids of what's displayed under the node: the
+        narrower concepts of a concept or the members of a collection.
+    '''
+
+    def __init__(self, id, type, labels, children):
+        self.id = id
+        self.type = type
+        self.labels = labels
+        self.children = children
+        self._label = {}
+
+    def label(self, language='any'):
+        '''
+        Provide a single label for this node, like
+        :meth:`skosprovider.skos.Concept.label`. The label is only determined
+        once for every language.
+
+        :rtype: :class:`skosprovider.skos.Label` or `None`.
+        '''
+        try:
+            return self._label[language]
+        except KeyError:
+            l = self._label[language] = label(self.labels, language)
+            return l
+
+    def display(self, language='any'):
+        '''
+        Get the dict the display methods of a provider return for this node.
+        '''
+        return {
+            'id': self.id,
+            'label': self.label(language)
+        }
+
+    def __repr__(self):
+        return 'DisplayNode(%r, %r)' % (self.id, self.type)
+
+
+def build_node(term, terms):
+    '''
+    Build the display node of a term.
+
+    :param dict term: A term as returned by the service, not a
+        non-descriptor.
+    :param dict terms: A dict mapping stringified ids to terms that contains
+        the narrower terms and the non-descriptors of the term.
+    :rtype: :class:`DisplayNode`
+    '''
+    labels = [Label(term['term'], 'prefLabel', term['language'])]
+    for t in term.get('use_for', []):
+        nd = terms[str(t)]
+        labels.append(Label(nd['term'], 'altLabel', nd['language']))
+    narrower = term.get('narrower_terms', [])
+    if term['term_type'] == 'PT':
+        return DisplayNode(
+            term['id'], 'concept', labels,
+            [n for n in narrower if terms[str(n)]['term_type'] == 'PT']
+        )
+    return DisplayNode(term['id'], 'collection', labels, list(narrower))
+
+
+class DisplayTree(object):
+    '''
+    The display hierarchy of a
+    :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+
+    Nodes are built the first time they're requested and kept as long as the
+    tree, so every term is only looked at once.
+
+    :param index: A :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+    '''
+
+    def __init__(self, index):
+        self.index = index
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def updated(self, index, ids):
+        '''
+        Start the display tree of an updated snapshot, keeping the nodes
+        that were already built, except the ones of some terms.
+
+        :param index: The updated
+            :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+        :param ids: Ids of the terms that were added, changed or removed,
+            including the terms directly above them and the terms the changed
+            non-descriptors should be replaced by, before and after the
+            change.
+        :rtype: :class:`DisplayTree`
+        '''
+        ids = set(str(id) for id in ids)
+        tree = self.__class__(index)
+        tree._nodes = dict(
+            (key, node) for key, node in self._nodes.items()
+            if key not in ids and str(node.id) not in ids
+        )
+        return tree
+
+    def get_top(self):
+        '''
+        Get the node of the top term (`HR`) of the thesaurus.
+
+        :rtype: :class:`DisplayNode` or `False` if there is no top term.
+        '''
+        for x in self.index.iter_list(['HR']):
+            return self.get(x['id'])
+        return False
+
+    def get(self, id):
+        '''
+        Get the node of a term. A non-descriptor results in the node of the
+        term it should be replaced by.
+
+        :rtype: :class:`DisplayNode` or `False` if the term does not exist.
+        '''
+        key = str(id)
+        node = self._nodes.get(key)
+        if node is None:
+            term = self.index.get_term(id)
+            while term and term['term_type'] == 'ND':
+                term = self.index.get_term(term['use'])
+            if not term:
+                return False
+            ids = term.get('use_for', [])
+            if term['term_type'] == 'PT':
+                ids = ids + term.get('narrower_terms', [])
+            node = build_node(
+                term, dict((str(i), self.index.get_term(i)) for i in ids)
+            )
+            self._nodes[key] = node
+        return node
@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+'''
+Export an entire thesaurus as SKOS.
+
+All terms are fetched in parallel and kept in a
+:class:`~skosprovider_oe.snapshot.ThesaurusIndex`, so building the concepts
+and collections does not need any further requests. Concepts and
+collections are written one by one as N-Triples, Turtle or JSON lines.
+
+.. code-block:: python
+
+    stijl = OnroerendErfgoedProvider({'id': 'STIJL'}, thesaurus='stijl')
+    with open('stijl.nt', 'w') as f:
+        export(stijl, f, format='ntriples', state='stijl.state')
+
+The same is available on the command line::
+
+    skosprovider_oe_export stijl --format turtle --output stijl.ttl \\
+        --state stijl.state
+'''
+
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import sys
+
+from skosprovider.skos import Concept
+
+from skosprovider_oe.providers import OnroerendErfgoedProvider
+from skosprovider_oe.snapshot import ThesaurusIndex
+
+try:
+    text_type = unicode
+except NameError: # pragma: no cover
+    text_type = str
+
+
+class ExportError(Exception):
+    '''
+    Raised when some terms could not be fetched. All other terms have been
+    fetched and, if a state file is used, saved, so running the export again
+    only fetches the missing terms.
+    '''
+
+    def __init__(self, failed):
+        #: A dict mapping the ids of the terms that could not be fetched to
+        #: the exception that was raised.
+        self.failed = failed
+        super(ExportError, self).__init__(
+            'Could not fetch %d terms: %s' % (
+                len(failed),
+                ', '.join(str(id) for id in sorted(failed, key=str))
+            )
+        )
+
+
+def load_state(path):
+    '''
+    Load the terms saved in a state file by an earlier, interrupted export.
+
+    :param str path: Location of the state file.
+    :rtype: A dict mapping stringified ids to terms. Empty if the file does
+        not exist.
+    '''
+    terms = {}
+    try:
+        f = io.open(path, encoding='utf-8')
+    except IOError:
+        return terms
+    with f:
+        for line in f:
+            try:
+                term = json.loads(line)
+            except ValueError:
+                # The last line is incomplete if the export was interrupted
+                # while writing it.
+                continue
+            terms[str(term['id'])] = term
+    return terms
+
+
+def fetch_index(provider, state=None, progress=None):
+    '''
+    Fetch all terms of a thesaurus in parallel, using the pool of
+    `max_workers` threads of a provider.
+
+    :param provider: An
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`. If it
+        has a snapshot, the snapshot is used without fetching anything.
+    :param str state: Location of a state file. Every fetched term is
+        appended to it and terms already in it are not fetched again.
+    :param progress: A callable that is called with the number of terms
+        fetched so far and the total number of terms.
+    :raises ExportError: If some terms could not be fetched.
+    :raises LookupError: If the thesaurus does not exist.
+    :rtype: :class:`~skosprovider_oe.snapshot.ThesaurusIndex`
+    '''
+    index = provider._get_index()
+    if index is not None:
+        return index
+    items = provider._get_list(['HR', 'PT', 'NL', 'ND'])
+    if items is False:
+        raise LookupError(
+            'Thesaurus %s does not exist.' % provider.thesaurus
+        )
+    terms = load_state(state) if state else {}
+    missing = [
+        str(item['id']) for item in items if str(item['id']) not in terms
+    ]
+    total = len(items)
+    done = [total - len(missing)]
+    out = io.open(state, 'a', encoding='utf-8') if state else None
+
+    def fetched(id, term):
+        done[0] += 1
+        if term:
+            terms[id] = term
+            if out is not None:
+                out.write(text_type(json.dumps(term)) + u'\n')
+                out.flush()
+        if progress is not None:
+            progress(done[0], total)
+
+    try:
+        if progress is not None:
+            progress(done[0], total)
+        failed = provider._fetch_terms(missing, fetched=fetched)[1]
+    finally:
+        if out is not None:
+            out.close()
+    if failed:
+        raise ExportError(failed)
+    ids = [str(item['id']) for item in items]
+    return ThesaurusIndex(
+        [terms[id] for id in ids if id in terms],
+        thesaurus=provider.thesaurus,
+        url=provider.url
+    )
+
+
+def iter_concepts(provider, index, batch_size=500):
+    '''
+    Build all concepts and collections of a thesaurus from an index, without
+    contacting the service.
+
+    :param provider: The
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider` the
+        index was fetched with.
+    :param index: A :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+    :param int batch_size: Number of concepts and collections built at a
+        time.
+    :rtype: An iterator of :class:`~skosprovider.skos.Concept` and
+        :class:`~skosprovider.skos.Collection` objects.
+    '''
+    local = OnroerendErfgoedProvider(
+        dict(provider.metadata),
+        url=provider.url,
+        concept_scheme=provider.concept_scheme,
+        snapshot=True,
+        max_workers=1,
+        coalesce_requests=False
+    )
+    local.index = index
+    ids = [e[0] for e in index.entries() if e[2] != 'ND']
+    for i in range(0, len(ids), batch_size):
+        for c in local.get_by_ids(ids[i:i + batch_size]):
+            if c:
+                yield c
+
+
+def to_dict(c):
+    '''
+    Convert a concept or collection to a dict, in the format used by
+    :func:`skosprovider.utils.dict_dumper`.
+    '''
+    res = {
+        'id': c.id,
+        'uri': c.uri,
+        'type': c.type,
+        'labels': [l.__dict__ for l in c.labels],
+        'notes': [n.__dict__ for n in c.notes],
+        'sources': [s.__dict__ for s in c.sources],
+        'member_of': c.member_of
+    }
+    if isinstance(c, Concept):
+        res.update({
+            'narrower': c.narrower,
+            'broader': c.broader,
+            'related': c.related,
+            'subordinate_arrays': c.subordinate_arrays,
+            'matches': c.matches
+        })
+    else:
+        res.update({
+            'members': c.members,
+            'superordinates': c.superordinates
+        })
+    return res
+
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+SKOS = 'http://www.w3.org/2004/02/skos/core#'
+SKOS_THES = 'http://purl.org/iso25964/skos-thes#'
+DCTERMS = 'http://purl.org/dc/terms/'
+
+PREFIXES = [
+    ('rdf', RDF),
+    ('skos', SKOS),
+    ('skos-thes', SKOS_THES),
+    ('dcterms', DCTERMS)
+]
+
+
+def _escape_iri(iri):
+    return u''.join(
+        u'\\u%04X' % ord(c) if c in u'<>"{}|^`\\' or ord(c) <= 0x20 else c
+        for c in iri
+    )
+
+
+def _escape_literal(value):
+    return (
+        value.replace(u'\\', u'\\\\')
+             .replace(u'"', u'\\"')
+             .replace(u'\n', u'\\n')
+             .replace(u'\r', u'\\r')
+    )
+
+
+class _Iri(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class _Literal(object):
+    def __init__(self, value, language=None):
+        self.value = value
+        self.language = language
+
+
+class _Blank(object):
+    def __init__(self, id):
+        self.id = id
+
+
+def _triples(c, uris, scheme):
+    '''
+    Describe a concept or collection as RDF.
+
+    :param dict uris: A dict mapping stringified ids to uris.
+    :returns: An iterator of tuples `(subject, predicate, object)`, where
+        the predicate is an IRI and the subject and object are nodes.
+    '''
+    s = _Iri(c.uri)
+
+    def refs(ids):
+        return [_Iri(uris[str(id)]) for id in ids if str(id) in uris]
+
+    if c.type == 'concept':
+        yield s, RDF + 'type', _Iri(SKOS + 'Concept')
+    else:
+        yield s, RDF + 'type', _Iri(SKOS + 'Collection')
+    if scheme is not None:
+        yield s, SKOS + 'inScheme', _Iri(scheme)
+    for l in c.labels:
+        yield s, SKOS + l.type, _Literal(l.label, l.language)
+    for n in c.notes:
+        yield s, SKOS + n.type, _Literal(n.note, n.language)
+    if isinstance(c, Concept):
+        for o in refs(c.broader):
+            yield s, SKOS + 'broader', o
+        for o in refs(c.narrower):
+            yield s, SKOS + 'narrower', o
+        for o in refs(c.related):
+            yield s, SKOS + 'related', o
+        for o in refs(c.subordinate_arrays):
+            yield s, SKOS_THES + 'subordinateArray', o
+        for match_type in sorted(c.matches):
+            for uri in c.matches[match_type]:
+                yield s, SKOS + match_type + 'Match', _Iri(uri)
+    else:
+        for o in refs(c.members):
+            yield s, SKOS + 'member', o
+        for o in refs(c.superordinates):
+            yield s, SKOS_THES + 'superOrdinate', o
+    sources = [
+        (_Blank('source%s_%d' % (c.id, i)), source)
+        for i, source in enumerate(c.sources)
+    ]
+    for b, source in sources:
+        yield s, DCTERMS + 'source', b
+    for b, source in sources:
+        yield b, DCTERMS + 'bibliographicCitation', _Literal(source.citation)
+
+
+class NTriplesWriter(object):
+    '''
+    Writes concepts and collections as N-Triples.
+    '''
+
+    def __init__(self, out, uris, scheme=None):
+        self.out = out
+        self.uris = uris
+        self.scheme = scheme
+
+    def _node(self, node):
+        if isinstance(node, _Iri):
+            return u'<%s>' % _escape_iri(node.value)
+        if isinstance(node, _Blank):
+            return u'_:%s' % node.id
+        if node.language:
+            return u'"%s"@%s' % (_escape_literal(node.value), node.language)
+        return u'"%s"' % _escape_literal(node.value)
+
+    def start(self):
+        if self.scheme is not None:
+            self.out.write(u'<%s> <%stype> <%sConceptScheme> .\n' % (
+                _escape_iri(self.scheme), RDF, SKOS
+            ))
+
+    def write(self, c):
+        self.out.write(u''.join(
+            u'%s <%s> %s .\n' % (self._node(s), p, self._node(o))
+            for s, p, o in _triples(c, self.uris, self.scheme)
+        ))
+
+    def end(self):
+        pass
+
+
+class TurtleWriter(NTriplesWriter):
+    '''
+    Writes concepts and collections as Turtle, grouping all statements about
+    a concept or collection.
+    '''
+
+    def _predicate(self, iri):
+        for prefix, ns in PREFIXES:
+            if iri.startswith(ns):
+                return u'%s:%s' % (prefix, iri[len(ns):])
+        return u'<%s>' % _escape_iri(iri) # pragma: no cover
+
+    def _node(self, node):
+        if isinstance(node, _Iri):
+            for prefix, ns in PREFIXES:
+                if node.value.startswith(ns):
+                    return self._predicate(node.value)
+        return super(TurtleWriter, self)._node(node)
+
+    def start(self):
+        for prefix, ns in PREFIXES:
+            self.out.write(u'@prefix %s: <%s> .\n' % (prefix, ns))
+        self.out.write(u'\n')
+        if self.scheme is not None:
+            self.out.write(
+                u'<%s> a skos:ConceptScheme .\n\n' % _escape_iri(self.scheme)
+            )
+
+    def write(self, c):
+        lines = []
+        subject = None
+        for s, p, o in _triples(c, self.uris, self.scheme):
+            node = self._node(s)
+            if node != subject:
+                if subject is not None:
+                    lines[-1] += u' .\n'
+                subject = node
+                lines.append(u'%s\n' % node)
+            else:
+                lines[-1] += u' ;\n'
+            predicate = u'a' if p == RDF + 'type' else self._predicate(p)
+            lines.append(u'    %s %s' % (predicate, self._node(o)))
+        lines[-1] += u' .\n\n'
+        self.out.write(u''.join(lines))
+
+
+class JsonLinesWriter(object):
+    '''
+    Writes concepts and collections as JSON lines, one dict as returned by
+    :func:`to_dict` per line.
+    '''
+
+    def __init__(self, out, uris, scheme=None):
+        self.out = out
+
+    def start(self):
+        pass
+
+    def write(self, c):
+        self.out.write(
+            text_type(json.dumps(to_dict(c), sort_keys=True)) + u'\n'
+        )
+
+    def end(self):
+        pass
+
+
+FORMATS = {
+    'ntriples': NTriplesWriter,
+    'turtle': TurtleWriter,
+    'jsonl': JsonLinesWriter
+}
+
+
+def export(provider, out, format='ntriples', state=None, progress=None):
+    '''
+    Export all concepts and collections of a thesaurus.
+
+    :param provider: An
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+    :param out: A text stream to write to.
+    :param str format: `ntriples`, `turtle` or `jsonl`.
+    :param str state: Location of a state file that allows resuming an
+        export that was interrupted, see :func:`fetch_index`.
+    :param progress: A callable that is called with a phase (`fetch` or
+        `write`), the number of terms handled so far in that phase and the
+        total number of terms for that phase.
+    :raises ExportError: If some terms could not be fetched.
+    :returns: The number of concepts and collections written.
+    '''
+    if format not in FORMATS:
+        raise ValueError('Unknown export format %s.' % format)
+    index = fetch_index(
+        provider,
+        state=state,
+        progress=(lambda d, t: progress('fetch', d, t)) if progress else None
+    )
+    uris = dict((str(t['id']), t['uri']) for t in index.terms())
+    writer = FORMATS[format](out, uris, provider.concept_scheme.uri)
+    total = len([e for e in index.entries() if e[2] != 'ND'])
+    count = 0
+    writer.start()
+    for c in iter_concepts(provider, index):
+        writer.write(c)
+        count += 1
+        if progress is not None and (count % 100 == 0 or count == total):
+            progress('write', count, total)
+    writer.end()
+    return count
+
+
+def main(argv=None):
+    '''
+    Command line interface to :func:`export`.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Export a thesaurus of Onroerend Erfgoed as SKOS.'
+    )
+    parser.add_argument('thesaurus', help='Name of the thesaurus, eg. stijl.')
+    parser.add_argument(
+        '--base-url',
+        default='https://inventaris.onroerenderfgoed.be/thesaurus/%s',
+        help='Pattern for the url of a thesaurus.'
+    )
+    parser.add_argument('--id', help='Id of the vocabulary. Defaults to the '
+                        'name of the thesaurus in uppercase.')
+    parser.add_argument(
+        '--format', choices=sorted(FORMATS), default='ntriples'
+    )
+    parser.add_argument('--output', default='-',
+                        help='File to write to. Defaults to stdout.')
+    parser.add_argument('--state', help='State file for resuming an '
+                        'interrupted export.')
+    parser.add_argument('--workers', type=int, default=10,
+                        help='Number of terms to fetch in parallel.')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not report progress.')
+    args = parser.parse_args(argv)
+
+    provider = OnroerendErfgoedProvider(
+        {'id': args.id or args.thesaurus.upper()},
+        base_url=args.base_url,
+        thesaurus=args.thesaurus,
+        max_workers=args.workers
+    )
+
+    def progress(phase, done, total):
+        sys.stderr.write('\r%s: %d/%d' % (phase, done, total))
+        if done == total:
+            sys.stderr.write('\n')
+        sys.stderr.flush()
+
+    if args.output == '-':
+        out = io.open(
+            sys.stdout.fileno(), 'w', encoding='utf-8', closefd=False
+        )
+    else:
+        out = io.open(args.output, 'w', encoding='utf-8')
+    try:
+        with out:
+            count = export(
+                provider, out,
+                format=args.format,
+                state=args.state,
+                progress=None if args.quiet else progress
+            )
+    except ExportError as e:
+        print(str(e), file=sys.stderr)
+        print('Run the export again with the same --state to resume.',
+              file=sys.stderr)
+        return 1
+    except LookupError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        provider.close()
+    if not args.quiet:
+        print('Exported %d concepts and collections.' % count, file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__': # pragma: no cover
+    sys.exit(main())
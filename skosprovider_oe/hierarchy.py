@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+'''
+An incrementally maintained transitive closure of the hierarchy of a
+thesaurus.
+'''
+
+import threading
+import time
+
+
+class HierarchyClosure(object):
+    '''
+    Keeps track of the ancestors and descendants of every term in a
+    thesaurus, as far as they are known.
+
+    The closure is built incrementally. Every time the narrower terms of a
+    term become known, through :meth:`add_term`, the sets of ancestors and
+    descendants of all affected terms are updated. A subtree is complete
+    when the narrower terms of every term in it are known. Complete subtrees
+    can be answered without contacting the service. Lists of ids returned by
+    the `subtree.json` service can be added through :meth:`add_subtree`.
+    When the narrower terms of a term are added again and they have changed,
+    they replace the ones that were known.
+
+    When a `ttl` has been set, narrower terms and subtrees that were added
+    more than `ttl` seconds ago no longer count as known, like the expired
+    entries of a :class:`~skosprovider_oe.cache.TermCache`.
+
+    When more than `maxsize` terms are known, everything is forgotten and the
+    closure is built again from the terms added after that, so it never grows
+    much beyond the cache it's built from.
+
+    Ids are compared in a type agnostic way.
+
+    :param int maxsize: Maximum number of terms to keep track of. `None`
+        means unbounded.
+    :param float ttl: Number of seconds the narrower terms and subtrees that
+        are added stay known. `None` means forever.
+    :param timer: A callable returning the current time in seconds.
+        Defaults to :func:`time.time`.
+    '''
+
+    def __init__(self, maxsize=None, ttl=None, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._ids = {}
+        self._children = {}
+        self._parents = {}
+        self._ancestors = {}
+        self._descendants = {}
+        self._subtrees = {}
+        self._added = {}
+        self._subtrees_added = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, id):
+        return str(id) in self._ids
+
+    def _key(self, id):
+        key = str(id)
+        if key not in self._ids:
+            self._ids[key] = id
+            self._ancestors[key] = set()
+            self._descendants[key] = set()
+        return key
+
+    def _check_size(self):
+        if self.maxsize is not None and len(self._ids) > self.maxsize:
+            self.clear()
+
+    def _fresh(self, added, key):
+        if key not in added:
+            return False
+        return self.ttl is None or self.timer() - added[key] <= self.ttl
+
+    def add_term(self, id, narrower):
+        '''
+        Record the narrower terms of a term.
+
+        :param id: Id of the term.
+        :param list narrower: Ids of all narrower terms of the term.
+        '''
+        with self._lock:
+            self._check_size()
+            key = self._key(id)
+            children = [self._key(n) for n in narrower]
+            if key in self._children:
+                if self._children[key] == children:
+                    self._added[key] = self.timer()
+                    return
+                self.discard(key)
+            self._added[key] = self.timer()
+            self._children[key] = children
+            for child in children:
+                self._parents[child] = key
+                self._add_edge(key, child)
+
+    def _add_edge(self, parent, child):
+        ancestors = self._ancestors[parent] | set([parent])
+        descendants = self._descendants[child] | set([child])
+        if child in ancestors:
+            # A cycle, should not happen in a thesaurus.
+            return
+        for a in ancestors:
+            self._descendants[a] |= descendants
+        for d in descendants:
+            self._ancestors[d] |= ancestors
+
+    def add_subtree(self, id, subtree):
+        '''
+        Record the subtree of a term, as returned by the `subtree.json`
+        service.
+
+        :param id: Id of the term.
+        :param list subtree: Ids of the term and all terms below it.
+        '''
+        with self._lock:
+            self._check_size()
+            key = self._key(id)
+            self._subtrees[key] = list(subtree)
+            self._subtrees_added[key] = self.timer()
+            descendants = set(self._key(s) for s in subtree) - set([key])
+            self._descendants[key] |= descendants
+            for d in descendants:
+                self._ancestors[d].add(key)
+
+    def discard(self, id):
+        '''
+        Forget the narrower terms of a term, eg. because the term has
+        changed. The subtrees of the term and of all terms above it are no
+        longer complete until the term is added again.
+
+        :param id: Id of the term.
+        '''
+        key = str(id)
+        with self._lock:
+            if key not in self._ids:
+                return
+            above = self._ancestors[key] | set([key])
+            below = self._descendants[key]
+            self._added.pop(key, None)
+            for child in self._children.pop(key, []):
+                if self._parents.get(child) == key:
+                    del self._parents[child]
+            for a in above:
+                self._subtrees.pop(a, None)
+                self._subtrees_added.pop(a, None)
+                self._descendants[a] = set()
+            for d in below:
+                self._ancestors[d] -= above
+            # Deepest terms first, so the descendants of a child are known
+            # again before the edge to its parent is added.
+            for a in sorted(above, key=lambda a: -len(self._ancestors[a])):
+                for child in self._children.get(a, []):
+                    self._add_edge(a, child)
+
+    def is_complete(self, id):
+        '''
+        Is the entire subtree of a term known?
+        '''
+        key = str(id)
+        with self._lock:
+            if self._fresh(self._subtrees_added, key):
+                return True
+            if not self._fresh(self._added, key):
+                return False
+            return all(
+                self._fresh(self._added, d) for d in self._descendants[key]
+            )
+
+    def get_ancestors(self, id):
+        '''
+        Get the ids of all known terms above a term.
+
+        :rtype: set
+        '''
+        with self._lock:
+            return set(self._ids[a] for a in self._ancestors.get(str(id), ()))
+
+    def get_parent(self, id):
+        '''
+        Get the id of the term a term is a narrower term of, if it's known.
+        '''
+        with self._lock:
+            parent = self._parents.get(str(id))
+            return None if parent is None else self._ids[parent]
+
+    def get_descendants(self, id):
+        '''
+        Get the ids of all known terms below a term.
+
+        :rtype: set
+        '''
+        with self._lock:
+            return set(
+                self._ids[d] for d in self._descendants.get(str(id), ())
+            )
+
+    def get_subtree(self, id):
+        '''
+        Get the ids of a term and all terms below it, if they're known.
+
+        The term itself comes first, followed by the terms below it in
+        depth-first order, following the order of the narrower terms.
+
+        :returns: A list or `None` if the subtree is not complete.
+        '''
+        key = str(id)
+        with self._lock:
+            if not self.is_complete(key):
+                return None
+            if self._fresh(self._subtrees_added, key):
+                return list(self._subtrees[key])
+            res = []
+            seen = set()
+            stack = [key]
+            while stack:
+                k = stack.pop()
+                if k in seen:
+                    continue
+                seen.add(k)
+                res.append(self._ids[k])
+                stack.extend(reversed(self._children.get(k, [])))
+            return res
+
+    def clear(self):
+        '''
+        Forget everything that's known about the hierarchy.
+        '''
+        with self._lock:
+            self._ids.clear()
+            self._children.clear()
+            self._parents.clear()
+            self._ancestors.clear()
+            self._descendants.clear()
+            self._subtrees.clear()
+            self._added.clear()
+            self._subtrees_added.clear()
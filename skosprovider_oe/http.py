@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+'''
+HTTP utilities for the
+:class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+'''
+
+import codecs
+import json
+import time
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from skosprovider_oe.cache import TermCache
+
+try:
+    from urllib3.util.retry import Retry
+except ImportError: # pragma: no cover
+    from requests.packages.urllib3.util.retry import Retry
+
+
+DEFAULT_TIMEOUT = (10, 60)
+'''
+Default connect and read timeout, in seconds, for requests to the service.
+'''
+
+RETRY_STATUSES = (500, 502, 503, 504)
+'''Status codes of responses to GET requests that are retried.'''
+
+
+class CachedResponse(object):
+    '''
+    A response stored by a :class:`CachingAdapter`.
+    '''
+
+    def __init__(self, response, stored):
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = CaseInsensitiveDict(response.headers)
+        self.content = response.content
+        self.encoding = response.encoding
+        self.stored = stored
+        self.update(response.headers, stored)
+
+    def update(self, headers, stored):
+        '''
+        Update the freshness information after a successful revalidation.
+        '''
+        self.stored = stored
+        directives = _parse_cache_control(headers.get('Cache-Control', ''))
+        if 'no-cache' in directives:
+            self.max_age = 0
+        else:
+            try:
+                self.max_age = int(directives.get('max-age'))
+            except (TypeError, ValueError):
+                self.max_age = None
+        for header in ('ETag', 'Last-Modified'):
+            if header in headers:
+                self.headers[header] = headers[header]
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified')
+
+    def is_fresh(self, now):
+        return self.max_age is not None and now - self.stored < self.max_age
+
+    def json(self):
+        '''
+        Decode the body of the response. Every call returns new objects, so
+        callers can't change what is cached.
+        '''
+        return json.loads(self.content.decode(self.encoding or 'utf-8'))
+
+
+class CachingAdapter(HTTPAdapter):
+    '''
+    A :class:`requests.adapters.HTTPAdapter` that caches responses to GET
+    requests.
+
+    A cached response is served without contacting the service as long as
+    it's fresh according to the `max-age` of its `Cache-Control` header.
+    Once it's stale, the request is sent with `If-None-Match` and
+    `If-Modified-Since` headers based on the `ETag` and `Last-Modified`
+    headers of the cached response. If the service answers with a
+    `304 Not Modified`, the cached response is used. A request with a
+    `Cache-Control: no-cache` header is always revalidated.
+
+    Responses returned from the cache have a `from_cache` attribute set to
+    `True` and a `revalidated` attribute that tells whether the service was
+    asked if they were still valid. All responses that are stored have a `cache_entry` attribute,
+    the :class:`CachedResponse` kept in the cache.
+
+    :param int maxsize: Maximum number of responses to keep.
+    :param timer: A callable returning the current time in seconds.
+        Defaults to :func:`time.time`.
+
+    All other parameters are passed on to the
+    :class:`~requests.adapters.HTTPAdapter`.
+    '''
+
+    def __init__(self, maxsize=1000, timer=time.time, **kwargs):
+        self.responses = TermCache(maxsize=maxsize)
+        self.timer = timer
+        self.fresh = 0
+        self.revalidated = 0
+        self.fetched = 0
+        super(CachingAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return self._send(request, **kwargs)
+        entry = self.responses.get(request.url)
+        revalidate = 'no-cache' in _parse_cache_control(
+            request.headers.get('Cache-Control', '')
+        )
+        if entry is not None and not revalidate and \
+           entry.is_fresh(self.timer()):
+            self.fresh += 1
+            return self._build_cached_response(request, entry)
+        if entry is not None:
+            if entry.etag:
+                request.headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request.headers['If-Modified-Since'] = entry.last_modified
+        response = self._send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            entry.update(response.headers, self.timer())
+            response.close()
+            return self._build_cached_response(
+                request, entry, revalidated=True
+            )
+        self.fetched += 1
+        if self._is_cacheable(response):
+            entry = CachedResponse(response, self.timer())
+            self.responses.set(request.url, entry)
+            response.cache_entry = entry
+        return response
+
+    def _send(self, request, **kwargs):
+        return super(CachingAdapter, self).send(request, **kwargs)
+
+    def _is_cacheable(self, response):
+        if response.status_code != 200:
+            return False
+        directives = _parse_cache_control(
+            response.headers.get('Cache-Control', '')
+        )
+        return 'no-store' not in directives
+
+    def _build_cached_response(self, request, entry, revalidated=False):
+        response = Response()
+        response.status_code = entry.status_code
+        response.reason = entry.reason
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response._content = entry.content
+        response._content_consumed = True
+        response.encoding = entry.encoding
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        response.revalidated = revalidated
+        response.cache_entry = entry
+        return response
+
+    def clear(self):
+        '''
+        Remove all responses from the cache and reset the statistics.
+        '''
+        self.responses.clear()
+        self.fresh = 0
+        self.revalidated = 0
+        self.fetched = 0
+
+    @property
+    def stats(self):
+        '''
+        A dict with the number of requests answered from the cache without
+        contacting the service (`fresh`), answered from the cache after a
+        `304 Not Modified` (`revalidated`) and answered with a full response
+        from the service (`fetched`).
+        '''
+        return {
+            'fresh': self.fresh,
+            'revalidated': self.revalidated,
+            'fetched': self.fetched
+        }
+
+
+def build_retry(retries=3, backoff_factor=0.5):
+    '''
+    Build a retry policy for GET requests that failed because of a
+    connection error, a read error or a server error
+    (see :data:`RETRY_STATUSES`).
+
+    The time between attempts grows exponentially: with a `backoff_factor`
+    of 0.5, the retries happen after 0, 1, 2, 4, ... seconds. When all
+    retries have failed, the last response is returned.
+
+    :param int retries: Maximum number of retries. `0` disables retrying.
+    :param float backoff_factor: Base for the time between retries.
+    :rtype: :class:`urllib3.util.retry.Retry`
+    '''
+    return Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False
+    )
+
+
+def build_adapter(pool_connections=10, pool_maxsize=10, retries=3,
+                  backoff_factor=0.5, http_cache=False, **kwargs):
+    '''
+    Build an adapter with a connection pool and a retry policy.
+
+    :param int pool_connections: Number of hosts to keep a pool of
+        connections for.
+    :param int pool_maxsize: Maximum number of connections kept open to a
+        single host.
+    :param int retries: See :func:`build_retry`.
+    :param float backoff_factor: See :func:`build_retry`.
+    :param bool http_cache: Build a :class:`CachingAdapter` instead of a
+        plain :class:`~requests.adapters.HTTPAdapter`.
+
+    All other parameters are passed on to the :class:`CachingAdapter`.
+    :rtype: :class:`~requests.adapters.HTTPAdapter`
+    '''
+    kwargs.update(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=build_retry(retries, backoff_factor)
+    )
+    if http_cache:
+        return CachingAdapter(**kwargs)
+    return HTTPAdapter(**kwargs)
+
+
+def build_session(adapter=None, **kwargs):
+    '''
+    Build a :class:`requests.Session` that can be shared by several
+    providers, so they reuse the same pool of keep-alive connections.
+
+    .. code-block:: python
+
+        session = build_session(pool_maxsize=20, retries=5)
+        typologie = OnroerendErfgoedProvider(
+            {'id': 'TYPOLOGIE'}, thesaurus='typologie', session=session
+        )
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'}, thesaurus='stijl', session=session
+        )
+
+    :param adapter: An adapter to mount for `http://` and `https://`.
+        Built by :func:`build_adapter` from all other parameters when not
+        passed.
+    :rtype: :class:`requests.Session`
+    '''
+    if adapter is None:
+        adapter = build_adapter(**kwargs)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(chunks, encoding='utf-8'):
+    '''
+    Incrementally decode a JSON document consisting of an array, yielding
+    the elements of the array one by one.
+
+    Only the chunks needed to decode the next element are read, so an array
+    can be processed without ever holding the entire document in memory.
+
+    :param chunks: An iterable of bytes, eg.
+        :meth:`requests.Response.iter_content`.
+    :param str encoding: Encoding of the document.
+    :raises ValueError: If the document is not a valid JSON array.
+    '''
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder(encoding)()
+    chunks = iter(chunks)
+    buf = u''
+    pos = 0
+    eof = False
+    # What comes next: the opening bracket, the first element, an element
+    # after a comma or a separator after an element.
+    expect = '['
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos < len(buf):
+            c = buf[pos]
+            if expect == '[':
+                if c != '[':
+                    raise ValueError('Expected a JSON array.')
+                expect = 'first'
+                pos += 1
+                continue
+            if c == ']' and expect in ('first', 'separator'):
+                return
+            if expect == 'separator':
+                if c != ',':
+                    raise ValueError('Expected , or ] at position %d.' % pos)
+                expect = 'element'
+                pos += 1
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                end = None
+            # A number or literal might continue in the next chunk, even when
+            # a prefix of it can be decoded, eg. `-2500.` followed by `0`.
+            # It's complete once a separator follows it.
+            if end is not None and (
+                isinstance(value, (dict, list)) or
+                end < len(buf) and buf[end] in _WHITESPACE + ',]'
+            ):
+                pos = end
+                expect = 'separator'
+                yield value
+                continue
+        if eof:
+            raise ValueError('Invalid or incomplete JSON array.')
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            rest = text.decode(b'', final=True)
+        else:
+            rest = text.decode(chunk)
+        buf = buf[pos:] + rest
+        pos = 0
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for directive in value.split(','):
+        directive = directive.strip().lower()
+        if not directive:
+            continue
+        if '=' in directive:
+            name, arg = directive.split('=', 1)
+            directives[name.strip()] = arg.strip().strip('"')
+        else:
+            directives[directive] = True
+    return directives
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+'''
+Instrumentation of the calls made to a
+:class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+'''
+
+import functools
+import threading
+import time
+import warnings
+
+from contextlib import contextmanager
+
+
+class CallStats(object):
+    '''
+    Statistics on a single call of a public method of a provider.
+
+    Calls made by a public method to other public methods, such as
+    :meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider.get_by_id`
+    being called by
+    :meth:`~skosprovider_oe.providers.OnroerendErfgoedProvider.get_children_display`,
+    are counted as part of the outer call.
+    '''
+
+    def __init__(self, method, vocabulary_id=None):
+        #: Name of the method that was called.
+        self.method = method
+        #: Id of the vocabulary of the provider.
+        self.vocabulary_id = vocabulary_id
+        #: Number of requests sent to the service.
+        self.requests = 0
+        #: Number of responses taken from the HTTP cache, either because
+        #: the cached response was fresh or after revalidating it. Only
+        #: revalidations count as requests.
+        self.cached = 0
+        #: Number of bytes received from the service, not counting
+        #: responses answered from the HTTP cache.
+        self.bytes = 0
+        #: Seconds spent decoding JSON.
+        self.decode_time = 0.0
+        #: Seconds spent building concepts and collections.
+        self.build_time = 0.0
+        #: Seconds between the start and the end of the call.
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **kwargs):
+        '''
+        Add to one or more of the counters, in a thread safe way.
+        '''
+        with self._lock:
+            for name, value in kwargs.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'vocabulary_id': self.vocabulary_id,
+            'requests': self.requests,
+            'cached': self.cached,
+            'bytes': self.bytes,
+            'decode_time': self.decode_time,
+            'build_time': self.build_time,
+            'wall_time': self.wall_time
+        }
+
+    def __repr__(self):
+        return "CallStats('%s', requests=%d, wall_time=%.6f)" % (
+            self.method, self.requests, self.wall_time
+        )
+
+
+class Instrumentation(object):
+    '''
+    Collects :class:`CallStats` for the calls made to one or more providers
+    and passes them on to hooks.
+
+    A hook is a callable that receives a :class:`CallStats` every time a
+    call to a public method of a provider finishes. This can be used to send
+    the statistics to a metrics system. A hook that raises an exception does
+    not affect the call, a :class:`RuntimeWarning` is issued instead.
+
+    .. code-block:: python
+
+        provider.instrumentation.add_hook(
+            lambda stats: statsd.timing(stats.method, stats.wall_time)
+        )
+
+        with provider.instrumentation.trace() as calls:
+            provider.get_children_display(513)
+        print(calls[0].requests)
+    '''
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self._local = threading.local()
+
+    def add_hook(self, hook):
+        '''
+        Register a callable to be called with the :class:`CallStats` of
+        every call that finishes.
+        '''
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    @property
+    def current(self):
+        '''
+        The :class:`CallStats` of the call in progress in this thread or
+        `None`.
+        '''
+        return getattr(self._local, 'current', None)
+
+    @contextmanager
+    def call(self, method, vocabulary_id=None):
+        '''
+        Record a call to a method. Nested calls are counted as part of the
+        outermost call.
+        '''
+        if self.current is not None:
+            yield self.current
+            return
+        stats = CallStats(method, vocabulary_id)
+        self._local.current = stats
+        start = time.time()
+        try:
+            yield stats
+        finally:
+            stats.wall_time = time.time() - start
+            self._local.current = None
+            self._finish(stats)
+
+    def iterate(self, method, iterator, vocabulary_id=None):
+        '''
+        Record a call to a method that returns an iterator. The call lasts
+        until the iterator is exhausted or closed, but only the work done
+        while producing the next item is counted.
+
+        :returns: An iterator yielding the same items as `iterator`.
+        '''
+        if self.current is not None:
+            return iterator
+        return self._iterate(CallStats(method, vocabulary_id), iterator)
+
+    def _iterate(self, stats, iterator):
+        start = time.time()
+        try:
+            while True:
+                previous = self.current
+                self._local.current = stats
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self._local.current = previous
+                yield item
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            stats.wall_time = time.time() - start
+            self._finish(stats)
+
+    def _finish(self, stats):
+        for trace in getattr(self._local, 'traces', []):
+            trace.append(stats)
+        for hook in self.hooks:
+            try:
+                hook(stats)
+            except Exception as e:
+                warnings.warn(
+                    'Instrumentation hook %r failed: %s' % (hook, e),
+                    RuntimeWarning
+                )
+
+    @contextmanager
+    def timer(self, counter):
+        '''
+        Add the time spent in a block of code to a counter of the current
+        call, if there is one.
+
+        :param str counter: `decode_time` or `build_time`.
+        '''
+        stats = self.current
+        if stats is None:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            stats.add(**{counter: time.time() - start})
+
+    def record_request(self, response, stream=False):
+        '''
+        Count a request and the size of its response for the current call,
+        if there is one.
+
+        :param bool stream: The body of the response is being streamed and
+            should not be read. Its size is counted through
+            :meth:`record_bytes` instead.
+        '''
+        stats = self.current
+        if stats is None:
+            return
+        if getattr(response, 'from_cache', False):
+            # A fresh response never reached the service.
+            if getattr(response, 'revalidated', False):
+                stats.add(requests=1, cached=1)
+            else:
+                stats.add(cached=1)
+        elif stream:
+            stats.add(requests=1)
+        else:
+            stats.add(requests=1, bytes=len(response.content or b''))
+
+    def record_bytes(self, size):
+        '''
+        Count a number of bytes received for the current call, if there is
+        one.
+        '''
+        stats = self.current
+        if stats is not None:
+            stats.add(bytes=size)
+
+    def bind(self, func):
+        '''
+        Wrap a function so that, when it's run in another thread, what it
+        does is counted as part of the call in progress in this thread.
+        '''
+        stats = self.current
+        if stats is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = self.current
+            self._local.current = stats
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.current = previous
+        return wrapper
+
+    @contextmanager
+    def trace(self):
+        '''
+        Collect the :class:`CallStats` of all calls finished in this thread
+        within a block of code.
+
+        :returns: A list that is filled with :class:`CallStats`.
+        '''
+        trace = []
+        traces = getattr(self._local, 'traces', None)
+        if traces is None:
+            traces = self._local.traces = []
+        traces.append(trace)
+        try:
+            yield trace
+        finally:
+            traces.remove(trace)
+
+
+def instrumented_iterator(func):
+    '''
+    Decorator for the public methods of a provider that return an iterator,
+    recording every call with the :class:`Instrumentation` of the provider.
+    '''
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self.instrumentation.iterate(
+            func.__name__, func(self, *args, **kwargs),
+            self.get_vocabulary_id()
+        )
+    return wrapper
+
+
+def instrumented(func):
+    '''
+    Decorator for the public methods of a provider, recording every call
+    with the :class:`Instrumentation` of the provider.
+    '''
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.instrumentation.call(
+            func.__name__, self.get_vocabulary_id()
+        ):
+            return func(self, *args, **kwargs)
+    return wrapper
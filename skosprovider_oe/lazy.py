@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+'''
+Concepts and collections that only look up their relations when they're
+first needed.
+'''
+
+from skosprovider.skos import (
+    Collection,
+    Concept,
+    find_best_label_for_type,
+    label
+)
+
+
+class Deferred(object):
+    '''
+    An attribute of a lazy concept or collection that is resolved the first
+    time it's read and remembered from then on.
+
+    Attributes in the same group are resolved together, because they are
+    derived from the same terms.
+
+    :param str name: Name of the attribute.
+    :param str group: The group the attribute belongs to.
+    '''
+
+    def __init__(self, name, group):
+        self.name = name
+        self.group = group
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            obj.__dict__.update(obj._resolver(self.group))
+            return obj.__dict__[self.name]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+
+class LazyMixin(object):
+    '''
+    Turns the :class:`Deferred` attributes of a concept or collection into
+    attributes that are resolved on first access.
+
+    :param resolver: A callable that takes the name of a group of
+        :class:`Deferred` attributes and returns a dict with a value for
+        every attribute in the group.
+    '''
+
+    def _defer(self, resolver):
+        self._resolver = resolver
+        self._pref_labels = self.__dict__.pop('labels')
+        for cls in type(self).__mro__:
+            for attr in vars(cls).values():
+                if isinstance(attr, Deferred):
+                    self.__dict__.pop(attr.name, None)
+
+    def label(self, language='any'):
+        '''
+        Provide a single label, like :meth:`skosprovider.skos.Concept.label`.
+
+        When the preferred label is in the requested language, the
+        alternative labels don't need to be resolved.
+        '''
+        if 'labels' not in self.__dict__:
+            l = find_best_label_for_type(
+                self._pref_labels, language or 'und', 'prefLabel'
+            )
+            if l:
+                return l
+        return label(self.labels, language)
+
+    def is_resolved(self, name):
+        '''
+        Has an attribute been resolved yet?
+        '''
+        return name in self.__dict__
+
+
+class LazyConcept(LazyMixin, Concept, object):
+    '''
+    A :class:`skosprovider.skos.Concept` that resolves its labels, its
+    narrower concepts and subordinate arrays and its broader concepts and
+    collections when they're first needed.
+
+    :param resolver: See :class:`LazyMixin`.
+
+    All other parameters are those of :class:`skosprovider.skos.Concept`.
+    '''
+
+    labels = Deferred('labels', 'labels')
+    narrower = Deferred('narrower', 'narrower')
+    subordinate_arrays = Deferred('subordinate_arrays', 'narrower')
+    broader = Deferred('broader', 'broader')
+    member_of = Deferred('member_of', 'broader')
+
+    def __init__(self, resolver, *args, **kwargs):
+        Concept.__init__(self, *args, **kwargs)
+        self._defer(resolver)
+
+
+class LazyCollection(LazyMixin, Collection, object):
+    '''
+    A :class:`skosprovider.skos.Collection` that resolves its labels and
+    the collections and concepts above it when they're first needed.
+
+    :param resolver: See :class:`LazyMixin`.
+
+    All other parameters are those of :class:`skosprovider.skos.Collection`.
+    '''
+
+    labels = Deferred('labels', 'labels')
+    superordinates = Deferred('superordinates', 'broader')
+    member_of = Deferred('member_of', 'broader')
+
+    def __init__(self, resolver, *args, **kwargs):
+        Collection.__init__(self, *args, **kwargs)
+        self._defer(resolver)
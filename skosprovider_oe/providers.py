@@ -4,15 +4,77 @@ from skosprovider.providers import VocabularyProvider
 
 from skosprovider.skos import (
     Concept,
-    Collection
+    Collection,
+    dict_to_label
 )
 
-import requests
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    as_completed
+)
+
+import functools
+
+import itertools
+
+import os
+
+import threading
+
+import time
 
 import warnings
 
 from skosprovider.uri import UriPatternGenerator
 
+from skosprovider_oe.cache import (
+    SingleFlight,
+    TermCache
+)
+
+from skosprovider_oe.delta import (
+    Changes,
+    diff_listings,
+    listing_state
+)
+
+from skosprovider_oe.display import (
+    DisplayTree,
+    build_node
+)
+
+from skosprovider_oe.hierarchy import HierarchyClosure
+
+from skosprovider_oe.http import (
+    DEFAULT_TIMEOUT,
+    build_adapter,
+    build_session,
+    iter_json_array
+)
+
+from skosprovider_oe.instrumentation import (
+    Instrumentation,
+    instrumented,
+    instrumented_iterator
+)
+
+from skosprovider_oe.lazy import (
+    LazyCollection,
+    LazyConcept
+)
+
+from skosprovider_oe.record import TermRecord
+
+from skosprovider_oe.refresh import RefreshWorker
+
+from skosprovider_oe.search import LabelIndex
+
+from skosprovider_oe.snapshot import (
+    ThesaurusIndex,
+    read_snapshot,
+    write_snapshot
+)
+
 
 class OnroerendErfgoedProvider(VocabularyProvider):
     '''A provider that can work with the REST-services of
@@ -25,7 +87,152 @@ class OnroerendErfgoedProvider(VocabularyProvider):
     A :class:`requests.Session`
     '''
 
+    cache = None
+    '''
+    A :class:`~skosprovider_oe.cache.CacheBackend` or `None` if terms are
+    not being cached.
+    '''
+
+    http_cache = None
+    '''
+    A :class:`~skosprovider_oe.http.CachingAdapter` mounted on the
+    :attr:`session` or `None` if HTTP responses are not being cached.
+    '''
+
+    single_flight = None
+    '''
+    A :class:`~skosprovider_oe.cache.SingleFlight` that coalesces identical
+    concurrent requests or `None` if requests are not being coalesced.
+    '''
+
+    closure = None
+    '''
+    A :class:`~skosprovider_oe.hierarchy.HierarchyClosure` with the part of
+    the hierarchy that is known from the terms in the :attr:`cache`, or
+    `None` if terms are not being cached. What it knows expires along with
+    the terms in the cache and it keeps track of at most as many terms as
+    the cache can hold.
+    '''
+
+    memos = None
+    '''
+    A :class:`~skosprovider_oe.cache.TermCache` with what was derived from
+    the terms in the :attr:`cache`, such as display nodes, subtrees and
+    lists of terms, or `None` if terms are not being cached. Like the
+    :attr:`closure`, it belongs to this provider, expires along with the
+    terms in the cache and holds at most as many entries as the cache.
+    '''
+
+    index = None
+    '''
+    A :class:`~skosprovider_oe.snapshot.ThesaurusIndex` with a snapshot of
+    the entire thesaurus or `None` if no snapshot has been loaded.
+    '''
+
+    stream_chunk_size = 64 * 1024
+    '''
+    Number of bytes read at a time when streaming a list of terms.
+    '''
+
+    instrumentation = None
+    '''
+    An :class:`~skosprovider_oe.instrumentation.Instrumentation` that records
+    the requests and timings of every call to a public method.
+    '''
+
+    refresher = None
+    '''
+    A :class:`~skosprovider_oe.refresh.RefreshWorker` that refreshes
+    expired entries of the :attr:`cache` in the background or `None` if
+    stale entries are not being served.
+    '''
+
     def __init__(self, metadata, **kwargs):
+        '''
+        :param dict metadata: Metadata for this provider.
+        :param str base_url: A pattern for the url of a thesaurus, with a
+            `%s` placeholder for the name of the thesaurus.
+        :param str thesaurus: Name of the thesaurus. Defaults to `typologie`.
+        :param str url: Url of the thesaurus. Overrides `base_url` and
+            `thesaurus`.
+        :param cache: Set to `True` to cache terms fetched from the service
+            in memory or pass a :class:`~skosprovider_oe.cache.CacheBackend`
+            to use (and possibly share) a specific cache, eg. a
+            :class:`~skosprovider_oe.cache.SQLiteCache` shared by all
+            processes on a host.
+        :param int cache_maxsize: Maximum number of terms to keep in the cache
+            if `cache` is `True`. Defaults to 1000.
+        :param float cache_ttl: Number of seconds a term is kept in the cache
+            if `cache` is `True`. Defaults to `None`, never expire.
+        :param bool snapshot: Set to `True` to load the entire thesaurus in
+            memory the first time it's needed and answer all further calls
+            from this snapshot, without accessing the service.
+        :param float snapshot_ttl: Number of seconds after which a snapshot is
+            reloaded. The snapshot is reloaded by a separate thread while
+            the old one is still used. Defaults to `None`, only reload when
+            :meth:`refresh_snapshot` is called.
+        :param str snapshot_file: Path to a snapshot file. When the file
+            exists and holds a snapshot of this thesaurus, the snapshot is
+            loaded from it instead of from the service. Every time a snapshot
+            is fetched from the service, it's written to this file. Implies
+            `snapshot`.
+        :param int max_workers: Maximum number of terms to fetch in parallel.
+            Defaults to 10.
+        :param fetch_executor: A :class:`concurrent.futures.Executor` to
+            fetch terms in parallel with, eg. to share a pool of threads
+            between providers. By default every provider starts its own pool
+            of `max_workers` threads when needed.
+        :param bool coalesce_requests: Let identical requests that are
+            performed at the same time share a single call to the service.
+            Defaults to `True`.
+        :param http_cache: Set to `True` to cache HTTP responses and
+            revalidate them with conditional requests or pass a
+            :class:`~skosprovider_oe.http.CachingAdapter` to use.
+        :param bool local_search: Search for labels in a local index instead
+            of through the service. Matches on preferred and alternative
+            labels, ignoring case and accents, and ranks the results.
+            Implies `snapshot`.
+        :param session: A :class:`requests.Session` to use, eg. one built by
+            :func:`~skosprovider_oe.http.build_session` and shared by
+            several providers so they reuse the same connections. The
+            `pool_connections`, `pool_maxsize`, `retries` and
+            `backoff_factor` parameters are ignored for such a session. An
+            `http_cache` passed along with it must already be mounted on it,
+            so the adapters of the session are never replaced.
+        :param int pool_connections: Number of hosts to keep a pool of
+            connections for. Defaults to 10.
+        :param int pool_maxsize: Maximum number of connections kept open to
+            a single host. Defaults to `max_workers` or 10, whichever is
+            larger.
+        :param int retries: Maximum number of times a request that failed
+            because of a connection error or a server error is retried.
+            Defaults to 3, set to 0 to disable retrying.
+        :param float backoff_factor: Base for the exponentially growing time
+            between retries. Defaults to 0.5.
+        :param timeout: Timeout in seconds for requests to the service, as a
+            single number or a tuple of a connect and a read timeout.
+            Defaults to :data:`~skosprovider_oe.http.DEFAULT_TIMEOUT`.
+        :param instrumentation: An
+            :class:`~skosprovider_oe.instrumentation.Instrumentation` to
+            record calls with, eg. to share it between providers. By default
+            every provider gets its own.
+        :param bool lazy: Let :meth:`get_by_id` and :meth:`get_by_ids`
+            return a :class:`~skosprovider_oe.lazy.LazyConcept` or
+            :class:`~skosprovider_oe.lazy.LazyCollection` that only looks up
+            its alternative labels, narrower terms and broader terms when
+            they're first used. Defaults to `False`.
+        :param bool stale_while_revalidate: Keep serving terms, lists of
+            terms and subtrees from the :attr:`cache` after they have
+            expired, while a background thread fetches them again. When the
+            service is slow or down, calls keep being answered from the
+            cache. Implies `cache`, `cache_ttl` determines when entries
+            expire.
+        :param float max_stale: Maximum number of seconds an expired entry
+            is served for when it can't be refreshed. After that it's
+            fetched again before answering. Defaults to `None`, no maximum.
+        :param float refresh_rate: Maximum number of background refreshes
+            per second. Defaults to 10.
+        '''
         if not 'default_language' in metadata:
             metadata['default_language'] = 'nl'
         if 'base_url' in kwargs:
@@ -40,17 +247,410 @@ class OnroerendErfgoedProvider(VocabularyProvider):
             self.url = self.base_url % self.thesaurus
         else:
             self.url = kwargs['url']
-        self.session = requests.Session()
+        self.max_workers = kwargs.get('max_workers', 10)
+        self.timeout = kwargs.get('timeout', DEFAULT_TIMEOUT)
+        http_cache = kwargs.get('http_cache', None)
+        if http_cache is True:
+            http_cache = build_adapter(
+                http_cache=True, **self._get_pool_args(kwargs)
+            )
+        session = kwargs.get('session', None)
+        if session is None:
+            self.session = build_session(
+                http_cache or build_adapter(**self._get_pool_args(kwargs))
+            )
+        else:
+            if http_cache and \
+               http_cache not in getattr(session, 'adapters', {}).values():
+                raise ValueError(
+                    'The http_cache must be mounted on the session, eg. '
+                    'with build_session(http_cache).'
+                )
+            self.session = session
+        if http_cache:
+            self.http_cache = http_cache
+        stale_while_revalidate = kwargs.get('stale_while_revalidate', False)
+        cache = kwargs.get('cache', None)
+        if cache is True or (cache is None and stale_while_revalidate):
+            self.cache = TermCache(
+                maxsize=kwargs.get('cache_maxsize', 1000),
+                ttl=kwargs.get('cache_ttl', None)
+            )
+        elif cache is not None and cache is not False:
+            self.cache = cache
+        if self.cache is not None:
+            self.closure = HierarchyClosure(
+                maxsize=getattr(self.cache, 'maxsize', None),
+                ttl=getattr(self.cache, 'ttl', None),
+                timer=getattr(self.cache, 'timer', time.time)
+            )
+            self.memos = TermCache(
+                maxsize=getattr(self.cache, 'maxsize', None),
+                ttl=getattr(self.cache, 'ttl', None),
+                timer=getattr(self.cache, 'timer', time.time)
+            )
+            if stale_while_revalidate:
+                self.refresher = RefreshWorker(
+                    rate=kwargs.get('refresh_rate', 10)
+                )
+        self.max_stale = kwargs.get('max_stale', None)
+        self.snapshot_file = kwargs.get('snapshot_file', None)
+        self.local_search = kwargs.get('local_search', False)
+        self._label_index = None
+        self._display_tree = None
+        self._listing_state = None
+        self._list_keys = set()
+        self.snapshot = (
+            kwargs.get('snapshot', False) or
+            bool(self.snapshot_file) or
+            self.local_search
+        )
+        self.snapshot_ttl = kwargs.get('snapshot_ttl', None)
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_reload = None
+        self._snapshot_retry = 0
+        self._snapshot_delay = 0
+        self._executor = kwargs.get('fetch_executor', None)
+        self._owns_executor = self._executor is None
+        self._executor_lock = threading.Lock()
+        if kwargs.get('coalesce_requests', True):
+            self.single_flight = SingleFlight()
+        self.lazy = kwargs.get('lazy', False)
+        self.instrumentation = kwargs.get('instrumentation', None)
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
         super(OnroerendErfgoedProvider, self).__init__(metadata, **kwargs)
 
+    def _get_pool_args(self, kwargs):
+        '''
+        Get the arguments for :func:`~skosprovider_oe.http.build_adapter`
+        from the arguments passed to the constructor.
+        '''
+        return {
+            'pool_connections': kwargs.get('pool_connections', 10),
+            'pool_maxsize': kwargs.get(
+                'pool_maxsize', max(10, self.max_workers)
+            ),
+            'retries': kwargs.get('retries', 3),
+            'backoff_factor': kwargs.get('backoff_factor', 0.5)
+        }
+
+    @instrumented
     def get_by_id(self, id):
-        url = (self.url + '/%s.json') % id
-        r = self.session.get(url)
-        if r.status_code == 404:
-            return False
-        result = r.json()
-        if result['term_type'] == 'ND':
-            return self.get_by_id(result['use'])
+        return self.get_by_ids([id])[0]
+
+    @instrumented
+    def get_by_ids(self, ids):
+        '''
+        Get all information on a number of concepts or collections at once.
+
+        All terms needed to build the concepts and collections are fetched in
+        batches, with the terms in a batch being fetched in parallel by a
+        pool of `max_workers` threads.
+
+        :param list ids: A list of concept or collection ids.
+        :rtype: A list with a :class:`skosprovider.skos.Concept` or
+            :class:`skosprovider.skos.Collection` for every id, in the same
+            order as the ids. Unknown ids result in `False`.
+        '''
+        results = self._get_preferred_terms(ids)
+        if self.lazy:
+            return [self._build_lazy(r) if r else False for r in results]
+        terms = self._get_terms_by_ids(
+            [tid for r in results if r for tid in self._get_related_ids(r)] +
+            [r['broader_term'] for r in results if r and 'broader_term' in r]
+        )
+        broader = self._get_broader_terms(results, terms)
+        with self.instrumentation.timer('build_time'):
+            return [
+                self._from_dict(
+                    self._build_concept(r, b[0], b[1], terms)
+                ) if r else False
+                for r, b in zip(results, broader)
+            ]
+
+    def _build_lazy(self, result):
+        '''
+        Build a lazy concept or collection from a term, deferring everything
+        that depends on other terms.
+        '''
+        return self._from_dict(
+            self._build_term(result),
+            functools.partial(self._resolve_deferred, result)
+        )
+
+    def _resolve_deferred(self, result, group):
+        '''
+        Resolve a group of deferred attributes of a
+        :class:`~skosprovider_oe.lazy.LazyConcept` or
+        :class:`~skosprovider_oe.lazy.LazyCollection`.
+
+        :param dict result: The term the concept or collection was built
+            from.
+        :param str group: `labels`, `narrower` or `broader`.
+        :rtype: A dict mapping the names of the attributes to their values.
+        '''
+        with self.instrumentation.call('resolve', self.get_vocabulary_id()):
+            if group == 'labels':
+                terms = self._get_terms_by_ids(result.get('use_for', []))
+                labels = self._build_term(result)['labels']
+                labels.extend(self._build_alt_labels(result, terms))
+                return {'labels': [dict_to_label(l) for l in labels]}
+            if group == 'narrower':
+                terms = self._get_terms_by_ids(result.get('narrower_terms', []))
+                concept = self._build_narrower(result, terms)
+                return {
+                    'narrower': concept.get('narrower', []),
+                    'subordinate_arrays': concept.get('subordinate', [])
+                }
+            terms = self._get_terms_by_ids(
+                [result['broader_term']] if 'broader_term' in result else []
+            )
+            broader, ancestor = self._get_broader_terms([result], terms)[0]
+            concept = self._build_broader(broader, ancestor)
+            key = 'broader' if result['term_type'] == 'PT' else 'superordinates'
+            return {
+                key: concept.get('broader', []),
+                'member_of': concept.get('member_of', [])
+            }
+
+    def _get_preferred_terms(self, ids):
+        '''
+        Load a number of terms, replacing every non-descriptor by the term
+        it should be replaced by.
+
+        :returns: A list with a term or `False` for every id.
+        '''
+        targets = []
+        for id in ids:
+            use = self._get_memo('use', id)
+            targets.append(id if use is None else use)
+        terms = self._get_terms_by_ids(targets)
+        results = [terms[str(id)] for id in targets]
+        if any(r and r['term_type'] == 'ND' for r in results):
+            while any(r and r['term_type'] == 'ND' for r in results):
+                terms = self._get_terms_by_ids([
+                    r['use'] for r in results if r and r['term_type'] == 'ND'
+                ])
+                results = [
+                    terms[str(r['use'])] if r and r['term_type'] == 'ND' else r
+                    for r in results
+                ]
+        for id, r in zip(ids, results):
+            if r:
+                self._set_memo('use', id, r['id'])
+        return results
+
+    def _get_broader_terms(self, results, terms):
+        '''
+        Look up the broader term of a number of terms. When a broader term is
+        a collection (a guide term), also look for the nearest concept above
+        it. The hierarchy is walked upwards one level at a time for all terms
+        together.
+
+        The nearest concept above a guide term is remembered for every guide
+        term that was passed, so siblings and other terms below the same guide
+        terms don't need to walk the hierarchy again.
+
+        :param list results: A list of terms.
+        :param dict terms: A dict mapping stringified ids to terms that
+            contains the broader terms of all results.
+        :returns: A list with, for every term, a tuple of the broader term and
+            the id of the nearest concept above the term. Both can be `None`.
+        '''
+        broader = [
+            terms[str(r['broader_term'])] if r and 'broader_term' in r else None
+            for r in results
+        ]
+        # Should not be possible, but you never know
+        if any(b and b['term_type'] == 'ND' for b in broader): # pragma: no cover
+            used = self._get_terms_by_ids([
+                b['use'] for b in broader if b and b['term_type'] == 'ND'
+            ])
+            broader = [
+                used[str(b['use'])] if b and b['term_type'] == 'ND' else b
+                for b in broader
+            ]
+        ancestors = [
+            b['id'] if b and b['term_type'] == 'PT' else None for b in broader
+        ]
+        current = {}
+        for i, b in enumerate(broader):
+            if b and b['term_type'] != 'PT':
+                ancestor = self._get_memo('ancestor', b['id'])
+                if ancestor is None:
+                    current[i] = (b, [b['id']])
+                else:
+                    ancestors[i] = ancestor or None
+        while current:
+            parents = self._get_terms_by_ids([
+                c['broader_term'] for c, path in current.values()
+                if 'broader_term' in c
+            ])
+            pending = {}
+            for i, (c, path) in current.items():
+                bt = parents[str(c['broader_term'])] if 'broader_term' in c else None
+                if bt and bt['term_type'] == 'PT':
+                    ancestor = bt['id']
+                elif bt:
+                    ancestor = self._get_memo('ancestor', bt['id'])
+                    if ancestor is None:
+                        pending[i] = (bt, path + [bt['id']])
+                        continue
+                    ancestor = ancestor or None
+                else:
+                    ancestor = None
+                ancestors[i] = ancestor
+                for gid in path:
+                    self._set_memo('ancestor', gid, ancestor or False)
+            current = pending
+        return list(zip(broader, ancestors))
+
+    def _get_memo(self, kind, id):
+        '''
+        Look up something that was derived from the terms in the
+        :attr:`cache`, such as the nearest concept above a guide term (an
+        `ancestor`) or the preferred term to `use` for a term, which is the
+        term itself unless it's a non-descriptor.
+
+        Derived values are kept in the :attr:`memos`, apart from the terms,
+        so they don't take up room in the :attr:`cache` or count as hits or
+        misses of it.
+
+        :returns: The value or `None` if it's unknown or nothing is being
+            cached.
+        '''
+        if self.memos is None:
+            return None
+        return self.memos.get((self.url, kind, str(id)))
+
+    def _set_memo(self, kind, id, value):
+        if self.memos is not None:
+            self.memos.set((self.url, kind, str(id)), value)
+
+    def _get_terms_by_ids(self, ids):
+        '''
+        Load a number of terms in parallel.
+
+        :returns: A dict mapping the stringified ids to the terms as returned
+            by :meth:`_get_term_by_id`.
+        '''
+        unique = []
+        seen = set()
+        for id in ids:
+            if str(id) not in seen:
+                seen.add(str(id))
+                unique.append(str(id))
+        if len(unique) > 1 and self.max_workers > 1 and self._get_index() is None:
+            terms = self._get_executor().map(
+                self.instrumentation.bind(self._get_term_by_id), unique
+            )
+        else:
+            terms = map(self._get_term_by_id, unique)
+        return dict(zip(unique, terms))
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def _fetch_terms(self, ids, fetch=None, fetched=None):
+        '''
+        Fetch a number of terms in parallel, using the pool of `max_workers`
+        threads.
+
+        :param list ids: Ids of the terms.
+        :param fetch: A callable fetching a term by its id. Defaults to
+            requesting `/<id>.json`.
+        :param fetched: A callable that is called with the stringified id
+            and the term every time a term has been fetched.
+        :returns: A tuple of a dict mapping the stringified ids to the
+            terms, `False` for terms that do not exist, and a dict mapping
+            the stringified ids of the terms that could not be fetched to
+            the exception that was raised.
+        '''
+        if fetch is None:
+            fetch = lambda id: self._request((self.url + '/%s.json') % id)
+        fetch = self.instrumentation.bind(fetch)
+        terms = {}
+        failed = {}
+
+        def done(id, get):
+            try:
+                term = get()
+            except Exception as e:
+                failed[id] = e
+                return
+            terms[id] = term
+            if fetched is not None:
+                fetched(id, term)
+
+        if len(ids) > 1 and self.max_workers > 1:
+            executor = self._get_executor()
+            futures = dict(
+                (executor.submit(fetch, id), str(id)) for id in ids
+            )
+            for future in as_completed(futures):
+                done(futures[future], future.result)
+        else:
+            for id in ids:
+                done(str(id), functools.partial(fetch, id))
+        return terms, failed
+
+    def close(self):
+        '''
+        Stop the threads used for fetching terms in parallel, unless they
+        were passed as `fetch_executor`, and the thread refreshing stale
+        entries.
+        '''
+        reload = self._snapshot_reload
+        if reload is not None:
+            reload.join()
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown()
+            self._executor = None
+        if self.refresher is not None:
+            self.refresher.close()
+            self.refresher = RefreshWorker(rate=self.refresher.rate)
+
+    def _get_related_ids(self, result):
+        '''
+        Determine what other terms are needed to build a concept or
+        collection: the narrower terms of a concept, to distinguish narrower
+        concepts from subordinate arrays, and the non-descriptors that provide
+        the alternative labels.
+        '''
+        ids = []
+        if 'narrower_terms' in result and result['term_type'] == 'PT':
+            ids.extend(result['narrower_terms'])
+        if 'use_for' in result:
+            ids.extend(result['use_for'])
+        return ids
+
+    def _build_concept(self, result, broader, ancestor, terms):
+        '''
+        Build the dict representation of a concept or collection.
+
+        :param dict result: The term as returned by the service.
+        :param dict broader: The broader term or `None`.
+        :param ancestor: Id of the nearest concept above the term or `None`.
+        :param dict terms: A dict mapping stringified ids to the terms listed
+            by :meth:`_get_related_ids`.
+        '''
+        concept = self._build_term(result)
+        concept['labels'].extend(self._build_alt_labels(result, terms))
+        concept.update(self._build_broader(broader, ancestor))
+        if concept['type'] == 'concept':
+            concept.update(self._build_narrower(result, terms))
+        return concept
+
+    def _build_term(self, result):
+        '''
+        Build the part of the dict representation of a concept or collection
+        that only depends on the term itself.
+        '''
         concept = {}
         concept['id'] = result['id']
         concept['uri'] = result['uri']
@@ -63,48 +663,8 @@ class OnroerendErfgoedProvider(VocabularyProvider):
                 'label': result['term']
             }
         )
-        if 'broader_term' in result:
-            term = self._get_term_by_id(result['broader_term'])
-            # Should not be possible, but you never know
-            if term['term_type'] == 'ND': # pragma: no cover
-                term = self._get_term_by_id(term['use'])
-            if term['term_type'] == 'PT':
-                concept['broader'] = [term['id']]
-            else:
-                concept['member_of'] = [term['id']]
-                if 'broader_term' in term:
-                    bt = self._get_term_by_id(term['broader_term'])
-                else:
-                    bt = False
-                while bt:
-                    if bt['term_type'] == 'PT':
-                        concept['broader'] = [bt['id']]
-                        bt = False
-                    else:
-                        if 'broader_term' in bt:
-                            bt = self._get_term_by_id(bt['broader_term'])
-                        else:
-                            bt = False
-        if 'narrower_terms' in result:
-            if concept['type'] == 'concept':
-                for narrower_term in result['narrower_terms']:
-                    nt = self._get_term_by_id(narrower_term)
-                    if nt['term_type'] == 'PT': # concept
-                        concept['narrower'] = concept['narrower'] + [narrower_term] if 'narrower' in concept else [narrower_term]
-                    else:
-                        concept['subordinate'] = concept['subordinate'] + [narrower_term] if 'subordinate' in concept else [narrower_term]
-            else:
-                concept['members'] = result['narrower_terms']
-        if 'use_for' in result:
-            for t in result['use_for']:
-                term = self._get_term_by_id(t)
-                concept['labels'].append(
-                    {
-                        'type': 'altLabel',
-                        'language': term['language'],
-                        'label': term['term']
-                    }
-                )
+        if 'narrower_terms' in result and concept['type'] == 'collection':
+            concept['members'] = result['narrower_terms']
         if 'related_terms' in result:
             concept['related'] = result['related_terms']
         concept['notes'] = []
@@ -125,8 +685,57 @@ class OnroerendErfgoedProvider(VocabularyProvider):
             concept['sources'].append({'citation': result['source_note']})
         if concept['type'] == 'concept' and 'matches' in result and result['matches']:
             concept['matches'] = result['matches']
-        return self._from_dict(concept)
+        return concept
+
+    def _build_alt_labels(self, result, terms):
+        '''
+        Build the alternative labels of a term from its non-descriptors.
+
+        :param dict terms: A dict mapping stringified ids to terms that
+            contains the non-descriptors of the term.
+        '''
+        return [
+            {
+                'type': 'altLabel',
+                'language': terms[str(t)]['language'],
+                'label': terms[str(t)]['term']
+            } for t in result.get('use_for', [])
+        ]
+
+    def _build_broader(self, broader, ancestor):
+        '''
+        Build the `member_of` and `broader` parts of the dict representation
+        of a concept or collection.
+
+        :param dict broader: The broader term or `None`.
+        :param ancestor: Id of the nearest concept above the term or `None`.
+        '''
+        concept = {}
+        if broader:
+            if broader['term_type'] != 'PT':
+                concept['member_of'] = [broader['id']]
+            if ancestor is not None:
+                concept['broader'] = [ancestor]
+        return concept
 
+    def _build_narrower(self, result, terms):
+        '''
+        Build the `narrower` and `subordinate` parts of the dict
+        representation of a concept.
+
+        :param dict terms: A dict mapping stringified ids to terms that
+            contains the narrower terms of the concept.
+        '''
+        concept = {}
+        for narrower_term in result.get('narrower_terms', []):
+            nt = terms[str(narrower_term)]
+            if nt['term_type'] == 'PT': # concept
+                concept['narrower'] = concept['narrower'] + [narrower_term] if 'narrower' in concept else [narrower_term]
+            else:
+                concept['subordinate'] = concept['subordinate'] + [narrower_term] if 'subordinate' in concept else [narrower_term]
+        return concept
+
+    @instrumented
     def get_by_uri(self, uri):
         warnings.warn(
             'This provider currently does not fully support URIs,\
@@ -136,9 +745,19 @@ class OnroerendErfgoedProvider(VocabularyProvider):
         )
         return False
 
-    def _from_dict(self, concept):
+    def _from_dict(self, concept, resolver=None):
+        '''
+        Build a concept or collection from its dict representation.
+
+        :param resolver: If passed, a lazy concept or collection is built
+            that resolves the attributes missing from the dict through this
+            callable, see :class:`~skosprovider_oe.lazy.LazyMixin`.
+        '''
         if concept['type'] == 'concept':
-            return Concept(
+            cls = Concept
+            if resolver is not None:
+                cls = functools.partial(LazyConcept, resolver)
+            return cls(
                 id = concept['id'],
                 uri= concept['uri'],
                 labels = concept['labels'] if 'labels' in concept else [],
@@ -153,7 +772,10 @@ class OnroerendErfgoedProvider(VocabularyProvider):
                 concept_scheme = self.concept_scheme
             )
         else:
-            return Collection(
+            cls = Collection
+            if resolver is not None:
+                cls = functools.partial(LazyCollection, resolver)
+            return cls(
                 id = concept['id'],
                 uri = concept['uri'],
                 labels = concept['labels'] if 'labels' in concept else [],
@@ -166,66 +788,698 @@ class OnroerendErfgoedProvider(VocabularyProvider):
 
     def _get_term_by_id(self, id):
         '''Simple utility function to load a term.
+
+        Terms are looked up in the snapshot or the :attr:`cache` first, if
+        there is one.
+
+        :returns: A dict as returned by the service or `False` if the term
+            does not exist.
         '''
-        url = (self.url + '/%s.json') % id
-        r = self.session.get(url)
-        return r.json()
+        index = self._get_index()
+        if index is not None:
+            return index.get_term(id)
+        if self.cache is not None:
+            term = self._get_cached(
+                (self.url, str(id)),
+                functools.partial(self._fetch_term, id),
+                functools.partial(self._refresh_term, id)
+            )
+            if term and term['term_type'] != 'ND':
+                self.closure.add_term(term['id'], term.get('narrower_terms', []))
+            return term
+        return self._request((self.url + '/%s.json') % id)
+
+    def _fetch_term(self, id):
+        return TermRecord.from_dict(
+            self._request((self.url + '/%s.json') % id)
+        ) or False
+
+    def _refresh_term(self, id):
+        '''
+        Fetch a cached term again. If it has changed, everything derived
+        from it is forgotten.
+        '''
+        key = (self.url, str(id))
+        term = self._fetch_term(id)
+        cached = self.cache.get_stale(key)[0]
+        if cached is not None and cached != term:
+            self._invalidate_term(id)
+        if term:
+            self.cache.set(key, term)
 
-    def find(self, query):
-        return self._do_query(query)
+    def _get_cached(self, key, fetch, refresh=None, store=None):
+        '''
+        Look something up in the :attr:`cache`, fetching it when it's not
+        there.
+
+        When serving stale entries, an expired entry is returned as it is
+        and refreshed by the :attr:`refresher`, unless it has been expired
+        for more than `max_stale` seconds.
 
+        :param tuple key: The key in the cache.
+        :param fetch: A callable fetching the value, returning `False` if
+            it does not exist.
+        :param refresh: A callable refreshing the entry. Defaults to
+            fetching the value and storing it.
+        :param store: Where to look, the :attr:`cache` by default or the
+            :attr:`memos`.
+        :returns: The value or `False`.
+        '''
+        if store is None:
+            store = self.cache
+        if self.refresher is None:
+            value, expired = store.get(key), False
+        else:
+            value, expired = store.get_stale(key, self.max_stale)
+        if value is None:
+            value = fetch()
+            if value is not False and value is not None:
+                store.set(key, value)
+        elif expired:
+            if refresh is None:
+                refresh = functools.partial(
+                    self._refresh_entry, key, fetch, store
+                )
+            self.refresher.submit(key, refresh)
+        return value
+
+    def _refresh_entry(self, key, fetch, store):
+        value = fetch()
+        if value is False or value is None:
+            store.delete(key)
+        else:
+            store.set(key, value)
+
+    def _request(self, url, params=None):
+        '''Simple utility function to perform a request on the service.
+
+        Identical requests performed at the same time by different threads
+        share a single call to the service, unless request coalescing has
+        been disabled.
+
+        :returns: The decoded JSON body of the response or `False` if the
+            service answered with a 404.
+        '''
+        if self.single_flight is None:
+            return self._fetch(url, params)
+        return self.single_flight.do(
+            _request_key(url, params), self._fetch, url, params
+        )
+
+    def _fetch(self, url, params=None, revalidate=False):
+        '''
+        Perform a request on the service.
+
+        :param bool revalidate: Ask the HTTP cache to revalidate a cached
+            response, even when it's still fresh.
+        '''
+        kwargs = {'params': params, 'timeout': self.timeout}
+        if revalidate:
+            kwargs['headers'] = {'Cache-Control': 'no-cache'}
+        r = self.session.get(url, **kwargs)
+        self.instrumentation.record_request(r)
+        if r.status_code == 404:
+            return False
+        with self.instrumentation.timer('decode_time'):
+            return r.json()
+
+    def _get_list(self, types, term=None):
+        '''Simple utility function to load a list of terms.
+
+        :returns: A list of dicts as returned by the `lijst.json` service.
+        '''
+        index = self._get_index()
+        if index is not None:
+            return index.get_list(types, term)
+        args = {'type[]': types}
+        if term is not None:
+            args['term'] = term
+        if self.refresher is not None:
+            key = (self.url, 'list', tuple(types), term)
+            self._list_keys.add(key)
+            return self._get_cached(
+                key,
+                functools.partial(
+                    self._request, self.url + '/lijst.json', params=args
+                ),
+                store=self.memos
+            )
+        return self._request(self.url + '/lijst.json', params=args)
+
+    def _iter_list(self, types, term=None):
+        '''Simple utility function to iterate over a list of terms.
+
+        Unlike :meth:`_get_list`, the response of the `lijst.json` service
+        is decoded while it's being received, one term at a time.
+
+        :returns: An iterator of dicts as returned by the `lijst.json`
+            service.
+        '''
+        index = self._get_index()
+        if index is not None:
+            for item in index.iter_list(types, term):
+                yield item
+            return
+        if self.refresher is not None:
+            for item in self._get_list(types, term):
+                yield item
+            return
+        args = {'type[]': types}
+        if term is not None:
+            args['term'] = term
+        r = self.session.get(
+            self.url + '/lijst.json',
+            params=args,
+            stream=True,
+            timeout=self.timeout
+        )
+        try:
+            self.instrumentation.record_request(r, stream=True)
+            if r.status_code == 404:
+                return
+            entry = getattr(r, 'cache_entry', None)
+            if entry is not None:
+                items = entry.json()
+            else:
+                items = iter_json_array(
+                    self._iter_content(r), r.encoding or 'utf-8'
+                )
+            for item in items:
+                yield item
+        finally:
+            r.close()
+
+    def _iter_content(self, response):
+        for chunk in response.iter_content(self.stream_chunk_size):
+            self.instrumentation.record_bytes(len(chunk))
+            yield chunk
+
+    def _get_subtree(self, id):
+        '''Simple utility function to load a subtree.
+
+        :returns: A list of ids or `False` if the term does not exist.
+        '''
+        index = self._get_index()
+        if index is not None:
+            return index.get_subtree(id)
+        if self.closure is not None:
+            subtree = self.closure.get_subtree(id)
+            if subtree is not None:
+                return subtree
+        fetch = functools.partial(
+            self._request, (self.url + '/%s/subtree.json') % id
+        )
+        if self.refresher is not None:
+            subtree = self._get_cached(
+                (self.url, 'subtree', str(id)), fetch, store=self.memos
+            )
+        else:
+            subtree = fetch()
+        if subtree and self.closure is not None:
+            self.closure.add_subtree(id, subtree)
+        return subtree
+
+    def _get_index(self):
+        '''
+        Get the snapshot this provider should use, loading or reloading it
+        when needed.
+
+        :rtype: :class:`~skosprovider_oe.snapshot.ThesaurusIndex` or `None`
+            if this provider is not working with a snapshot.
+        '''
+        if not self.snapshot:
+            return None
+        index = self.index
+        if index is None:
+            with self._snapshot_lock:
+                if self.index is None:
+                    if self.snapshot_file and \
+                       os.path.exists(self.snapshot_file):
+                        self.index = self._read_snapshot_file()
+                    if self.index is None:
+                        self.refresh_snapshot()
+                index = self.index
+        if self._snapshot_expired(index):
+            self._reload_snapshot(index)
+        return index
+
+    def _reload_snapshot(self, index):
+        '''
+        Start reloading an expired snapshot in a separate thread, unless it's
+        already being reloaded or a previous attempt failed too recently.
+        '''
+        with self._snapshot_lock:
+            if self.index is not index or \
+               self._snapshot_reload is not None or \
+               time.time() < self._snapshot_retry:
+                return
+            self._snapshot_reload = threading.Thread(
+                target=self._run_snapshot_reload
+            )
+            self._snapshot_reload.daemon = True
+            self._snapshot_reload.start()
+
+    def _run_snapshot_reload(self):
+        '''
+        Reload the snapshot. When this fails, the old snapshot is kept and
+        the next attempt is postponed, twice as long after every failure, up
+        to :attr:`snapshot_ttl`.
+        '''
+        try:
+            self.refresh_snapshot()
+            self._snapshot_delay = 0
+        except Exception as e:
+            self._snapshot_delay = min(
+                2 * self._snapshot_delay or 1.0, self.snapshot_ttl
+            )
+            self._snapshot_retry = time.time() + self._snapshot_delay
+            warnings.warn(
+                'Reloading the snapshot of %s failed, retrying in %s s: %s' %
+                (self.url, self._snapshot_delay, e),
+                RuntimeWarning
+            )
+        finally:
+            self._snapshot_reload = None
+
+    def _read_snapshot_file(self):
+        '''
+        Read the :attr:`snapshot_file`, unless it can't be read or holds a
+        snapshot of another thesaurus.
+
+        :returns: A :class:`~skosprovider_oe.snapshot.ThesaurusIndex` or
+            `None` if the snapshot should be fetched again.
+        '''
+        try:
+            index = read_snapshot(self.snapshot_file)
+        except ValueError as e:
+            warnings.warn(
+                'Snapshot %s can not be read, fetching it again: %s' %
+                (self.snapshot_file, e),
+                RuntimeWarning
+            )
+            return None
+        if index.url is not None and index.url != self.url:
+            warnings.warn(
+                'Snapshot %s belongs to %s instead of %s, fetching it '
+                'again.' % (self.snapshot_file, index.url, self.url),
+                RuntimeWarning
+            )
+            return None
+        return index
+
+    def _snapshot_expired(self, index):
+        return (
+            self.snapshot_ttl is not None and
+            time.time() - index.fetched > self.snapshot_ttl
+        )
+
+    def load_snapshot(self):
+        '''
+        Fetch all terms of the thesaurus from the service, in parallel.
+
+        :raises LookupError: If the thesaurus does not exist.
+        :rtype: :class:`~skosprovider_oe.snapshot.ThesaurusIndex`
+        '''
+        fetched = time.time()
+        items = self._request(
+            self.url + '/lijst.json',
+            params={'type[]': ['HR', 'PT', 'NL', 'ND']}
+        )
+        if items is False:
+            raise LookupError('Thesaurus %s does not exist.' % self.thesaurus)
+        ids = [str(item['id']) for item in items]
+        terms, failed = self._fetch_terms(ids)
+        if failed:
+            raise next(iter(failed.values()))
+        return ThesaurusIndex(
+            [terms[id] for id in ids if terms[id]],
+            fetched=fetched,
+            thesaurus=self.thesaurus,
+            url=self.url
+        )
+
+    def refresh_snapshot(self):
+        '''
+        (Re)load the snapshot of the thesaurus and start using it.
+
+        :rtype: :class:`~skosprovider_oe.snapshot.ThesaurusIndex`
+        '''
+        self.index = self.load_snapshot()
+        self.snapshot = True
+        if self.snapshot_file:
+            write_snapshot(self.index, self.snapshot_file)
+        return self.index
+
+    def save_snapshot(self, path):
+        '''
+        Write the current snapshot to a file. If this provider has no
+        snapshot, one is fetched from the service.
+
+        :param str path: Where to write the snapshot.
+        '''
+        index = self.index
+        if index is None:
+            index = self.load_snapshot()
+        write_snapshot(index, path)
+
+    @instrumented
+    def delta_refresh(self):
+        '''
+        Bring the snapshot or the cached terms up to date without fetching
+        the entire thesaurus again.
+
+        The list of all terms is fetched and compared with the snapshot or,
+        when terms are being cached, with the list fetched by the previous
+        call. Only new terms, terms with a new label or type and the terms
+        directly above terms that were added, removed or moved are fetched
+        again. Cached terms that changed are replaced or removed, and the
+        parts of the :attr:`closure` and the remembered ancestors that
+        depend on them are forgotten. In a snapshot, only the hierarchy,
+        labels and display nodes of the terms that changed are built again.
+
+        Without a snapshot, the first call only records the list of terms
+        to compare the next call with.
+
+        :raises LookupError: If the thesaurus does not exist.
+        :rtype: :class:`~skosprovider_oe.delta.Changes`
+        '''
+        items = self._fetch(
+            self.url + '/lijst.json',
+            params={'type[]': ['HR', 'PT', 'NL', 'ND']},
+            revalidate=True
+        )
+        if items is False:
+            raise LookupError('Thesaurus %s does not exist.' % self.thesaurus)
+        state = listing_state(items)
+        index = self.index if self.snapshot else None
+        if index is not None:
+            previous = listing_state(index.entries())
+        else:
+            previous = self._listing_state
+        self._listing_state = state
+        if previous is None:
+            if self.snapshot:
+                self.refresh_snapshot()
+                return Changes(added=[item['id'] for item in items])
+            return Changes()
+        changes = diff_listings(previous, state)
+        if not changes or (
+            index is None and self.cache is None and self.http_cache is None
+        ):
+            return changes
+        if index is not None:
+            get_previous = index.get_term
+        else:
+            get_previous = self._get_cached_term
+        terms = self._refetch(changes.added + changes.changed)
+        # A term that was removed after the list was fetched.
+        changes.added = [id for id in changes.added if terms[str(id)]]
+        changes.removed += [id for id in changes.changed if not terms[str(id)]]
+        changes.changed = [id for id in changes.changed if terms[str(id)]]
+        parents = []
+        for id in changes.removed + changes.changed:
+            old = get_previous(id) or {}
+            new = terms.get(str(id)) or {}
+            parent = old.get('broader_term')
+            if parent is None and self.closure is not None:
+                parent = self.closure.get_parent(id)
+            if parent != new.get('broader_term'):
+                parents.extend([parent, new.get('broader_term')])
+            if old.get('use') != new.get('use'):
+                parents.extend([old.get('use'), new.get('use')])
+        for id in changes.added:
+            new = terms[str(id)]
+            parents.extend([new.get('broader_term'), new.get('use')])
+        parents = [
+            p for p in set(parents)
+            if p is not None and str(p) in state and str(p) not in terms
+        ]
+        terms.update(self._refetch(parents))
+        changes.refetched = [t['id'] for t in terms.values() if t]
+        if index is not None:
+            self._update_snapshot(
+                index,
+                [t for t in terms.values() if t],
+                changes.removed + [k for k, t in terms.items() if not t]
+            )
+        elif self.cache is not None:
+            self.memos.delete((self.url, 'top', 'HR'))
+            for key in list(self._list_keys):
+                self.memos.delete(key)
+            for id in changes.removed + changes.changed + parents:
+                self._invalidate_term(id)
+            for key, term in terms.items():
+                if term:
+                    self.cache.set((self.url, key), TermRecord.from_dict(term))
+        return changes
+
+    def _update_snapshot(self, index, terms, removed):
+        '''
+        Start using a snapshot in which some terms were added, replaced or
+        removed. Only the parts of the label index and the display tree that
+        depend on these terms are built again.
+        '''
+        self.index = index.updated(terms, removed, fetched=time.time())
+        # The display node and labels of a term depend on the terms directly
+        # below it and on its non-descriptors.
+        ids = set()
+        for id in [t['id'] for t in terms] + list(removed):
+            new = self.index.get_term(id) or {}
+            ids.update([
+                id, index.get_broader(id), index.resolve(id),
+                new.get('broader_term'), new.get('use')
+            ])
+        ids = set(str(id) for id in ids if id is not None and id is not False)
+        label_index = self._label_index
+        if label_index is not None and label_index[0] is index:
+            self._label_index = (
+                self.index, label_index[1].updated(self.index, ids)
+            )
+        tree = self._display_tree
+        if tree is not None and tree.index is index:
+            self._display_tree = tree.updated(self.index, ids)
+        if self.snapshot_file:
+            write_snapshot(self.index, self.snapshot_file)
+
+    def _refetch(self, ids):
+        '''
+        Fetch a number of terms in parallel, revalidating cached responses.
+
+        :returns: A dict mapping the stringified ids to the terms.
+        '''
+        ids = [str(id) for id in ids]
+        fetch = self.instrumentation.bind(
+            lambda id: self._fetch(
+                (self.url + '/%s.json') % id, revalidate=True
+            )
+        )
+        if len(ids) > 1 and self.max_workers > 1:
+            terms = self._get_executor().map(fetch, ids)
+        else:
+            terms = map(fetch, ids)
+        return dict(zip(ids, terms))
+
+    def _get_cached_term(self, id):
+        if self.cache is None:
+            return None
+        return self.cache.get_stale((self.url, str(id)))[0]
+
+    def _invalidate_term(self, id):
+        '''
+        Remove a term from the :attr:`cache`, along with everything that was
+        derived from it.
+        '''
+        key = str(id)
+        for d in [id] + list(self.closure.get_descendants(id)):
+            self.memos.delete((self.url, 'ancestor', str(d)))
+        term = self._get_cached_term(id) or {}
+        # The subtrees of the term and of every term above it include it.
+        above = set(str(a) for a in self.closure.get_ancestors(id))
+        parent = term.get('broader_term')
+        while parent is not None and str(parent) not in above:
+            above.add(str(parent))
+            parent = (self._get_cached_term(parent) or {}).get('broader_term')
+        for a in above | set([key]):
+            self.memos.delete((self.url, 'subtree', a))
+        # The display node of the broader term depends on the type of the
+        # term, the one of a preferred term on its non-descriptors.
+        for d in (key, term.get('broader_term'), term.get('use')):
+            if d is not None:
+                self.memos.delete((self.url, 'display', str(d)))
+        self.cache.delete((self.url, key))
+        self.memos.delete((self.url, 'use', key))
+        self.closure.discard(id)
+
+    def clear_cache(self):
+        '''
+        Remove all terms of this thesaurus from the :attr:`cache` and forget
+        the hierarchy built from them. Terms of other thesauri in a shared
+        cache are kept.
+        '''
+        if self.cache is not None:
+            self.cache.clear(self.url)
+            self.closure.clear()
+            self.memos.clear(self.url)
+
+    @instrumented
+    def find(self, query, **kwargs):
+        '''
+        Find concepts and collections that match a query.
+
+        :param dict query: A query as described by
+            :meth:`skosprovider.providers.VocabularyProvider.find`.
+        :param int limit: Optional. Maximum number of results to return.
+        '''
+        return self._do_query(query, limit=kwargs.get('limit', None))
+
+    @instrumented
     def get_all(self):
         return self._do_query()
 
+    @instrumented_iterator
+    def iter_find(self, query, **kwargs):
+        '''
+        Iterate over the concepts and collections that match a query.
+
+        Unlike :meth:`find`, the results are produced while the response of
+        the service is being received and decoded, so memory use does not
+        depend on the size of the thesaurus and only the part of the response
+        that's needed is read.
+
+        :param dict query: A query as described by
+            :meth:`skosprovider.providers.VocabularyProvider.find`. An
+            unexisting collection only raises a :class:`ValueError` once
+            iterating starts.
+        :param int limit: Optional. Maximum number of results to return.
+        :param int offset: Optional. Number of results to skip.
+        :rtype: An iterator of dicts with an id and a label.
+        '''
+        return self._iter_query(
+            query,
+            limit=kwargs.get('limit', None),
+            offset=kwargs.get('offset', 0)
+        )
+
+    @instrumented_iterator
+    def iter_all(self, **kwargs):
+        '''
+        Iterate over all concepts and collections, like :meth:`iter_find`.
+
+        :param int limit: Optional. Maximum number of results to return.
+        :param int offset: Optional. Number of results to skip.
+        :rtype: An iterator of dicts with an id and a label.
+        '''
+        return self._iter_query(
+            limit=kwargs.get('limit', None),
+            offset=kwargs.get('offset', 0)
+        )
+
+    def _iter_query(self, query=None, limit=None, offset=0):
+        types, term = self._get_query_args(query)
+        if term is not None and self.local_search:
+            source = iter(self._get_label_index().search(term, types))
+        else:
+            source = self._iter_list(types, term)
+        try:
+            items = source
+            if query is not None and 'collection' in query:
+                members = self._get_collection_members(query['collection'])
+                items = (x for x in items if x['id'] in members)
+            stop = None if limit is None else offset + limit
+            for x in itertools.islice(items, offset, stop):
+                yield {
+                    'id': x['id'],
+                    'label': x['omschrijving']
+                }
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+
+    def _get_collection_members(self, collection):
+        '''
+        Determine the ids a query restricted to a collection should return.
+
+        :param dict collection: The `collection` part of a query passed to
+            :meth:`find`.
+        :rtype: set
+        '''
+        term = self._get_term_by_id(collection['id'])
+        while term and term['term_type'] == 'ND':
+            term = self._get_term_by_id(term['use'])
+        if not term or term['term_type'] == 'PT':
+            raise ValueError(
+                'You are searching for items in an unexisting collection.'
+            )
+        if collection.get('depth', None) == 'all':
+            return set(self._get_subtree(term['id']) or [])
+        return set(term.get('narrower_terms', []))
+
+    @instrumented
     def get_top_concepts(self, **kwargs):
         language = self._get_language(**kwargs)
-        url = self.url + '/lijst.json'
-        args = {'type[]': ['HR']}
-        r = self.session.get(url, params=args)
-        result = r.json()
-        items = result
-        top = self.get_by_id(items[0]['id'])
         res = []
         def expand_coll(res, coll):
-            for nid in coll.members:
-                c = self.get_by_id(nid)
-                if isinstance(c, Collection):
+            for c in self._get_display_nodes(coll.children):
+                if not c:
+                    continue
+                if c.type == 'collection':
                     res = expand_coll(res, c)
                 else:
-                    res.append({
-                        'id': c.id,
-                        'label': c.label(language)
-                    })
+                    res.append(c.display(language))
             return res
-        return expand_coll(res, top)
+        return expand_coll(res, self._get_top_node())
 
-    def _do_query(self, query=None):
-        url = self.url + '/lijst.json'
-        args = {'type[]': ['HR', 'PT', 'NL']}
+    def _do_query(self, query=None, limit=None):
+        types, term = self._get_query_args(query)
+        if term is not None and self.local_search:
+            items = self._get_label_index().search(term, types)
+        else:
+            items = self._get_list(types, term)
+        if query is not None and 'collection' in query:
+            #Restrict results to element of collection
+            members = self._get_collection_members(query['collection'])
+            items = [x for x in items if x['id'] in members]
+        if limit is not None:
+            items = items[:limit]
+        return self._format_items(items)
+
+    def _get_label_index(self):
+        '''
+        Get the :class:`~skosprovider_oe.search.LabelIndex` for the current
+        snapshot, building it when needed.
+        '''
+        index = self._get_index()
+        label_index = self._label_index
+        if label_index is None or label_index[0] is not index:
+            label_index = self._label_index = (index, LabelIndex(index))
+        return label_index[1]
+
+    def _get_query_args(self, query):
+        '''
+        Determine the term types and label to ask the `lijst.json` service
+        for, based on a query passed to :meth:`find`.
+
+        :returns: A tuple of a list of term types and a label or `None`.
+        '''
+        types = ['HR', 'PT', 'NL']
+        term = None
         if query is not None:
             if 'type' in query:
                 if query['type'] == 'collection':
-                    args['type[]'] = ['HR', 'NL']
+                    types = ['HR', 'NL']
                 elif query['type'] == 'concept':
-                    args['type[]'] = ['PT']
+                    types = ['PT']
             if 'label' in query:
-                args['term'] = query['label']
-        r = self.session.get(url, params=args)
-        result = r.json()
-        items = result
-        if query is not None and 'collection' in query:
-            #Restrict results to element of collection
-            coll = self.get_by_id(query['collection']['id'])
-            if not coll or not isinstance(coll, Collection):
-                raise ValueError(
-                    'You are searching for items in an unexisting collection.'
-                )
-            else:
-                if 'depth' in query['collection'] and query['collection']['depth'] == 'all':
-                    members = self.expand(coll.id)
-                else:
-                    members = coll.members
-            items = [x for x in items if x['id'] in members]
+                term = query['label']
+        return types, term
+
+    def _check_collection(self, coll):
+        if not coll or not isinstance(coll, Collection):
+            raise ValueError(
+                'You are searching for items in an unexisting collection.'
+            )
+
+    def _format_items(self, items):
         return [
             {
                 'id': x['id'],
@@ -233,16 +1487,15 @@ class OnroerendErfgoedProvider(VocabularyProvider):
             } for x in items
         ]
 
+    @instrumented
     def expand_concept(self, id):
         return self.expand(id)
 
+    @instrumented
     def expand(self, id):
-        url = (self.url + '/%s/subtree.json') % id
-        r = self.session.get(url)
-        if r.status_code == 404:
-            return False
-        return r.json()
+        return self._get_subtree(id)
 
+    @instrumented
     def get_top_display(self, **kwargs):
         '''
         Returns all concepts or collections that form the top-level of a display
@@ -257,23 +1510,13 @@ class OnroerendErfgoedProvider(VocabularyProvider):
             and falls back to `en` if nothing is present.
         '''
         language = self._get_language(**kwargs)
-        url = self.url + '/lijst.json'
-        args = {'type[]': ['HR']}
-        r = self.session.get(url, params=args)
-        result = r.json()
-        items = result
-        top = self.get_by_id(items[0]['id'])
-        res = []
-        def expand_coll(res, coll):
-            for nid in coll.members:
-                c = self.get_by_id(nid)
-                res.append({
-                    'id': c.id,
-                    'label': c.label(language)
-                })
-            return res
-        return expand_coll(res, top)
+        top = self._get_top_node()
+        return [
+            c.display(language)
+            for c in self._get_display_nodes(top.children) if c
+        ]
 
+    @instrumented
     def get_children_display(self, id, **kwargs):
         '''
         Return a list of concepts or collections that should be displayed
@@ -287,20 +1530,91 @@ class OnroerendErfgoedProvider(VocabularyProvider):
             exist, return `False`.
         '''
         language = self._get_language(**kwargs)
-        item = self.get_by_id(id)
-        res = []
-        if isinstance(item, Collection):
-            for mid in item.members:
-                m = self.get_by_id(mid)
-                res.append({
-                    'id': m.id,
-                    'label': m.label(language)
-                })
-        else:
-            for cid in item.narrower:
-                c = self.get_by_id(cid)
-                res.append({
-                    'id': c.id,
-                    'label': c.label(language)
-                })
-        return res
+        node = self._get_display_nodes([id])[0]
+        if not node:
+            return False
+        return [
+            c.display(language)
+            for c in self._get_display_nodes(node.children) if c
+        ]
+
+    def _get_top_node(self):
+        '''
+        Get the display node of the top term (`HR`) of the thesaurus.
+        '''
+        tree = self._get_display_tree()
+        if tree is not None:
+            return tree.get_top()
+        top = self._get_memo('top', 'HR')
+        if top is None:
+            top = self._get_list(['HR'])[0]['id']
+            self._set_memo('top', 'HR', top)
+        return self._get_display_nodes([top])[0]
+
+    def _get_display_nodes(self, ids):
+        '''
+        Get what's needed to display a number of concepts or collections.
+
+        With a snapshot, the nodes come from the
+        :class:`~skosprovider_oe.display.DisplayTree` of the snapshot.
+        Otherwise they're built from the terms and their narrower terms and
+        non-descriptors, without looking further up or down the hierarchy,
+        and kept in the :attr:`cache`.
+
+        :returns: A list with a :class:`~skosprovider_oe.display.DisplayNode`
+            for every id, in the same order as the ids. Unknown ids result in
+            `False`.
+        '''
+        tree = self._get_display_tree()
+        if tree is not None:
+            return [tree.get(id) for id in ids]
+        nodes = []
+        for id in ids:
+            use = self._get_memo('use', id)
+            nodes.append(self._get_memo('display', id if use is None else use))
+        missing = [id for id, node in zip(ids, nodes) if node is None]
+        if missing:
+            results = self._get_preferred_terms(missing)
+            terms = self._get_terms_by_ids(
+                [tid for r in results if r for tid in self._get_related_ids(r)]
+            )
+            built = {}
+            for id, r in zip(missing, results):
+                node = False
+                if r:
+                    node = build_node(r, terms)
+                    self._set_memo('display', r['id'], node)
+                built[str(id)] = node
+            nodes = [
+                built[str(id)] if node is None else node
+                for id, node in zip(ids, nodes)
+            ]
+        return nodes
+
+    def _get_display_tree(self):
+        '''
+        Get the :class:`~skosprovider_oe.display.DisplayTree` for the current
+        snapshot, starting a new one when needed.
+
+        :returns: The tree or `None` if this provider is not working with a
+            snapshot.
+        '''
+        index = self._get_index()
+        if index is None:
+            return None
+        tree = self._display_tree
+        if tree is None or tree.index is not index:
+            tree = self._display_tree = DisplayTree(index)
+        return tree
+
+
+def _request_key(url, params=None):
+    '''
+    Build a hashable key identifying a request.
+    '''
+    if not params:
+        return (url, )
+    return (url, ) + tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v)
+        for k, v in params.items()
+    ))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+'''
+A compact in-memory representation of the terms of a thesaurus.
+'''
+
+from array import array
+
+try:
+    from collections.abc import Mapping
+except ImportError: # pragma: no cover
+    from collections import Mapping
+
+try:
+    integer_types = (int, long)
+except NameError: # pragma: no cover
+    integer_types = (int, )
+
+_strings = {}
+
+
+def intern_string(value):
+    '''
+    Get a shared copy of a string that occurs in many terms, such as a
+    language code or a term type.
+
+    Unlike :func:`sys.intern`, this works for unicode strings on Python 2
+    too.
+    '''
+    return _strings.setdefault(value, value)
+
+
+def _pack_ids(ids):
+    '''
+    Store a list of ids as an array of integers, if they are all integers
+    that fit in one.
+    '''
+    if all(
+        isinstance(id, integer_types) and not isinstance(id, bool)
+        for id in ids
+    ):
+        try:
+            return array('l', ids)
+        except OverflowError: # pragma: no cover
+            pass
+    return tuple(ids)
+
+
+_SCALARS = ('id', 'term', 'term_type', 'language', 'uri', 'broader_term',
+            'use')
+_INTERNED = ('term_type', 'language')
+_ID_LISTS = ('narrower_terms', 'use_for', 'related_terms')
+_MISSING = object()
+
+
+class TermRecord(Mapping):
+    '''
+    A term as returned by the `/<id>.json` service, stored compactly.
+
+    The fields of a term are kept in slots instead of a dict, language codes
+    and term types are shared between all records and lists of ids are
+    stored as arrays of integers. Fields without a slot of their own, such
+    as notes and matches, are kept in a dict that only exists when needed.
+
+    A record is a read-only mapping that behaves like the dict it was built
+    from, so it can be used wherever such a dict is expected. Lists of ids
+    are returned as new lists.
+
+    :param dict term: A term as returned by the service.
+    '''
+
+    __slots__ = _SCALARS + ('narrower_terms', 'use_for', 'related_terms',
+                            '_extra')
+
+    def __init__(self, term):
+        extra = None
+        for key, value in term.items():
+            if key in _ID_LISTS:
+                value = _pack_ids(value)
+            elif key in _INTERNED:
+                value = intern_string(value)
+            elif key not in _SCALARS:
+                if extra is None:
+                    extra = {}
+                extra[intern_string(key)] = value
+                continue
+            setattr(self, key, value)
+        self._extra = extra
+
+    @classmethod
+    def from_dict(cls, term):
+        '''
+        Build a record from a term, unless it already is one.
+
+        :returns: A :class:`TermRecord` or the term itself if it's falsy or
+            a record already.
+        '''
+        if not term or isinstance(term, cls):
+            return term
+        return cls(term)
+
+    def _get(self, key):
+        if key in _ID_LISTS:
+            value = getattr(self, key, _MISSING)
+            return value if value is _MISSING else list(value)
+        if key in _SCALARS:
+            return getattr(self, key, _MISSING)
+        if self._extra is None:
+            return _MISSING
+        return self._extra.get(key, _MISSING)
+
+    def __getitem__(self, key):
+        value = self._get(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        if key in _SCALARS or key in _ID_LISTS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in _SCALARS + _ID_LISTS:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def as_dict(self):
+        '''
+        Get the term as a dict, eg. to encode it as JSON.
+        '''
+        return dict((key, self[key]) for key in self)
+
+    def __repr__(self):
+        return 'TermRecord(%r)' % self.as_dict()
+
+    def __reduce__(self):
+        return (TermRecord, (self.as_dict(), ))
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+'''
+Refreshing cached data in the background, for serving stale data while it's
+being revalidated.
+'''
+
+import threading
+import time
+
+from collections import deque
+
+
+class RefreshWorker(object):
+    '''
+    A background thread that performs refreshes one at a time.
+
+    A refresh is submitted with a key identifying what it refreshes. While a
+    refresh for a key is waiting or running, submitting the same key again
+    has no effect. Refreshes are started at most `rate` times per second, so
+    a burst of expired entries does not turn into a burst of requests.
+
+    A refresh that raises an exception is counted as failed and the
+    exception is kept as :attr:`last_error`. The data it should have
+    refreshed stays as it is, so it can be refreshed again later.
+
+    The thread is started when the first refresh is submitted.
+
+    :param float rate: Maximum number of refreshes per second. `None` means
+        unlimited.
+    :param timer: A callable returning the current time in seconds.
+        Defaults to :func:`time.time`.
+    '''
+
+    def __init__(self, rate=10, timer=time.time):
+        self.rate = rate
+        self.timer = timer
+        self.submitted = 0
+        self.deduplicated = 0
+        self.refreshed = 0
+        self.failed = 0
+        #: The exception raised by the last refresh that failed.
+        self.last_error = None
+        self._queue = deque()
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def submit(self, key, func, *args, **kwargs):
+        '''
+        Schedule a refresh, unless one for the same key is already pending.
+
+        :param key: A hashable identifying what is refreshed.
+        :param func: Callable performing the refresh, called with `args`
+            and `kwargs`.
+        :returns: `True` if the refresh was scheduled.
+        '''
+        with self._cond:
+            if self._stopped.is_set():
+                return False
+            if key in self._pending:
+                self.deduplicated += 1
+                return False
+            self._pending.add(key)
+            self._queue.append((key, func, args, kwargs))
+            self.submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify_all()
+            return True
+
+    def _run(self):
+        next_start = None
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped.is_set():
+                    self._cond.wait()
+                if self._stopped.is_set():
+                    return
+                key, func, args, kwargs = self._queue.popleft()
+            if next_start is not None:
+                delay = next_start - self.timer()
+                if delay > 0 and self._stopped.wait(delay):
+                    with self._cond:
+                        self._pending.discard(key)
+                    return
+            if self.rate:
+                next_start = self.timer() + 1.0 / self.rate
+            try:
+                func(*args, **kwargs)
+                self.refreshed += 1
+            except Exception as e:
+                self.failed += 1
+                self.last_error = e
+            finally:
+                with self._cond:
+                    self._pending.discard(key)
+                    self._cond.notify_all()
+
+    def is_pending(self, key):
+        '''
+        Is a refresh for a key waiting or running?
+        '''
+        with self._cond:
+            return key in self._pending
+
+    def join(self, timeout=None):
+        '''
+        Wait until all submitted refreshes are done.
+
+        :param float timeout: Maximum number of seconds to wait.
+        :returns: `True` if no refreshes are pending anymore.
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._pending and not self._stopped.is_set():
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                self._cond.wait(remaining)
+            return not self._pending
+
+    def close(self):
+        '''
+        Stop the thread. Refreshes that haven't started yet are dropped.
+        '''
+        with self._cond:
+            self._stopped.set()
+            for item in self._queue:
+                self._pending.discard(item[0])
+            self._queue.clear()
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @property
+    def stats(self):
+        '''
+        A dict with the number of refreshes `submitted`, `deduplicated`,
+        `refreshed` and `failed`, and the number still `pending`.
+        '''
+        with self._cond:
+            return {
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+                'refreshed': self.refreshed,
+                'failed': self.failed,
+                'pending': len(self._pending)
+            }
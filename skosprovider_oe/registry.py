@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+'''
+Building providers for several thesauri that share their resources.
+
+.. code-block:: python
+
+    from skosprovider.registry import Registry
+    from skosprovider_oe.registry import ProviderFactory
+
+    factory = ProviderFactory(
+        cache_maxsize=20000,
+        snapshot_dir='/var/cache/skosprovider_oe',
+        pool_maxsize=20
+    )
+    factory.build_all({
+        'typologie': {'id': 'TYPOLOGIE'},
+        'stijl': {'id': 'STIJL'},
+        'gebeurtenis': {'id': 'GEBEURTENIS'}
+    })
+    factory.warm_up()
+
+    registry = Registry()
+    factory.register(registry)
+'''
+
+import os
+import time
+import warnings
+
+from concurrent.futures import ThreadPoolExecutor
+
+from skosprovider_oe.cache import TermCache
+from skosprovider_oe.http import (
+    build_adapter,
+    build_session
+)
+from skosprovider_oe.instrumentation import Instrumentation
+from skosprovider_oe.providers import OnroerendErfgoedProvider
+
+
+class ProviderFactory(object):
+    '''
+    Builds :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`
+    instances for a number of thesauri that share:
+
+    * one :class:`requests.Session`, so all providers use the same pool of
+      at most `pool_maxsize` keep-alive connections to the service,
+    * one pool of `max_workers` threads for fetching terms in parallel,
+    * one :class:`~skosprovider_oe.cache.TermCache` of `cache_maxsize`
+      terms, where the least recently used term of any thesaurus is evicted
+      first, or the `cache` that was passed,
+    * one :class:`~skosprovider_oe.instrumentation.Instrumentation`,
+    * and, if `snapshot_dir` is set, one directory with a snapshot file per
+      thesaurus.
+
+    So adding a thesaurus does not add connections or threads, and the
+    number of cached entries stays within `cache_maxsize`. Every provider
+    does keep its own :class:`~skosprovider_oe.hierarchy.HierarchyClosure`
+    of the terms it has seen, which is bounded by the size of the cache as
+    well, so memory grows with the number of thesauri.
+
+    :param str base_url: A pattern for the url of a thesaurus, with a `%s`
+        placeholder for the name of the thesaurus.
+    :param int cache_maxsize: Maximum number of terms in the shared cache.
+        Set to `None` to disable caching.
+    :param float cache_ttl: Number of seconds a term is kept in the cache.
+    :param str snapshot_dir: Directory to keep a snapshot of every thesaurus
+        in. Providers work with snapshots if this is set.
+    :param int pool_maxsize: Maximum number of connections to the service.
+    :param int max_workers: Maximum number of terms fetched in parallel by
+        all providers together.
+    :param bool http_cache: Cache HTTP responses in the shared session.
+    :param int retries: See :func:`~skosprovider_oe.http.build_retry`.
+    :param float backoff_factor: See
+        :func:`~skosprovider_oe.http.build_retry`.
+    :param cache: A :class:`~skosprovider_oe.cache.CacheBackend` to share
+        instead of a :class:`~skosprovider_oe.cache.TermCache`, eg. a
+        :class:`~skosprovider_oe.cache.SQLiteCache`.
+
+    All other parameters are passed on to every provider.
+    '''
+
+    def __init__(self, base_url=None, cache_maxsize=10000, cache_ttl=None,
+                 snapshot_dir=None, pool_maxsize=10, max_workers=10,
+                 http_cache=False, retries=3, backoff_factor=0.5,
+                 cache=None, **kwargs):
+        self.base_url = base_url
+        self.snapshot_dir = snapshot_dir
+        self.max_workers = max_workers
+        if snapshot_dir is not None and not os.path.isdir(snapshot_dir):
+            os.makedirs(snapshot_dir)
+        adapter = build_adapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            retries=retries,
+            backoff_factor=backoff_factor,
+            http_cache=http_cache
+        )
+        self.session = build_session(adapter)
+        self.http_cache = adapter if http_cache else None
+        self.cache = cache
+        if cache is None and cache_maxsize is not None:
+            self.cache = TermCache(maxsize=cache_maxsize, ttl=cache_ttl)
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.instrumentation = Instrumentation()
+        self.kwargs = kwargs
+        #: A dict mapping the name of every thesaurus to its provider.
+        self.providers = {}
+
+    def build(self, thesaurus, metadata=None, **kwargs):
+        '''
+        Build a provider for a thesaurus and add it to :attr:`providers`.
+
+        :param str thesaurus: Name of the thesaurus, eg. `stijl`.
+        :param dict metadata: Metadata for the provider. Defaults to an `id`
+            that is the name of the thesaurus in uppercase.
+        :param kwargs: Extra parameters for this provider.
+        :rtype: :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`
+        '''
+        args = dict(self.kwargs)
+        args.update(
+            thesaurus=thesaurus,
+            session=self.session,
+            http_cache=self.http_cache,
+            fetch_executor=self.executor,
+            max_workers=self.max_workers,
+            instrumentation=self.instrumentation
+        )
+        if self.base_url is not None:
+            args['base_url'] = self.base_url
+        if self.cache is not None:
+            args['cache'] = self.cache
+        if self.snapshot_dir is not None:
+            args['snapshot_file'] = os.path.join(
+                self.snapshot_dir, '%s.snapshot' % thesaurus
+            )
+        args.update(kwargs)
+        if metadata is None:
+            metadata = {'id': thesaurus.upper()}
+        provider = OnroerendErfgoedProvider(dict(metadata), **args)
+        self.providers[thesaurus] = provider
+        return provider
+
+    def build_all(self, thesauri):
+        '''
+        Build providers for a number of thesauri.
+
+        :param thesauri: A list of names of thesauri or a dict mapping the
+            name of a thesaurus to the metadata for its provider.
+        :rtype: A dict mapping the name of every thesaurus to its provider.
+        '''
+        if not isinstance(thesauri, dict):
+            thesauri = dict((name, None) for name in thesauri)
+        return dict(
+            (name, self.build(name, metadata))
+            for name, metadata in thesauri.items()
+        )
+
+    def warm_up(self, thesauri=None):
+        '''
+        Prepare the providers for use, all at the same time. A provider
+        working with a snapshot loads it, from its snapshot file if possible.
+        Other providers fetch the top of their display hierarchy, so it's
+        cached.
+
+        A thesaurus that can't be warmed up results in a warning, it's
+        tried again when it's first used.
+
+        :param list thesauri: Names of the thesauri to warm up. Defaults to
+            all.
+        :rtype: A dict mapping the name of every thesaurus that was warmed
+            up to the number of seconds it took.
+        '''
+        if thesauri is None:
+            thesauri = list(self.providers)
+        if not thesauri:
+            return {}
+
+        def warm_up(name):
+            start = time.time()
+            provider = self.providers[name]
+            try:
+                if provider.snapshot:
+                    provider._get_index()
+                else:
+                    provider.get_top_display()
+            except Exception as e:
+                warnings.warn(
+                    'Could not warm up thesaurus %s: %s' % (name, e),
+                    RuntimeWarning
+                )
+                return None
+            return time.time() - start
+
+        with ThreadPoolExecutor(len(thesauri)) as pool:
+            timings = dict(zip(thesauri, pool.map(warm_up, thesauri)))
+        return dict((k, v) for k, v in timings.items() if v is not None)
+
+    def register(self, registry):
+        '''
+        Register all providers with a
+        :class:`skosprovider.registry.Registry`.
+        '''
+        for name in sorted(self.providers):
+            registry.register_provider(self.providers[name])
+
+    def close(self):
+        '''
+        Stop the shared threads and close the shared connections.
+        '''
+        self.executor.shutdown()
+        self.session.close()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+'''
+Local searching on the labels of a thesaurus.
+'''
+
+import bisect
+import unicodedata
+
+try:
+    text_type = unicode
+except NameError: # pragma: no cover
+    text_type = str
+
+
+def normalize(label):
+    '''
+    Normalize a label for searching: remove accents and ignore case.
+
+    :param str label: The label to normalize.
+    :rtype: str
+    '''
+    if not isinstance(label, text_type): # pragma: no cover
+        label = label.decode('utf-8')
+    decomposed = unicodedata.normalize('NFKD', label)
+    stripped = u''.join(c for c in decomposed if not unicodedata.combining(c))
+    if hasattr(stripped, 'casefold'):
+        return stripped.casefold().strip()
+    return stripped.lower().strip() # pragma: no cover
+
+
+EXACT = 0
+PREFIX = 1
+SUBSTRING = 2
+
+
+class LabelIndex(object):
+    '''
+    An index on the preferred and alternative labels of all terms in a
+    :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+
+    Labels are normalized with :func:`normalize`. The label of a
+    non-descriptor (`ND`) counts as an alternative label of the term it
+    should be replaced by.
+
+    :param index: A :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+    '''
+
+    def __init__(self, index):
+        self._items = {}
+        labels = []
+        for id, label, type, broader, narrower, use in index.entries():
+            if type == 'ND':
+                target = index.resolve(id)
+                if target is False or str(target) not in index:
+                    continue
+                labels.append((normalize(label), False, str(target)))
+            else:
+                self._items[str(id)] = {
+                    'id': id,
+                    'omschrijving': label,
+                    'type': type
+                }
+                labels.append((normalize(label), True, str(id)))
+        labels = [l for l in labels if l[2] in self._items]
+        labels.sort()
+        self._labels = labels
+        self._keys = [l[0] for l in labels]
+
+    def updated(self, index, ids):
+        '''
+        Build the label index of an updated snapshot, only normalizing the
+        labels of some terms again.
+
+        :param index: The updated
+            :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+        :param ids: Ids of the terms that were added, changed or removed,
+            including the terms the changed non-descriptors should be
+            replaced by, before and after the change.
+        :rtype: :class:`LabelIndex`
+        '''
+        ids = set(str(id) for id in ids)
+        label_index = self.__class__.__new__(self.__class__)
+        items = dict((k, v) for k, v in self._items.items() if k not in ids)
+        labels = [l for l in self._labels if l[2] not in ids]
+        added = []
+        for id, label, type, broader, narrower, use in index.entries():
+            if type == 'ND':
+                target = index.resolve(id)
+                if str(target) in ids and str(target) in index:
+                    added.append((normalize(label), False, str(target)))
+            elif str(id) in ids:
+                items[str(id)] = {
+                    'id': id,
+                    'omschrijving': label,
+                    'type': type
+                }
+                added.append((normalize(label), True, str(id)))
+        labels.extend(l for l in added if l[2] in items)
+        labels.sort()
+        label_index._items = items
+        label_index._labels = labels
+        label_index._keys = [l[0] for l in labels]
+        return label_index
+
+    def __len__(self):
+        return len(self._labels)
+
+    def search(self, text, types=None, limit=None):
+        '''
+        Search for terms with a label containing a text.
+
+        Matches are ranked: exact matches come first, then labels starting
+        with the text and finally labels containing the text. Within each
+        rank, matches on a preferred label come before matches on an
+        alternative label and matches are sorted by label.
+
+        :param str text: The text to look for.
+        :param list types: Only return terms of these types (`HR`, `PT` or
+            `NL`).
+        :param int limit: Maximum number of results.
+        :rtype: A list of dicts with keys `id`, `omschrijving` and `type`,
+            as returned by the `lijst.json` service.
+        '''
+        text = normalize(text)
+        ranks = {}
+        start = bisect.bisect_left(self._keys, text)
+        for i in range(start, len(self._keys)):
+            key, pref, id = self._labels[i]
+            if not key.startswith(text):
+                break
+            rank = (EXACT if key == text else PREFIX, not pref, key)
+            if rank < ranks.get(id, (SUBSTRING + 1, )):
+                ranks[id] = rank
+        for key, pref, id in self._labels:
+            if text in key and not key.startswith(text):
+                rank = (SUBSTRING, not pref, key)
+                if rank < ranks.get(id, (SUBSTRING + 1, )):
+                    ranks[id] = rank
+        ids = sorted(
+            (
+                id for id in ranks
+                if types is None or self._items[id]['type'] in types
+            ),
+            key=lambda id: ranks[id] + (id, )
+        )
+        if limit is not None:
+            ids = ids[:limit]
+        return [dict(self._items[id]) for id in ids]
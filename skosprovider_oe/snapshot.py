@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+'''
+Snapshots of a complete thesaurus, in memory and on disk.
+'''
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from skosprovider_oe.hierarchy import HierarchyClosure
+from skosprovider_oe.record import TermRecord
+
+try:
+    intern = sys.intern
+except AttributeError: # pragma: no cover
+    pass
+
+
+class ThesaurusIndex(object):
+    '''
+    An index on all the terms of a single thesaurus.
+
+    The index is built once from the JSON of every term, as returned by the
+    `/<id>.json` service, and answers the same questions as the services of
+    the thesaurus without any network traffic. The terms are kept as
+    :class:`~skosprovider_oe.record.TermRecord` instances.
+
+    :param terms: An iterable of terms, each a dict as returned by the
+        service.
+    :param float fetched: Time at which the terms were fetched. Defaults to
+        the current time.
+    :param str thesaurus: Name of the thesaurus.
+    :param str url: Url of the thesaurus.
+    '''
+
+    def __init__(self, terms, fetched=None, thesaurus=None, url=None):
+        self._setup(fetched, thesaurus, url)
+        for term in terms:
+            key = str(term['id'])
+            term = self._terms[key] = TermRecord.from_dict(term)
+            self._add_entry(
+                term['id'], term['term'], term['term_type'],
+                term.get('broader_term'), term.get('narrower_terms'),
+                term.get('use')
+            )
+        self._build_listing()
+        self._get_closure()
+
+    @classmethod
+    def from_entries(cls, terms, entries, fetched=None, thesaurus=None,
+                     url=None):
+        '''
+        Build an index from a mapping of terms and the hierarchy entries of
+        these terms, without having to look at the terms themselves.
+
+        This is used when loading a snapshot from disk, where a term is only
+        decoded when it's requested.
+
+        :param terms: A mapping of stringified ids to terms.
+        :param entries: An iterable of tuples `(id, label, type, broader,
+            narrower, use)`, one for every term.
+        '''
+        index = cls.__new__(cls)
+        index._setup(fetched, thesaurus, url)
+        index._terms = terms
+        for entry in entries:
+            index._add_entry(*entry)
+        index._build_listing()
+        return index
+
+    def updated(self, terms, removed=(), fetched=None):
+        '''
+        Build an index in which some terms have been added, replaced or
+        removed, without looking at the other terms again.
+
+        The hierarchy closure of this index, if it was built, is updated in
+        place and shared with the new index.
+
+        :param terms: An iterable of new or changed terms, each a dict as
+            returned by the service.
+        :param removed: Ids of terms that no longer exist.
+        :param float fetched: Time at which the terms were fetched. Defaults
+            to the current time.
+        :rtype: :class:`ThesaurusIndex`
+        '''
+        records = dict(
+            (str(term['id']), TermRecord.from_dict(term)) for term in terms
+        )
+        removed = set(str(id) for id in removed) - set(records)
+        index = self.__class__.__new__(self.__class__)
+        index._setup(fetched, self.thesaurus, self.url)
+        if isinstance(self._terms, dict):
+            index._terms = dict(self._terms)
+            index._terms.update(records)
+            for key in removed:
+                index._terms.pop(key, None)
+        else:
+            index._terms = _UpdatedTerms(self._terms, records, removed)
+
+        def add(term):
+            index._add_entry(
+                term['id'], term['term'], term['term_type'],
+                term.get('broader_term'), term.get('narrower_terms'),
+                term.get('use')
+            )
+
+        for entry in self._entries:
+            key = str(entry[0])
+            if key in records:
+                add(records[key])
+            elif key not in removed:
+                index._add_entry(*entry)
+        for key in sorted(set(records) - set(self._ids)):
+            add(records[key])
+        index._build_listing()
+        closure = self._closure
+        if closure is not None:
+            for key in removed:
+                closure.discard(key)
+            for term in records.values():
+                closure.add_term(term['id'], term.get('narrower_terms') or [])
+            index._closure = closure
+        return index
+
+    def _setup(self, fetched, thesaurus, url):
+        self.fetched = time.time() if fetched is None else fetched
+        self.thesaurus = thesaurus
+        self.url = url
+        self._terms = {}
+        self._entries = []
+        self._ids = {}
+        self._narrower = {}
+        self._broader = {}
+        self._use = {}
+        self._closure = None
+        self._lock = threading.Lock()
+
+    def _add_entry(self, id, label, type, broader, narrower, use):
+        key = str(id)
+        self._entries.append((id, label, type, broader, narrower, use))
+        self._ids[key] = id
+        if type == 'ND' and use is not None:
+            self._use[key] = use
+        if narrower is not None:
+            self._narrower[key] = list(narrower)
+        if broader is not None:
+            self._broader[key] = broader
+
+    def _build_listing(self):
+        self._listing = sorted(
+            [
+                {
+                    'id': e[0],
+                    'omschrijving': e[1],
+                    'type': e[2]
+                } for e in self._entries
+            ],
+            key=lambda x: (x['omschrijving'].lower(), str(x['id']))
+        )
+
+    def _get_closure(self):
+        if self._closure is None:
+            with self._lock:
+                if self._closure is None:
+                    closure = HierarchyClosure()
+                    for e in self._entries:
+                        closure.add_term(e[0], e[4] or [])
+                    self._closure = closure
+        return self._closure
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, id):
+        return str(id) in self._ids
+
+    def get_term(self, id):
+        '''
+        Get a term as it would be returned by the `/<id>.json` service.
+
+        :returns: A dict or `False` if the term does not exist.
+        '''
+        return self._terms.get(str(id), False)
+
+    def entries(self):
+        '''
+        Iterate over the hierarchy entries of all terms. Each entry is a
+        tuple `(id, label, type, broader, narrower, use)`.
+        '''
+        return iter(self._entries)
+
+    def terms(self):
+        '''
+        Iterate over all terms in the index.
+        '''
+        for key in self._ids:
+            yield self._terms[key]
+
+    def get_narrower(self, id):
+        '''
+        Get the ids of the narrower terms of a term.
+        '''
+        return list(self._narrower.get(str(id), []))
+
+    def get_broader(self, id):
+        '''
+        Get the id of the broader term of a term or `None`.
+        '''
+        return self._broader.get(str(id))
+
+    def resolve(self, id):
+        '''
+        Get the id of the preferred term for a term. For a non-descriptor
+        (`ND`) this is the term it should be replaced by, for other terms
+        it's the term itself.
+
+        :returns: An id or `False` if the term does not exist.
+        '''
+        key = str(id)
+        if key not in self._ids:
+            return False
+        if key in self._use:
+            return self._use[key]
+        return self._ids[key]
+
+    def get_list(self, types=None, term=None):
+        '''
+        Get a list of terms as it would be returned by the `lijst.json`
+        service.
+
+        :param list types: Only return terms of these types (`HR`, `PT`,
+            `NL` or `ND`).
+        :param str term: Only return terms whose label contains this string,
+            ignoring case.
+        :rtype: A list of dicts with keys `id`, `omschrijving` and `type`.
+        '''
+        return list(self.iter_list(types, term))
+
+    def iter_list(self, types=None, term=None):
+        '''
+        Iterate over the terms :meth:`get_list` would return.
+        '''
+        if term is not None:
+            term = term.lower()
+        for x in self._listing:
+            if (types is None or x['type'] in types) and \
+               (term is None or term in x['omschrijving'].lower()):
+                yield dict(x)
+
+    def get_subtree(self, id):
+        '''
+        Get a list of the ids of a term and all terms below it, as it would
+        be returned by the `/<id>/subtree.json` service.
+
+        :returns: A list or `False` if the term does not exist.
+        '''
+        if str(id) not in self._ids:
+            return False
+        return self._get_closure().get_subtree(id)
+
+    def get_descendants(self, id):
+        '''
+        Get the ids of all terms below a term.
+
+        :returns: A set or `False` if the term does not exist.
+        '''
+        if str(id) not in self._ids:
+            return False
+        return self._get_closure().get_descendants(id)
+
+
+MAGIC = b'OESNAP'
+'''Marks the start of a snapshot file.'''
+
+VERSION = 1
+'''Version of the snapshot file format written by :func:`write_snapshot`.'''
+
+_PREAMBLE = struct.Struct('<6sHI')
+_OFFSET = struct.Struct('<QI')
+
+
+class _UpdatedTerms(object):
+    '''
+    The terms of a snapshot file, with some terms added, replaced or
+    removed.
+    '''
+
+    def __init__(self, terms, records, removed):
+        if isinstance(terms, _UpdatedTerms):
+            changes = dict(terms._changes)
+            terms = terms._terms
+        else:
+            changes = {}
+        changes.update(records)
+        changes.update((key, None) for key in removed)
+        self._terms = terms
+        self._changes = changes
+
+    def get(self, key, default=None):
+        if key in self._changes:
+            term = self._changes[key]
+            return default if term is None else term
+        return self._terms.get(key, default)
+
+    def __getitem__(self, key):
+        term = self.get(key)
+        if term is None:
+            raise KeyError(key)
+        return term
+
+
+class MappedTerms(object):
+    '''
+    A read-only mapping of stringified ids to terms, backed by a memory
+    mapped snapshot file.
+
+    A term is only decoded when it's requested. Since the file is mapped
+    read-only, processes loading the same snapshot share its pages.
+    '''
+
+    def __init__(self, mm, positions, start):
+        self._mm = mm
+        self._positions = positions
+        self._start = start
+
+    def _decode(self, position):
+        offset, length = _OFFSET.unpack_from(
+            self._mm, self._start + position * _OFFSET.size
+        )
+        data = self._mm[offset:offset + length].decode('utf-8')
+        return json.loads(
+            data,
+            object_pairs_hook=lambda pairs: dict(
+                (intern(str(k)), v) for k, v in pairs
+            )
+        )
+
+    def get(self, key, default=None):
+        position = self._positions.get(key)
+        if position is None:
+            return default
+        return self._decode(position)
+
+    def __getitem__(self, key):
+        return self._decode(self._positions[key])
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def values(self):
+        return [self._decode(p) for p in range(len(self._positions))]
+
+    def close(self):
+        self._mm.close()
+
+
+def write_snapshot(index, path):
+    '''
+    Write a :class:`ThesaurusIndex` to a snapshot file.
+
+    The file starts with a header containing the name and url of the
+    thesaurus, the time the terms were fetched, a table of all distinct
+    labels and term types and the hierarchy entries of all terms. After the
+    header comes an index with the offset and length of every term and
+    finally the terms themselves as compact JSON.
+
+    The file is written to a temporary file first and then moved into place,
+    so readers never see a partially written snapshot.
+
+    :param index: A :class:`ThesaurusIndex`.
+    :param str path: Where to write the snapshot.
+    '''
+    strings = {}
+
+    def ref(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    entries = []
+    records = []
+    for entry in index.entries():
+        id, label, type, broader, narrower, use = entry
+        entries.append([id, ref(label), ref(type), broader, narrower, use])
+        records.append(json.dumps(
+            dict(index.get_term(id)), separators=(',', ':'), sort_keys=True
+        ).encode('utf-8'))
+    header = json.dumps({
+        'version': VERSION,
+        'thesaurus': index.thesaurus,
+        'url': index.url,
+        'fetched': index.fetched,
+        'strings': sorted(strings, key=strings.get),
+        'entries': entries
+    }, separators=(',', ':')).encode('utf-8')
+    offset = _PREAMBLE.size + len(header) + _OFFSET.size * len(records)
+    offsets = []
+    for record in records:
+        offsets.append(_OFFSET.pack(offset, len(record)))
+        offset += len(record)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        f.write(b''.join(offsets))
+        f.write(b''.join(records))
+    getattr(os, 'replace', os.rename)(tmp, path)
+
+
+def _read_header(mm, path):
+    '''
+    Decode the header of a memory mapped snapshot and check that the file
+    holds every term listed in it.
+
+    :returns: A tuple of the header and the position of the offset table.
+    '''
+    magic, version, length = _PREAMBLE.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError('%s is not a thesaurus snapshot.' % path)
+    if version != VERSION:
+        raise ValueError(
+            'Snapshot %s has unsupported version %s.' % (path, version)
+        )
+    start = _PREAMBLE.size + length
+    try:
+        header = json.loads(mm[_PREAMBLE.size:start].decode('utf-8'))
+        end = start + _OFFSET.size * len(header['entries'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Snapshot %s is incomplete.' % path)
+    if end > len(mm):
+        raise ValueError('Snapshot %s is incomplete.' % path)
+    for position in range(start, end, _OFFSET.size):
+        offset, size = _OFFSET.unpack_from(mm, position)
+        if offset < end or offset + size > len(mm):
+            raise ValueError('Snapshot %s is incomplete.' % path)
+    return header, start
+
+
+def read_snapshot(path):
+    '''
+    Load a :class:`ThesaurusIndex` from a snapshot file written by
+    :func:`write_snapshot`.
+
+    Only the header is decoded, the file itself is memory mapped and terms
+    are decoded when they are requested.
+
+    :param str path: Location of the snapshot.
+    :raises ValueError: If the file is not a snapshot, has been written in
+        an unsupported version of the format or is incomplete.
+    :rtype: :class:`ThesaurusIndex`
+    '''
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _PREAMBLE.size:
+            raise ValueError('%s is not a thesaurus snapshot.' % path)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        header, start = _read_header(mm, path)
+    except ValueError:
+        mm.close()
+        raise
+    strings = [intern(str(s)) for s in header['strings']]
+    entries = [
+        (e[0], strings[e[1]], strings[e[2]], e[3], e[4], e[5])
+        for e in header['entries']
+    ]
+    positions = dict((str(e[0]), i) for i, e in enumerate(entries))
+    return ThesaurusIndex.from_entries(
+        MappedTerms(mm, positions, start),
+        entries,
+        fetched=header['fetched'],
+        thesaurus=header['thesaurus'],
+        url=header['url']
+    )
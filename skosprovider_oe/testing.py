@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+'''
+A local stand-in for the thesaurus REST-services, serving generated
+thesauri. Useful for testing and benchmarking providers without network
+access.
+
+.. code-block:: python
+
+    from skosprovider_oe.testing import FakeThesaurusServer, generate_thesaurus
+
+    server = FakeThesaurusServer(
+        {'stijl': generate_thesaurus(size=500, depth=4, branching=5)},
+        latency=0.02
+    )
+    server.start()
+    provider = OnroerendErfgoedProvider(
+        {'id': 'STIJL'},
+        base_url=server.base_url,
+        thesaurus='stijl'
+    )
+'''
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+except ImportError: # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+
+
+WORDS = [
+    'kerk', 'kapel', 'hoeve', 'molen', 'brug', 'toren', 'poort', 'burcht',
+    'woning', 'school', 'schuur', 'gracht', 'abdij', 'villa', 'station',
+    'fabriek', 'romaans', 'gotisch', 'barok', 'classicistisch'
+]
+
+
+def generate_thesaurus(size=100, depth=3, branching=4, guide_terms=0.2,
+                       non_descriptors=0.2, seed=0):
+    '''
+    Generate a synthetic thesaurus.
+
+    The thesaurus has a single top term (`HR`), below which terms are added
+    breadth first until there are `size` terms or the hierarchy is `depth`
+    levels deep. Every term has at most `branching` narrower terms.
+
+    :param int size: Number of terms, not counting non-descriptors.
+    :param int depth: Maximum depth of the hierarchy below the top term.
+    :param int branching: Maximum number of narrower terms per term.
+    :param float guide_terms: Fraction of terms that are guide terms
+        (`NL`) instead of concepts (`PT`).
+    :param float non_descriptors: Fraction of concepts that get a
+        non-descriptor (`ND`).
+    :param int seed: Seed for the random generator, the same seed always
+        results in the same thesaurus.
+    :rtype: A dict mapping ids to terms, as returned by the `/<id>.json`
+        service.
+    '''
+    rnd = random.Random(seed)
+    terms = {}
+    ids = [0]
+
+    def add(term_type, broader=None):
+        ids[0] += 1
+        id = ids[0]
+        term = {
+            'id': id,
+            'term': '%s %d' % (rnd.choice(WORDS), id),
+            'term_type': term_type,
+            'language': 'nl',
+            'uri': 'urn:x-oe:thesaurus:%d' % id
+        }
+        if broader is not None:
+            term['broader_term'] = broader
+            parent = terms[broader]
+            parent.setdefault('narrower_terms', []).append(id)
+        terms[id] = term
+        return term
+
+    top = add('HR')
+    level = [top]
+    for d in range(depth):
+        next_level = []
+        for parent in level:
+            for b in range(branching):
+                if ids[0] >= size:
+                    break
+                # The top term and guide terms always have concepts below them.
+                if parent['term_type'] == 'PT' and rnd.random() < guide_terms:
+                    term_type = 'NL'
+                else:
+                    term_type = 'PT'
+                next_level.append(add(term_type, parent['id']))
+        level = next_level
+    for term in list(terms.values()):
+        if term['term_type'] == 'PT':
+            term['scope_note'] = 'Scope note for %s.' % term['term']
+            if rnd.random() < non_descriptors:
+                nd = add('ND')
+                nd['use'] = term['id']
+                term.setdefault('use_for', []).append(nd['id'])
+    return terms
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeThesaurusHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.fake
+        parsed = urlparse(self.path)
+        server._record(parsed.path)
+        if server.latency:
+            time.sleep(server.latency)
+        status, data = server.handle(parsed.path, parse_qs(parsed.query))
+        body = json.dumps(data).encode('utf-8')
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            if server.max_age is not None:
+                self.send_header(
+                    'Cache-Control', 'max-age=%d' % server.max_age
+                )
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeThesaurusService(object):
+    '''
+    Answers requests for the `/<id>.json`, `/lijst.json` and
+    `/<id>/subtree.json` services of one or more thesauri, without any
+    networking. :class:`FakeThesaurusServer` serves it over HTTP.
+
+    :param dict thesauri: A dict mapping the name of a thesaurus to its
+        terms, as generated by :func:`generate_thesaurus`.
+    '''
+
+    def __init__(self, thesauri):
+        self.thesauri = thesauri
+
+    def handle(self, path, query):
+        '''
+        Answer a request.
+
+        :returns: A tuple of a status code and the data to send as JSON.
+        '''
+        m = re.match(r'^/([^/]+)/(.*)$', path)
+        if not m or m.group(1) not in self.thesauri:
+            return 404, {}
+        terms = self.thesauri[m.group(1)]
+        path = m.group(2)
+        if path == 'lijst.json':
+            return 200, self._lijst(terms, query)
+        m = re.match(r'^(\w+)/subtree\.json$', path)
+        if m:
+            term = self._term(terms, m.group(1))
+            if term is None:
+                return 404, {}
+            return 200, self._subtree(terms, term['id'])
+        m = re.match(r'^(\w+)\.json$', path)
+        if m:
+            term = self._term(terms, m.group(1))
+            if term is None:
+                return 404, {}
+            return 200, term
+        return 404, {}
+
+    def _term(self, terms, id):
+        try:
+            return terms.get(int(id))
+        except ValueError:
+            return None
+
+    def _subtree(self, terms, id):
+        res = []
+        stack = [id]
+        while stack:
+            id = stack.pop()
+            res.append(id)
+            stack.extend(reversed(terms[id].get('narrower_terms', [])))
+        return res
+
+    def _lijst(self, terms, query):
+        types = query.get('type[]', ['HR', 'PT', 'NL', 'ND'])
+        label = query.get('term', [None])[0]
+        if label is not None:
+            label = label.lower()
+        return [
+            {'id': t['id'], 'omschrijving': t['term'], 'type': t['term_type']}
+            for t in sorted(terms.values(), key=lambda t: t['term'].lower())
+            if t['term_type'] in types and (
+                label is None or label in t['term'].lower()
+            )
+        ]
+
+
+class FakeThesaurusServer(FakeThesaurusService):
+    '''
+    A local HTTP server that implements the `/<id>.json`, `/lijst.json`
+    and `/<id>/subtree.json` services for one or more thesauri.
+
+    Responses carry an `ETag` and conditional requests are answered with a
+    `304 Not Modified` when possible.
+
+    :param dict thesauri: A dict mapping the name of a thesaurus to its
+        terms, as generated by :func:`generate_thesaurus`.
+    :param float latency: Number of seconds to wait before answering a
+        request.
+    :param int max_age: If set, responses are sent with a `Cache-Control`
+        header with this `max-age`.
+    :param int port: Port to listen on. Defaults to a free port.
+    '''
+
+    def __init__(self, thesauri, latency=0, max_age=None, port=0):
+        super(FakeThesaurusServer, self).__init__(thesauri)
+        self.latency = latency
+        self.max_age = max_age
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), FakeThesaurusHandler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        '''
+        A pattern for the url of a thesaurus on this server, to be passed as
+        `base_url` to a provider.
+        '''
+        return 'http://127.0.0.1:%d/%%s' % self._server.server_address[1]
+
+    def start(self):
+        '''
+        Start serving requests in a background thread.
+        '''
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''
+        Stop serving requests.
+        '''
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _record(self, path):
+        with self._lock:
+            self.requests.append(path)
+
+    def reset(self):
+        '''
+        Forget all requests received so far.
+        '''
+        with self._lock:
+            del self.requests[:]
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+'''
+Warm up providers before they take traffic.
+
+Every thesaurus is crawled breadth-first, starting from its top terms
+(`HR`), and a snapshot is built from the terms that were found. The snapshot
+is written to a file the provider loads at startup, and the terms can be
+added to a shared cache. A provider that is warmed up through the API also
+starts using the snapshot, with its label index and display tree built in
+advance.
+
+.. code-block:: python
+
+    stijl = OnroerendErfgoedProvider({'id': 'STIJL'}, thesaurus='stijl')
+    report = warm_up(stijl, output='/var/cache/oe/stijl.snapshot')
+
+The same is available on the command line::
+
+    skosprovider_oe_warmup stijl typologie --output-dir /var/cache/oe \\
+        --workers 8 --rate 50
+
+The snapshots are written as `<thesaurus>.snapshot`, the layout the
+`snapshot_dir` of a :class:`~skosprovider_oe.registry.ProviderFactory`
+expects.
+'''
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from skosprovider_oe.cache import SQLiteCache
+from skosprovider_oe.providers import OnroerendErfgoedProvider
+from skosprovider_oe.record import TermRecord
+from skosprovider_oe.snapshot import (
+    ThesaurusIndex,
+    write_snapshot
+)
+
+
+class RateLimiter(object):
+    '''
+    Spaces out requests performed by any number of threads, so no more than
+    `rate` requests are started per second.
+
+    :param float rate: Maximum number of requests per second. `None` means
+        unlimited.
+    '''
+
+    def __init__(self, rate=None, timer=time.time, sleep=time.sleep):
+        self.rate = rate
+        self.timer = timer
+        self.sleep = sleep
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        '''
+        Block until the next request may be started.
+        '''
+        if not self.rate:
+            return
+        with self._lock:
+            now = self.timer()
+            start = max(now, self._next)
+            self._next = start + 1.0 / self.rate
+        if start > now:
+            self.sleep(start - now)
+
+
+class CrawlReport(object):
+    '''
+    What happened while crawling a thesaurus with :func:`crawl`.
+    '''
+
+    def __init__(self, thesaurus, url):
+        #: Name of the thesaurus.
+        self.thesaurus = thesaurus
+        #: Url of the thesaurus.
+        self.url = url
+        #: Number of terms fetched.
+        self.terms = 0
+        #: Number of requests performed.
+        self.requests = 0
+        #: Number of levels of the hierarchy crawled.
+        self.levels = 0
+        #: Number of seconds the crawl took.
+        self.seconds = 0.0
+        #: Ids of listed terms that were not found below the top terms and
+        #: were fetched afterwards.
+        self.unreachable = []
+        #: Ids of terms that were listed or referred to by other terms but
+        #: do not exist (anymore). They're left out of the snapshot.
+        self.missing = []
+        #: A dict mapping the ids of terms that could not be fetched to the
+        #: exception that was raised.
+        self.failed = {}
+
+    @property
+    def throughput(self):
+        '''
+        Number of terms fetched per second.
+        '''
+        return self.terms / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        res = '%s: %d terms in %.2f s (%.1f terms/s), %d requests' % (
+            self.thesaurus, self.terms, self.seconds, self.throughput,
+            self.requests
+        )
+        if self.unreachable:
+            res += ', %d not below a top term' % len(self.unreachable)
+        if self.missing:
+            res += ', %d missing' % len(self.missing)
+        if self.failed:
+            res += ', %d failed: %s' % (
+                len(self.failed),
+                ', '.join(sorted(self.failed, key=str))
+            )
+        return res
+
+
+def crawl(provider, limiter=None, progress=None):
+    '''
+    Fetch all terms of a thesaurus, breadth-first from the top terms.
+
+    The list of all terms is fetched first. Then the top terms are fetched,
+    then the terms directly below them and their non-descriptors and so on,
+    every level in parallel with the pool of `max_workers` threads of the
+    provider. Listed terms that are not found below a top term are fetched
+    at the end. Terms that do not exist are skipped.
+
+    :param provider: An
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+    :param limiter: A :class:`RateLimiter` to space out the requests with.
+    :param progress: A callable that is called with the number of terms
+        fetched so far and the total number of terms.
+    :raises LookupError: If the thesaurus does not exist.
+    :returns: A tuple of a :class:`~skosprovider_oe.snapshot.ThesaurusIndex`
+        with all terms that could be fetched and a :class:`CrawlReport`.
+    '''
+    report = CrawlReport(provider.thesaurus, provider.url)
+    limiter = limiter or RateLimiter()
+    lock = threading.Lock()
+    start = time.time()
+
+    def fetch(url, params=None):
+        limiter.wait()
+        with lock:
+            report.requests += 1
+        return provider._request(url, params=params)
+
+    def fetch_term(id):
+        return fetch((provider.url + '/%s.json') % id)
+
+    items = fetch(
+        provider.url + '/lijst.json',
+        params={'type[]': ['HR', 'PT', 'NL', 'ND']}
+    )
+    if items is False:
+        raise LookupError('Thesaurus %s does not exist.' % provider.thesaurus)
+    terms = {}
+    level = [item['id'] for item in items if item['type'] == 'HR']
+    seen = set(str(id) for id in level)
+
+    def fetched(id, term):
+        if not term:
+            report.missing.append(id)
+            return
+        terms[id] = term
+        for n in term.get('narrower_terms', []) + term.get('use_for', []):
+            if str(n) not in seen:
+                seen.add(str(n))
+                next_level.append(n)
+        if progress is not None:
+            progress(len(terms), len(items))
+
+    while True:
+        if not level:
+            level = [
+                item['id'] for item in items if str(item['id']) not in seen
+            ]
+            if not level:
+                break
+            seen.update(str(id) for id in level)
+            report.unreachable.extend(level)
+        report.levels += 1
+        next_level = []
+        failed = provider._fetch_terms(level, fetch_term, fetched)[1]
+        report.failed.update(failed)
+        level = next_level
+    report.terms = len(terms)
+    report.missing.sort(key=str)
+    report.seconds = time.time() - start
+    ids = [str(item['id']) for item in items]
+    ids.extend(sorted(set(terms) - set(ids)))
+    index = ThesaurusIndex(
+        [terms[id] for id in ids if id in terms],
+        fetched=start,
+        thesaurus=provider.thesaurus,
+        url=provider.url
+    )
+    return index, report
+
+
+def prepare_provider(provider, index):
+    '''
+    Let a provider use a snapshot, with its label index and display tree
+    built in advance.
+
+    :param provider: An
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+    :param index: A :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+    '''
+    provider.index = index
+    provider.snapshot = True
+    provider._get_label_index()
+    tree = provider._get_display_tree()
+    for entry in index.entries():
+        if entry[2] != 'ND':
+            tree.get(entry[0])
+
+
+def fill_cache(cache, index):
+    '''
+    Add all terms of a snapshot to a cache, the way a provider caches the
+    terms it fetches.
+
+    :param cache: A :class:`~skosprovider_oe.cache.CacheBackend`.
+    :param index: A :class:`~skosprovider_oe.snapshot.ThesaurusIndex`.
+    '''
+    for term in index.terms():
+        cache.set((index.url, str(term['id'])), TermRecord.from_dict(term))
+
+
+def warm_up(provider, output=None, cache=None, limiter=None, progress=None,
+            prepare=True):
+    '''
+    Crawl a thesaurus with :func:`crawl` and prepare everything needed to
+    answer calls without contacting the service.
+
+    When all terms could be fetched, the snapshot is written to `output`,
+    the terms are added to `cache` and, with :func:`prepare_provider`, the
+    provider starts using them. Otherwise nothing is changed or written.
+
+    :param provider: An
+        :class:`~skosprovider_oe.providers.OnroerendErfgoedProvider`.
+    :param str output: Where to write the snapshot.
+    :param cache: A :class:`~skosprovider_oe.cache.CacheBackend` to add
+        the terms to.
+    :param bool prepare: Let the provider use the snapshot. Leave this off
+        when the provider is not used afterwards.
+    :rtype: :class:`CrawlReport`
+    '''
+    index, report = crawl(provider, limiter=limiter, progress=progress)
+    if report.failed:
+        return report
+    if prepare:
+        prepare_provider(provider, index)
+    if output is not None:
+        write_snapshot(index, output)
+    if cache is not None:
+        fill_cache(cache, index)
+    return report
+
+
+def load_config(path):
+    '''
+    Load the thesauri to warm up from a JSON file.
+
+    The file contains a list of objects with the `thesaurus` and optionally
+    a `base_url`, an `url` and an `id` for the provider.
+
+    :rtype: A list of dicts.
+    '''
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    '''
+    Command line interface to :func:`warm_up`.
+
+    Every thesaurus is crawled and, if all its terms could be fetched, its
+    snapshot is written and its terms are added to the cache. The providers
+    are not prepared, since they're not used afterwards.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Warm up the thesauri of Onroerend Erfgoed.'
+    )
+    parser.add_argument('thesauri', nargs='*',
+                        help='Names of the thesauri, eg. stijl.')
+    parser.add_argument(
+        '--base-url',
+        default='https://inventaris.onroerenderfgoed.be/thesaurus/%s',
+        help='Pattern for the url of a thesaurus.'
+    )
+    parser.add_argument('--config', help='JSON file with a list of thesauri, '
+                        'each with a thesaurus and optionally a base_url.')
+    parser.add_argument('--output-dir', help='Directory to write a snapshot '
+                        'of every thesaurus to.')
+    parser.add_argument('--cache', help='SQLite cache file to add all terms '
+                        'to.')
+    parser.add_argument('--cache-maxsize', type=int, default=None,
+                        help='Maximum number of entries in the cache.')
+    parser.add_argument('--workers', type=int, default=10,
+                        help='Number of terms to fetch in parallel.')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Maximum number of requests per second.')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not report progress.')
+    args = parser.parse_args(argv)
+
+    thesauri = [{'thesaurus': name} for name in args.thesauri]
+    if args.config:
+        thesauri.extend(load_config(args.config))
+    if not thesauri:
+        parser.error('No thesauri to warm up.')
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    cache = None
+    if args.cache:
+        cache = SQLiteCache(args.cache, maxsize=args.cache_maxsize)
+    limiter = RateLimiter(args.rate)
+
+    failed = False
+    total = CrawlReport('total', None)
+    for config in thesauri:
+        config = dict(config)
+        name = config.pop('thesaurus')
+        config.setdefault('base_url', args.base_url)
+        provider = OnroerendErfgoedProvider(
+            {'id': config.pop('id', name.upper())},
+            thesaurus=name,
+            max_workers=args.workers,
+            **config
+        )
+
+        def progress(done, count):
+            sys.stderr.write('\r%s: %d/%d' % (name, done, count))
+            sys.stderr.flush()
+
+        output = None
+        if args.output_dir:
+            output = os.path.join(args.output_dir, '%s.snapshot' % name)
+        # What is being done, to report when it fails.
+        stage = 'lijst.json'
+        report = CrawlReport(name, provider.url)
+        try:
+            index, report = crawl(
+                provider,
+                limiter=limiter,
+                progress=None if args.quiet else progress
+            )
+            if not report.failed and output is not None:
+                stage = output
+                write_snapshot(index, output)
+            if not report.failed and cache is not None:
+                stage = args.cache
+                fill_cache(cache, index)
+        except Exception as e:
+            report.failed[stage] = e
+        finally:
+            provider.close()
+        if not args.quiet:
+            sys.stderr.write('\r')
+        print(str(report), file=sys.stderr)
+        if stage in report.failed:
+            print('%s: %s' % (stage, report.failed[stage]), file=sys.stderr)
+        failed = failed or bool(report.failed)
+        total.terms += report.terms
+        total.requests += report.requests
+        total.seconds += report.seconds
+    if len(thesauri) > 1:
+        print(str(total), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__': # pragma: no cover
+    sys.exit(main())
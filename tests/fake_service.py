@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+'''
+A small in-memory stand-in for the thesaurus REST-services, used to test the
+provider without network access.
+'''
+
+import copy
+import json
+import threading
+import time
+
+from skosprovider_oe.testing import FakeThesaurusService
+
+TERMS = {
+    1: {
+        'id': 1, 'term': 'Stijlen en culturen', 'term_type': 'HR',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:1',
+        'narrower_terms': [2, 10]
+    },
+    2: {
+        'id': 2, 'term': 'Historische stijlen', 'term_type': 'NL',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:2',
+        'broader_term': 1, 'narrower_terms': [3, 4]
+    },
+    3: {
+        'id': 3, 'term': 'romaans', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:3',
+        'broader_term': 2, 'narrower_terms': [5, 6], 'use_for': [7],
+        'scope_note': 'Massieve muren en rondbogen.',
+        'source_note': 'HASLINGHUIS, E.J., Bouwkundige termen, 2005.',
+        'matches': {'related': ['http://vocab.getty.edu/aat/300020775']}
+    },
+    4: {
+        'id': 4, 'term': 'gotiek', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:4',
+        'broader_term': 2
+    },
+    5: {
+        'id': 5, 'term': 'vroegromaans', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:5',
+        'broader_term': 3
+    },
+    6: {
+        'id': 6, 'term': 'romaans naar regio', 'term_type': 'NL',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:6',
+        'broader_term': 3, 'narrower_terms': [8]
+    },
+    7: {
+        'id': 7, 'term': 'romaanse stijl', 'term_type': 'ND',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:7',
+        'use': 3
+    },
+    8: {
+        'id': 8, 'term': 'Maasromaans', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:8',
+        'broader_term': 6
+    },
+    10: {
+        'id': 10, 'term': 'Culturen', 'term_type': 'NL',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:10',
+        'broader_term': 1, 'narrower_terms': [11]
+    },
+    11: {
+        'id': 11, 'term': 'Metaaltijden', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:11',
+        'broader_term': 10
+    }
+}
+
+HOST = 'http://thesaurus.test'
+
+BASE_URL = HOST + '/%s'
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.encoding = None
+        self.closed = False
+        self._data = data
+        self.content = json.dumps(data).encode('utf-8')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession(object):
+    '''
+    Mimics the part of :class:`requests.Session` used by the provider.
+
+    Requests are answered by a
+    :class:`~skosprovider_oe.testing.FakeThesaurusService`, like the ones
+    sent to a :class:`~skosprovider_oe.testing.FakeThesaurusServer`. Every
+    request is recorded in :attr:`requests`, so tests can count the number
+    of round trips.
+    '''
+
+    def __init__(self, terms=None, thesaurus='stijl'):
+        self.terms = copy.deepcopy(TERMS if terms is None else terms)
+        self.url = BASE_URL % thesaurus
+        self.service = FakeThesaurusService({thesaurus: self.terms})
+        self.requests = []
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append((url, params))
+        query = dict(
+            (k, v if isinstance(v, list) else [v])
+            for k, v in (params or {}).items()
+        )
+        status, data = self.service.handle(url[len(HOST):], query)
+        return FakeResponse(status, data)
+
+
+class FailingSession(FakeSession):
+    '''
+    A session that fails to fetch some terms or, when no ids are passed,
+    fails every request.
+    '''
+
+    def __init__(self, fail=None, *args, **kwargs):
+        self.fail = fail
+        super(FailingSession, self).__init__(*args, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        if self.fail is None or \
+           any(url.endswith('/%s.json' % id) for id in self.fail):
+            self.requests.append((url, params))
+            raise IOError('Connection reset.')
+        return super(FailingSession, self).get(url, params, **kwargs)
+
+
+class SlowSession(FakeSession):
+    '''
+    A session that takes some time to answer and keeps track of the number
+    of requests being handled at the same time.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.delay = kwargs.pop('delay', 0.01)
+        super(SlowSession, self).__init__(*args, **kwargs)
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        try:
+            return super(SlowSession, self).get(url, params, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class FakeTimer(object):
+    '''
+    A clock for caches and the like that only moves when :attr:`now` is
+    changed.
+    '''
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+
+from skosprovider_oe.aio import AsyncOnroerendErfgoedProvider
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from fake_service import (
+    BASE_URL,
+    TERMS,
+    FakeSession,
+    SlowSession
+)
+
+
+class AsyncOnroerendErfgoedProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.stijl = AsyncOnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            max_concurrency=3
+        )
+        self.stijl.session = SlowSession()
+        self.sync = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl'
+        )
+        self.sync.session = FakeSession()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_get_by_id_matches_sync_provider(self):
+        for id in TERMS:
+            result = self.run_async(self.stijl.get_by_id(id))
+            expected = self.sync.get_by_id(id)
+            self.assertEqual(type(expected), type(result))
+            for attr in ('id', 'uri', 'labels', 'broader', 'narrower',
+                         'subordinate_arrays', 'members', 'member_of',
+                         'superordinates', 'matches'):
+                self.assertEqual(
+                    getattr(expected, attr, None),
+                    getattr(result, attr, None)
+                )
+
+    def test_concurrent_lookups_are_coalesced(self):
+        async def get_all():
+            return await asyncio.gather(
+                *[self.stijl.get_by_id(3) for i in range(5)]
+            )
+        results = self.run_async(get_all())
+        self.assertEqual([3] * 5, [r.id for r in results])
+        urls = [url for url, params in self.stijl.session.requests]
+        self.assertEqual(1, urls.count(self.stijl.url + '/3.json'))
+        self.assertGreater(self.stijl.async_single_flight.shared, 0)
+
+    def test_get_by_unexisting_id(self):
+        self.assertFalse(self.run_async(self.stijl.get_by_id(404)))
+
+    def test_concurrency_is_bounded(self):
+        self.run_async(self.stijl.get_children_display(3))
+        self.assertGreater(self.stijl.session.max_active, 1)
+        self.assertLessEqual(self.stijl.session.max_active, 3)
+
+    def test_find(self):
+        self.assertEqual(
+            self.sync.find({'label': 'romaans'}),
+            self.run_async(self.stijl.find({'label': 'romaans'}))
+        )
+        query = {'collection': {'id': 2, 'depth': 'all'}}
+        self.assertEqual(
+            self.sync.find(query),
+            self.run_async(self.stijl.find(query))
+        )
+        self.assertRaises(
+            ValueError,
+            self.run_async,
+            self.stijl.find({'collection': {'id': 3}})
+        )
+
+    def test_get_all(self):
+        self.assertEqual(
+            self.sync.get_all(),
+            self.run_async(self.stijl.get_all())
+        )
+
+    def test_expand(self):
+        self.assertEqual(
+            self.sync.expand(1),
+            self.run_async(self.stijl.expand_concept(1))
+        )
+        self.assertFalse(self.run_async(self.stijl.expand(404)))
+
+    def test_display(self):
+        self.assertEqual(
+            self.sync.get_top_concepts(),
+            self.run_async(self.stijl.get_top_concepts())
+        )
+        self.assertEqual(
+            self.sync.get_top_display(),
+            self.run_async(self.stijl.get_top_display())
+        )
+        for id in (1, 2, 3, 6):
+            self.assertEqual(
+                self.sync.get_children_display(id),
+                self.run_async(self.stijl.get_children_display(id))
+            )
+        self.assertFalse(self.run_async(self.stijl.get_children_display(99)))
+
+    def test_display_from_snapshot(self):
+        stijl = AsyncOnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            snapshot=True
+        )
+        stijl.session = FakeSession()
+        self.assertEqual(
+            self.sync.get_top_concepts(),
+            self.run_async(stijl.get_top_concepts())
+        )
+        self.assertEqual(
+            self.sync.get_children_display(2),
+            self.run_async(stijl.get_children_display(2))
+        )
+        self.assertFalse(self.run_async(stijl.get_children_display(99)))
+
+    def test_get_by_uri(self):
+        self.assertFalse(self.run_async(
+            self.stijl.get_by_uri('urn:x-oe:stijl:3')
+        ))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider.skos import (
+    Concept,
+    Collection
+)
+
+from fake_service import (
+    BASE_URL,
+    SlowSession
+)
+
+
+class BatchProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            max_workers=4
+        )
+        self.stijl.session = SlowSession()
+
+    def tearDown(self):
+        self.stijl.close()
+
+    def test_get_by_ids(self):
+        result = self.stijl.get_by_ids([3, 404, 2, '7'])
+        self.assertEqual(4, len(result))
+        self.assertIsInstance(result[0], Concept)
+        self.assertEqual(3, result[0].id)
+        self.assertFalse(result[1])
+        self.assertIsInstance(result[2], Collection)
+        self.assertEqual(2, result[2].id)
+        self.assertEqual(3, result[3].id)
+
+    def test_get_by_ids_empty(self):
+        self.assertEqual([], self.stijl.get_by_ids([]))
+
+    def test_get_by_ids_matches_get_by_id(self):
+        ids = [1, 2, 3, 4, 5, 6, 8, 10, 11]
+        for single, batched in zip(
+            [self.stijl.get_by_id(id) for id in ids],
+            self.stijl.get_by_ids(ids)
+        ):
+            self.assertEqual(single.id, batched.id)
+            self.assertEqual(single.labels, batched.labels)
+            self.assertEqual(single.member_of, batched.member_of)
+            if isinstance(single, Concept):
+                self.assertEqual(single.broader, batched.broader)
+                self.assertEqual(single.narrower, batched.narrower)
+                self.assertEqual(
+                    single.subordinate_arrays, batched.subordinate_arrays
+                )
+
+    def test_broader_through_guide_terms(self):
+        maasromaans = self.stijl.get_by_id(8)
+        self.assertEqual([3], maasromaans.broader)
+        self.assertEqual([6], maasromaans.member_of)
+        gotiek = self.stijl.get_by_id(4)
+        self.assertEqual([], gotiek.broader)
+        self.assertEqual([2], gotiek.member_of)
+
+    def test_parallel_fetching(self):
+        self.stijl.get_by_ids([3, 4, 5, 8])
+        self.assertGreater(self.stijl.session.max_active, 1)
+        self.assertLessEqual(self.stijl.session.max_active, 4)
+
+    def test_terms_fetched_once_per_batch(self):
+        self.stijl.get_by_ids([5, 5, 8])
+        urls = [url for url, params in self.stijl.session.requests]
+        self.assertEqual(1, urls.count(BASE_URL % 'stijl' + '/5.json'))
+
+    def test_no_parallel_fetching(self):
+        self.stijl.max_workers = 1
+        self.stijl.get_children_display(3)
+        self.assertEqual(1, self.stijl.session.max_active)
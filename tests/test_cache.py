@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from skosprovider_oe.cache import (
+    SQLiteCache,
+    SingleFlight,
+    TermCache
+)
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from fake_service import (
+    BASE_URL,
+    FakeSession,
+    FakeTimer,
+    SlowSession,
+    TERMS
+)
+
+
+class TermCacheTests(unittest.TestCase):
+
+    def test_get_set(self):
+        cache = TermCache()
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIn('a', cache)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_lru_eviction(self):
+        cache = TermCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.stats['evictions'])
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = TermCache(ttl=10, timer=timer)
+        cache.set('a', 1)
+        timer.now = 10
+        self.assertEqual(1, cache.get('a'))
+        timer.now = 11
+        self.assertIsNone(cache.get('a'))
+        self.assertNotIn('a', cache)
+
+    def test_clear(self):
+        cache = TermCache()
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual(
+            {'entries': 0, 'hits': 0, 'misses': 0, 'evictions': 0},
+            cache.stats
+        )
+
+
+class CachingProviderTests(unittest.TestCase):
+
+    def _get_provider(self, **kwargs):
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            **kwargs
+        )
+        provider.session = FakeSession()
+        return provider
+
+    def test_no_cache_by_default(self):
+        stijl = self._get_provider()
+        self.assertIsNone(stijl.cache)
+        stijl.get_by_id(3)
+        stijl.get_by_id(3)
+        self.assertEqual(12, len(stijl.session.requests))
+
+    def test_cache(self):
+        stijl = self._get_provider(cache=True, cache_maxsize=50)
+        self.assertEqual(50, stijl.cache.maxsize)
+        first = stijl.get_by_id(3)
+        count = len(stijl.session.requests)
+        second = stijl.get_by_id(3)
+        self.assertEqual(count, len(stijl.session.requests))
+        self.assertEqual(first.narrower, second.narrower)
+        self.assertEqual(first.subordinate_arrays, second.subordinate_arrays)
+        self.assertGreater(stijl.cache.hits, 0)
+
+    def test_shared_cache(self):
+        cache = TermCache()
+        stijl = self._get_provider(cache=cache)
+        self.assertIs(cache, stijl.cache)
+        stijl.get_by_id(3)
+        self.assertIn((stijl.url, '3'), cache)
+
+    def test_unexisting_id_not_cached(self):
+        stijl = self._get_provider(cache=True)
+        self.assertFalse(stijl.get_by_id(404))
+        self.assertEqual(0, len(stijl.cache))
+
+    def test_clear_cache(self):
+        stijl = self._get_provider(cache=True)
+        stijl.get_by_id(3)
+        stijl.clear_cache()
+        self.assertEqual(0, len(stijl.cache))
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test_concurrent_calls_are_shared(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(value):
+            calls.append(value)
+            started.set()
+            release.wait(1)
+            return {'value': value * 2}
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do('key', slow, 21))
+            ) for i in range(5)
+        ]
+        threads[0].start()
+        started.wait(1)
+        for t in threads[1:]:
+            t.start()
+        while flight.shared < 4:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual([21], calls)
+        self.assertEqual([{'value': 42}] * 5, results)
+        self.assertEqual(5, len(set(id(r) for r in results)))
+        self.assertEqual({'calls': 1, 'shared': 4}, flight.stats)
+
+    def test_sequential_calls_are_not_shared(self):
+        flight = SingleFlight()
+        self.assertEqual(1, flight.do('key', lambda: 1))
+        self.assertEqual(2, flight.do('key', lambda: 2))
+        self.assertEqual(2, flight.calls)
+
+    def test_exceptions_are_raised(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('Boom')
+
+        self.assertRaises(ValueError, flight.do, 'key', fail)
+        self.assertEqual(1, flight.do('key', lambda: 1))
+
+
+class CoalescingProviderTests(unittest.TestCase):
+
+    def _get_provider(self, **kwargs):
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            **kwargs
+        )
+        provider.session = SlowSession(delay=0.05)
+        return provider
+
+    def _get_concurrently(self, provider, id, count=5):
+        threads = [
+            threading.Thread(target=provider.get_by_id, args=(id, ))
+            for i in range(count)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return [url for url, params in provider.session.requests]
+
+    def test_identical_requests_are_coalesced(self):
+        stijl = self._get_provider()
+        urls = self._get_concurrently(stijl, 5)
+        self.assertEqual(1, urls.count(stijl.url + '/5.json'))
+        self.assertGreater(stijl.single_flight.shared, 0)
+
+    def test_coalescing_can_be_disabled(self):
+        stijl = self._get_provider(coalesce_requests=False)
+        self.assertIsNone(stijl.single_flight)
+        urls = self._get_concurrently(stijl, 5)
+        self.assertEqual(5, urls.count(stijl.url + '/5.json'))
+
+
+class MemoProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=True
+        )
+        self.stijl.session = FakeSession()
+
+    def _urls(self):
+        return [url for url, params in self.stijl.session.requests]
+
+    def test_nearest_concept_is_remembered(self):
+        self.assertEqual([3], self.stijl.get_by_id(8).broader)
+        self.assertEqual(3, self.stijl.memos.get((self.stijl.url, 'ancestor', '6')))
+        self.stijl.cache.delete((self.stijl.url, '3'))
+        self.assertEqual([3], self.stijl.get_by_id(8).broader)
+        self.assertEqual(1, self._urls().count(self.stijl.url + '/3.json'))
+
+    def test_no_nearest_concept_is_remembered(self):
+        self.assertEqual([], self.stijl.get_by_id(4).broader)
+        self.assertIs(
+            False,
+            self.stijl.memos.get((self.stijl.url, 'ancestor', '2'))
+        )
+        self.stijl.cache.delete((self.stijl.url, '1'))
+        self.assertEqual([], self.stijl.get_by_id(4).broader)
+        self.assertEqual(1, self._urls().count(self.stijl.url + '/1.json'))
+
+    def test_preferred_term_is_remembered(self):
+        self.assertEqual(3, self.stijl.get_by_id(7).id)
+        self.assertEqual(3, self.stijl.memos.get((self.stijl.url, 'use', '7')))
+        batches = []
+        get_terms_by_ids = self.stijl._get_terms_by_ids
+        def spy(ids):
+            batches.append(list(ids))
+            return get_terms_by_ids(ids)
+        self.stijl._get_terms_by_ids = spy
+        self.assertEqual(3, self.stijl.get_by_id(7).id)
+        self.assertEqual([3], batches[0])
+
+    def test_preferred_term_of_descriptor_is_remembered(self):
+        self.stijl.get_by_id(3)
+        self.assertEqual(3, self.stijl.memos.get((self.stijl.url, 'use', '3')))
+
+    def test_memos_kept_apart_from_terms(self):
+        for id in TERMS:
+            self.stijl.get_by_id(id)
+            self.stijl.get_children_display(id)
+        self.assertEqual(len(TERMS), len(self.stijl.cache))
+        stats = self.stijl.cache.stats
+        self.assertEqual(len(self._urls()), stats['misses'])
+        self.assertEqual(len(TERMS), len(self._urls()))
+
+    def test_memos_cleared_with_cache(self):
+        self.stijl.get_by_id(8)
+        self.stijl.clear_cache()
+        self.assertIsNone(self.stijl.memos.get((self.stijl.url, 'ancestor', '6')))
+
+
+def _fill_cache(path, start):
+    cache = SQLiteCache(path)
+    for i in range(start, start + 50):
+        cache.set(('urn:x', str(i)), {'id': i})
+
+
+class SQLiteCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_get_set(self):
+        cache = SQLiteCache(self.path)
+        self.assertIsNone(cache.get(('a', '1')))
+        cache.set(('a', '1'), {'id': 1, 'narrower_terms': [2, 3]})
+        self.assertEqual(
+            {'id': 1, 'narrower_terms': [2, 3]}, cache.get(('a', '1'))
+        )
+        self.assertIn(('a', '1'), cache)
+        cache.set(('a', '1'), False)
+        self.assertIs(False, cache.get(('a', '1')))
+        self.assertEqual(1, len(cache))
+        cache.delete(('a', '1'))
+        self.assertNotIn(('a', '1'), cache)
+        self.assertEqual(
+            {'entries': 0, 'hits': 2, 'misses': 1, 'evictions': 0},
+            cache.stats
+        )
+
+    def test_lru_eviction(self):
+        timer = FakeTimer()
+        cache = SQLiteCache(self.path, maxsize=2, touch_interval=0,
+                            timer=timer)
+        cache.set('a', 1)
+        timer.now = 1
+        cache.set('b', 2)
+        timer.now = 2
+        cache.get('a')
+        timer.now = 3
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.stats['evictions'])
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = SQLiteCache(self.path, ttl=10, timer=timer)
+        cache.set('a', 1)
+        timer.now = 11
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((1, True), cache.get_stale('a'))
+        self.assertEqual((None, False), cache.get_stale('a', max_stale=0.5))
+
+    def test_clear_namespace(self):
+        cache = SQLiteCache(self.path)
+        cache.set(('a', '1'), 1)
+        cache.set(('b', '1'), 2)
+        cache.clear('a')
+        self.assertNotIn(('a', '1'), cache)
+        self.assertIn(('b', '1'), cache)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    def test_shared_between_processes(self):
+        SQLiteCache(self.path)
+        processes = [
+            multiprocessing.Process(target=_fill_cache, args=(self.path, i))
+            for i in (0, 25, 50)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        cache = SQLiteCache(self.path)
+        self.assertEqual(100, len(cache))
+        self.assertEqual({'id': 99}, cache.get(('urn:x', '99')))
+
+    def test_provider(self):
+        cache = SQLiteCache(self.path)
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=cache
+        )
+        stijl.session = FakeSession()
+        romaans = stijl.get_by_id(3)
+        other = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=SQLiteCache(self.path)
+        )
+        other.session = FakeSession()
+        self.assertEqual(romaans.narrower, other.get_by_id(3).narrower)
+        self.assertEqual(
+            'vroegromaans',
+            other.get_children_display(3)[0]['label'].label
+        )
+        self.assertEqual([], other.session.requests)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from skosprovider_oe.delta import (
+    diff_listings,
+    listing_state
+)
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.search import LabelIndex
+
+from fake_service import (
+    BASE_URL,
+    FakeSession
+)
+
+
+def change_thesaurus(terms):
+    # A new term below 10, 4 is removed and 5 gets a new label.
+    terms[12] = {
+        'id': 12, 'term': 'IJzertijd', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:12',
+        'broader_term': 10
+    }
+    terms[10]['narrower_terms'] = [11, 12]
+    del terms[4]
+    terms[2]['narrower_terms'] = [3]
+    terms[5]['term'] = 'vroege romaanse stijl'
+
+
+class VanishingSession(FakeSession):
+    '''
+    A session in which a term is removed right after the list of terms has
+    been fetched.
+    '''
+
+    vanish = None
+
+    def get(self, url, params=None, **kwargs):
+        r = super(VanishingSession, self).get(url, params, **kwargs)
+        if url.endswith('/lijst.json') and self.vanish is not None:
+            term = self.terms.pop(self.vanish)
+            self.terms[term['broader_term']]['narrower_terms'].remove(
+                self.vanish
+            )
+            self.vanish = None
+        return r
+
+
+class DiffTests(unittest.TestCase):
+
+    def test_diff_listings(self):
+        old = listing_state([
+            {'id': 1, 'omschrijving': 'a', 'type': 'HR'},
+            {'id': 2, 'omschrijving': 'b', 'type': 'PT'},
+            {'id': 3, 'omschrijving': 'c', 'type': 'PT'}
+        ])
+        new = listing_state([
+            (1, 'a', 'HR', None, [2, 4], None),
+            (2, 'b', 'NL', 1, [], None),
+            (4, 'd', 'PT', 1, [], None)
+        ])
+        changes = diff_listings(old, new)
+        self.assertEqual([4], changes.added)
+        self.assertEqual([3], changes.removed)
+        self.assertEqual([2], changes.changed)
+        self.assertTrue(changes)
+        self.assertFalse(diff_listings(new, new))
+
+
+class DeltaRefreshTests(unittest.TestCase):
+
+    def _get_provider(self, **kwargs):
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            **kwargs
+        )
+        provider.session = FakeSession()
+        return provider
+
+    def _paths(self, provider):
+        return sorted(
+            url[len(provider.url):] for url, params in provider.session.requests
+        )
+
+    def test_snapshot(self):
+        stijl = self._get_provider(local_search=True)
+        stijl.refresh_snapshot()
+        self.assertEqual([{'id': 4, 'label': 'gotiek'}],
+                         stijl.find({'label': 'gotiek'}))
+        change_thesaurus(stijl.session.terms)
+        del stijl.session.requests[:]
+        changes = stijl.delta_refresh()
+        self.assertEqual([12], changes.added)
+        self.assertEqual([4], changes.removed)
+        self.assertEqual([5], changes.changed)
+        self.assertEqual([2, 5, 10, 12], sorted(changes.refetched))
+        self.assertEqual(
+            ['/10.json', '/12.json', '/2.json', '/5.json', '/lijst.json'],
+            self._paths(stijl)
+        )
+        self.assertEqual([3], stijl.get_by_id(2).members)
+        self.assertEqual([11, 12], stijl.get_by_id(10).members)
+        self.assertIn(12, stijl.expand(1))
+        self.assertNotIn(4, stijl.expand(1))
+        self.assertEqual([], stijl.find({'label': 'gotiek'}))
+        self.assertEqual([{'id': 5, 'label': 'vroege romaanse stijl'}],
+                         stijl.find({'label': 'vroege'}))
+
+    def test_snapshot_updated_selectively(self):
+        stijl = self._get_provider(local_search=True)
+        stijl.refresh_snapshot()
+        closure = stijl.index._get_closure()
+        stijl.find({'label': 'romaans'})
+        tree = stijl._get_display_tree()
+        stijl.get_children_display(1)
+        stijl.get_children_display(3)
+        node = tree.get(6)
+        change_thesaurus(stijl.session.terms)
+        stijl.delta_refresh()
+        self.assertIs(closure, stijl.index._get_closure())
+        self.assertEqual([2, 3, 5, 6, 8], stijl.index.get_subtree(2))
+        self.assertEqual([10, 11, 12], stijl.index.get_subtree(10))
+        fresh = LabelIndex(stijl.index)
+        for text in ('gotiek', 'romaans', 'vroege', 'ijzer', 'e'):
+            self.assertEqual(
+                fresh.search(text), stijl._get_label_index().search(text)
+            )
+        self.assertIsNot(tree, stijl._get_display_tree())
+        self.assertIs(node, stijl._get_display_tree().get(6))
+        self.assertEqual(
+            [3], [c['id'] for c in stijl.get_children_display(2)]
+        )
+        self.assertEqual(
+            'vroege romaanse stijl',
+            stijl.get_children_display(3)[0]['label'].label
+        )
+
+    def test_unexisting_thesaurus(self):
+        stijl = self._get_provider(snapshot=True)
+        stijl.url = BASE_URL % 'stijlen'
+        self.assertRaises(LookupError, stijl.delta_refresh)
+
+    def test_term_removed_while_refreshing(self):
+        stijl = self._get_provider(snapshot=True)
+        stijl.session = VanishingSession()
+        stijl.refresh_snapshot()
+        stijl.session.terms[5]['term'] = 'vroege romaanse stijl'
+        stijl.session.vanish = 5
+        changes = stijl.delta_refresh()
+        self.assertEqual([], changes.changed)
+        self.assertEqual([5], changes.removed)
+        self.assertNotIn(5, stijl.index)
+        self.assertEqual([6], stijl.index.get_narrower(3))
+
+    def test_snapshot_not_loaded(self):
+        stijl = self._get_provider(snapshot=True)
+        changes = stijl.delta_refresh()
+        self.assertEqual(10, len(changes.added))
+        self.assertIsNotNone(stijl.index)
+
+    def test_no_changes(self):
+        stijl = self._get_provider(snapshot=True)
+        stijl.refresh_snapshot()
+        index = stijl.index
+        del stijl.session.requests[:]
+        self.assertFalse(stijl.delta_refresh())
+        self.assertEqual(['/lijst.json'], self._paths(stijl))
+        self.assertIs(index, stijl.index)
+
+    def test_cache(self):
+        stijl = self._get_provider(cache=True)
+        self.assertFalse(stijl.delta_refresh())
+        for id in (1, 2, 3, 4, 5, 6, 8, 10, 11):
+            stijl.get_by_id(id)
+        self.assertEqual([1, 2, 3, 5, 6, 8, 4, 10, 11], stijl.expand(1))
+        change_thesaurus(stijl.session.terms)
+        del stijl.session.requests[:]
+        changes = stijl.delta_refresh()
+        self.assertEqual([12], changes.added)
+        self.assertEqual([4], changes.removed)
+        self.assertEqual([5], changes.changed)
+        self.assertEqual([2, 5, 10, 12], sorted(changes.refetched))
+        del stijl.session.requests[:]
+        self.assertEqual([3], stijl.get_by_id(2).members)
+        self.assertEqual([11, 12], stijl.get_by_id(10).members)
+        self.assertEqual(
+            'vroege romaanse stijl', stijl.get_by_id(5).label('nl').label
+        )
+        self.assertEqual([], stijl.session.requests)
+        self.assertEqual([1, 2, 3, 5, 6, 8, 10, 11, 12], stijl.expand(1))
+
+    def test_stale_while_revalidate(self):
+        stijl = self._get_provider(
+            stale_while_revalidate=True, refresh_rate=None
+        )
+        stijl.delta_refresh()
+        self.assertEqual(9, len(stijl.get_all()))
+        self.assertEqual([1, 2, 3, 5, 6, 8, 4, 10, 11], stijl.expand(1))
+        self.assertEqual([10, 11], stijl.expand(10))
+        change_thesaurus(stijl.session.terms)
+        changes = stijl.delta_refresh()
+        self.assertEqual([12], changes.added)
+        self.assertEqual(9, len(stijl.get_all()))
+        self.assertIn(12, [c['id'] for c in stijl.get_all()])
+        self.assertEqual([1, 2, 3, 5, 6, 8, 10, 11, 12], stijl.expand(1))
+        self.assertEqual([10, 11, 12], stijl.expand(10))
+        stijl.close()
+
+    def test_without_cache(self):
+        stijl = self._get_provider()
+        stijl.delta_refresh()
+        change_thesaurus(stijl.session.terms)
+        del stijl.session.requests[:]
+        changes = stijl.delta_refresh()
+        self.assertEqual([12], changes.added)
+        self.assertEqual([], changes.refetched)
+        self.assertEqual(['/lijst.json'], self._paths(stijl))
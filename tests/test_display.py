@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from skosprovider_oe.display import DisplayTree
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.snapshot import ThesaurusIndex
+
+from fake_service import (
+    BASE_URL,
+    FakeSession,
+    TERMS
+)
+
+
+class DisplayTreeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = DisplayTree(ThesaurusIndex(TERMS.values()))
+
+    def test_top(self):
+        top = self.tree.get_top()
+        self.assertEqual(1, top.id)
+        self.assertEqual('collection', top.type)
+        self.assertEqual([2, 10], top.children)
+
+    def test_concept_children_are_narrower_concepts(self):
+        node = self.tree.get(3)
+        self.assertEqual('concept', node.type)
+        self.assertEqual([5], node.children)
+        self.assertEqual(
+            ['romaans', 'romaanse stijl'], [l.label for l in node.labels]
+        )
+
+    def test_non_descriptor(self):
+        self.assertIs(self.tree.get(3), self.tree.get(3))
+        self.assertEqual(3, self.tree.get(7).id)
+        self.assertFalse(self.tree.get(404))
+
+    def test_label_per_language(self):
+        node = self.tree.get(3)
+        self.assertEqual('romaans', node.label('nl').label)
+        self.assertIs(node.label('nl'), node.label('nl'))
+        self.assertEqual(
+            {'id': 3, 'label': node.label('en')}, node.display('en')
+        )
+
+
+class ProviderDisplayTests(unittest.TestCase):
+
+    def _get_provider(self, **kwargs):
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            **kwargs
+        )
+        provider.session = FakeSession()
+        return provider
+
+    def _labels(self, items):
+        return [(x['id'], x['label'].label) for x in items]
+
+    def test_display(self):
+        stijl = self._get_provider()
+        self.assertEqual(
+            [(2, 'Historische stijlen'), (10, 'Culturen')],
+            self._labels(stijl.get_top_display())
+        )
+        self.assertEqual(
+            [(3, 'romaans'), (4, 'gotiek'), (11, 'Metaaltijden')],
+            self._labels(stijl.get_top_concepts())
+        )
+        self.assertEqual(
+            [(5, 'vroegromaans')],
+            self._labels(stijl.get_children_display(7))
+        )
+        self.assertFalse(stijl.get_children_display(404))
+
+    def test_no_broader_terms_fetched(self):
+        stijl = self._get_provider()
+        stijl.get_children_display(6)
+        self.assertEqual(
+            ['/6.json', '/8.json'],
+            sorted(
+                url[len(stijl.url):] for url, params in stijl.session.requests
+            )
+        )
+
+    def test_cached_expand_needs_no_requests(self):
+        stijl = self._get_provider(cache=True)
+        stijl.get_top_concepts()
+        stijl.get_top_display()
+        stijl.get_children_display(3)
+        del stijl.session.requests[:]
+        top = stijl.get_top_concepts()
+        stijl.get_top_display()
+        stijl.get_children_display(2)
+        stijl.get_children_display(3)
+        self.assertEqual([], stijl.session.requests)
+        self.assertEqual(3, len(top))
+
+    def test_snapshot(self):
+        stijl = self._get_provider(snapshot=True)
+        stijl.get_top_concepts()
+        del stijl.session.requests[:]
+        self.assertEqual(
+            [(3, 'romaans'), (4, 'gotiek')],
+            self._labels(stijl.get_children_display(2))
+        )
+        self.assertEqual([], stijl.session.requests)
+
+    def test_delta_refresh(self):
+        stijl = self._get_provider(cache=True)
+        stijl.delta_refresh()
+        stijl.get_children_display(3)
+        stijl.session.terms[5]['term_type'] = 'NL'
+        stijl.delta_refresh()
+        self.assertEqual([], stijl.get_children_display(3))
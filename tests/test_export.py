@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from skosprovider.utils import dict_dumper
+
+from skosprovider_oe.export import (
+    ExportError,
+    export,
+    fetch_index,
+    main
+)
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+from fake_service import (
+    BASE_URL,
+    FailingSession,
+    FakeSession
+)
+
+
+class ExportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            max_workers=4
+        )
+        self.stijl.session = FakeSession()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.stijl.close()
+        shutil.rmtree(self.dir)
+
+    def _export(self, format, **kwargs):
+        out = io.StringIO()
+        count = export(self.stijl, out, format=format, **kwargs)
+        return count, out.getvalue()
+
+    def test_jsonl_matches_dict_dumper(self):
+        count, data = self._export('jsonl')
+        exported = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(9, count)
+        self.assertEqual(
+            json.loads(json.dumps(dict_dumper(self.stijl))), exported
+        )
+
+    def test_ntriples(self):
+        count, data = self._export('ntriples')
+        lines = data.splitlines()
+        self.assertIn(
+            '<urn:x-oe:stijl:3> <http://www.w3.org/2004/02/skos/core#altLabel>'
+            ' "romaanse stijl"@nl .',
+            lines
+        )
+        self.assertIn(
+            '<urn:x-oe:stijl:5> <http://www.w3.org/2004/02/skos/core#broader>'
+            ' <urn:x-oe:stijl:3> .',
+            lines
+        )
+        self.assertIn(
+            '<urn:x-oe:stijl:3> <http://purl.org/iso25964/skos-thes#'
+            'subordinateArray> <urn:x-oe:stijl:6> .',
+            lines
+        )
+        self.assertTrue(all(l.endswith(' .') for l in lines))
+
+    def test_turtle(self):
+        count, data = self._export('turtle')
+        self.assertIn(
+            '@prefix skos: <http://www.w3.org/2004/02/skos/core#>', data
+        )
+        self.assertIn(
+            '<urn:x-oe:stijl:2>\n    a skos:Collection ;\n', data
+        )
+        self.assertIn('skos:member <urn:x-oe:stijl:4> .\n', data)
+
+    def test_escaping(self):
+        self.stijl.session.terms[4]['term'] = u'"gotiek"\n\\ é'
+        count, data = self._export('ntriples')
+        self.assertIn(u'"\\"gotiek\\"\\n\\\\ é"@nl', data)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, self._export, 'rdfxml')
+
+    def test_progress(self):
+        calls = []
+        self._export('jsonl', progress=lambda *args: calls.append(args))
+        self.assertEqual(('fetch', 10, 10), calls[-2])
+        self.assertEqual(('write', 9, 9), calls[-1])
+
+    def test_no_requests_while_writing(self):
+        index = fetch_index(self.stijl)
+        self.assertEqual(10, len(index))
+        requests = len(self.stijl.session.requests)
+        self.assertEqual(11, requests)
+        self._export('ntriples')
+        self.assertEqual(2 * requests, len(self.stijl.session.requests))
+
+    def test_resume(self):
+        state = os.path.join(self.dir, 'stijl.state')
+        self.stijl.session = FailingSession(fail=[5, 6])
+        with self.assertRaises(ExportError) as cm:
+            self._export('jsonl', state=state)
+        self.assertEqual(set(['5', '6']), set(cm.exception.failed))
+        with open(state, 'a') as f:
+            f.write('{"id": 8, "ter')
+        self.stijl.session = FakeSession()
+        count, data = self._export('jsonl', state=state)
+        self.assertEqual(9, count)
+        self.assertEqual(
+            ['/5.json', '/6.json', '/lijst.json'],
+            sorted(
+                url[len(self.stijl.url):]
+                for url, params in self.stijl.session.requests
+            )
+        )
+
+
+class ExportCommandTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_main(self):
+        terms = generate_thesaurus(size=50)
+        output = os.path.join(self.dir, 'stijl.nt')
+        with FakeThesaurusServer({'stijl': terms}) as server:
+            result = main([
+                'stijl',
+                '--base-url', server.base_url,
+                '--output', output,
+                '--quiet'
+            ])
+        self.assertEqual(0, result)
+        with io.open(output, encoding='utf-8') as f:
+            subjects = set(line.split(' ')[0] for line in f)
+        self.assertEqual(
+            set('<%s>' % t['uri'] for t in terms.values()
+                if t['term_type'] != 'ND') |
+            set(['<urn:x-skosprovider:stijl>']),
+            subjects
+        )
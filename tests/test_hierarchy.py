@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from skosprovider_oe.cache import TermCache
+
+from skosprovider_oe.hierarchy import HierarchyClosure
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from fake_service import (
+    BASE_URL,
+    FakeSession,
+    FakeTimer
+)
+
+
+class HierarchyClosureTests(unittest.TestCase):
+
+    def setUp(self):
+        self.closure = HierarchyClosure()
+
+    def test_closure_bottom_up(self):
+        self.closure.add_term(6, [8])
+        self.closure.add_term(3, [5, 6])
+        self.closure.add_term(2, [3, 4])
+        self.assertEqual(set([3, 4, 5, 6, 8]), self.closure.get_descendants(2))
+        self.assertEqual(set([2, 3, 6]), self.closure.get_ancestors(8))
+
+    def test_closure_top_down(self):
+        self.closure.add_term(2, [3, 4])
+        self.closure.add_term(3, [5, 6])
+        self.closure.add_term(6, [8])
+        self.assertEqual(set([3, 4, 5, 6, 8]), self.closure.get_descendants(2))
+        self.assertEqual(set([2, 3, 6]), self.closure.get_ancestors('8'))
+
+    def test_discard(self):
+        self.closure.add_term(2, [3, 4])
+        self.closure.add_term(3, [5, 6])
+        self.closure.add_term(6, [8])
+        self.closure.add_term(4, [])
+        self.closure.add_term(5, [])
+        self.closure.add_term(8, [])
+        self.assertEqual(3, self.closure.get_parent(6))
+        self.closure.discard(3)
+        self.assertIsNone(self.closure.get_parent(6))
+        self.assertIsNone(self.closure.get_subtree(2))
+        self.assertEqual(set([3, 4]), self.closure.get_descendants(2))
+        self.assertEqual(set([2]), self.closure.get_ancestors(3))
+        self.assertEqual(set([6]), self.closure.get_ancestors(8))
+        self.closure.add_term(3, [6])
+        self.assertEqual([2, 3, 6, 8, 4], self.closure.get_subtree(2))
+        self.assertEqual(set([2, 3, 6]), self.closure.get_ancestors(8))
+
+    def test_is_complete(self):
+        self.closure.add_term(3, [5, 6])
+        self.assertFalse(self.closure.is_complete(3))
+        self.assertIsNone(self.closure.get_subtree(3))
+        self.closure.add_term(5, [])
+        self.closure.add_term(6, [8])
+        self.assertFalse(self.closure.is_complete(3))
+        self.closure.add_term(8, [])
+        self.assertTrue(self.closure.is_complete(3))
+        self.assertEqual([3, 5, 6, 8], self.closure.get_subtree(3))
+        self.assertEqual([6, 8], self.closure.get_subtree('6'))
+
+    def test_add_subtree(self):
+        self.closure.add_subtree(2, [2, 3, 5, 6, 8, 4])
+        self.assertTrue(self.closure.is_complete(2))
+        self.assertEqual([2, 3, 5, 6, 8, 4], self.closure.get_subtree(2))
+        self.assertEqual(set([2]), self.closure.get_ancestors(8))
+        self.assertFalse(self.closure.is_complete(3))
+
+    def test_replace_narrower(self):
+        self.closure.add_term(3, [5, 6])
+        self.closure.add_term(5, [])
+        self.closure.add_term(6, [])
+        self.closure.add_term(12, [])
+        self.assertEqual([3, 5, 6], self.closure.get_subtree(3))
+        self.closure.add_term(5, [12])
+        self.assertEqual([3, 5, 12, 6], self.closure.get_subtree(3))
+        self.assertEqual(set([3, 5]), self.closure.get_ancestors(12))
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        closure = HierarchyClosure(ttl=60, timer=timer)
+        closure.add_term(6, [8])
+        closure.add_term(8, [])
+        closure.add_subtree(2, [2, 3, 5, 6, 8, 4])
+        self.assertEqual([6, 8], closure.get_subtree(6))
+        timer.now = 61
+        self.assertIsNone(closure.get_subtree(6))
+        self.assertIsNone(closure.get_subtree(2))
+        closure.add_term(6, [8])
+        closure.add_term(8, [])
+        self.assertEqual([6, 8], closure.get_subtree(6))
+
+    def test_maxsize(self):
+        closure = HierarchyClosure(maxsize=3)
+        closure.add_term(3, [5, 6])
+        closure.add_term(6, [8])
+        self.assertEqual(4, len(closure))
+        closure.add_term(2, [3, 4])
+        self.assertEqual(3, len(closure))
+        self.assertEqual(set([3, 4]), closure.get_descendants(2))
+
+    def test_unknown(self):
+        self.assertNotIn(404, self.closure)
+        self.assertFalse(self.closure.is_complete(404))
+        self.assertEqual(set(), self.closure.get_descendants(404))
+
+    def test_clear(self):
+        self.closure.add_term(3, [5, 6])
+        self.closure.clear()
+        self.assertEqual(0, len(self.closure))
+
+
+class ClosureProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=True
+        )
+        self.stijl.session = FakeSession()
+
+    def _count(self):
+        return len(self.stijl.session.requests)
+
+    def test_closure_bounded_by_cache(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=TermCache(maxsize=5)
+        )
+        stijl.session = FakeSession()
+        for id in (1, 2, 3, 4, 5, 6, 8, 10, 11):
+            stijl.get_by_id(id)
+        self.assertLessEqual(len(stijl.closure), 5 + 3)
+
+    def test_no_closure_without_cache(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'}, base_url=BASE_URL, thesaurus='stijl'
+        )
+        self.assertIsNone(stijl.closure)
+
+    def test_expand_from_fetched_terms(self):
+        self.stijl.get_by_ids([3, 5, 6, 8])
+        count = self._count()
+        self.assertEqual([3, 5, 6, 8], self.stijl.expand(3))
+        self.assertEqual([6, 8], self.stijl.expand_concept(6))
+        self.assertEqual(count, self._count())
+
+    def test_expand_remembers_subtree(self):
+        expected = self.stijl.expand(2)
+        count = self._count()
+        self.assertEqual(expected, self.stijl.expand(2))
+        self.assertEqual(count, self._count())
+
+    def test_find_in_collection(self):
+        query = {'collection': {'id': 2, 'depth': 'all'}}
+        expected = set([2, 3, 4, 5, 6, 8])
+        self.assertEqual(
+            expected, set(x['id'] for x in self.stijl.find(query))
+        )
+        count = self._count()
+        self.assertEqual(
+            expected, set(x['id'] for x in self.stijl.find(query))
+        )
+        self.assertEqual(count + 1, self._count())
+
+    def test_expand_after_ttl(self):
+        timer = FakeTimer()
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=TermCache(ttl=60, timer=timer)
+        )
+        self.stijl.session = FakeSession()
+        self.stijl.get_by_ids([3, 5, 6, 8])
+        self.assertEqual([3, 5, 6, 8], self.stijl.expand(3))
+        self.stijl.session.terms[12] = {
+            'id': 12, 'term': 'laatromaans', 'term_type': 'PT',
+            'language': 'nl-BE', 'broader_term': 5, 'narrower_terms': []
+        }
+        self.stijl.session.terms[5]['narrower_terms'] = [12]
+        timer.now = 120
+        self.assertEqual([12], self.stijl.get_by_id(5).narrower)
+        self.assertEqual([3, 5, 12, 6, 8], self.stijl.expand(3))
+
+    def test_find_in_collection_without_subtree(self):
+        class NoSubtreeSession(FakeSession):
+            def get(self, url, params=None, **kwargs):
+                if url.endswith('/subtree.json'):
+                    url = url.replace('/subtree.json', '/404/subtree.json')
+                return super(NoSubtreeSession, self).get(url, params, **kwargs)
+        self.stijl.session = NoSubtreeSession()
+        query = {'collection': {'id': 2, 'depth': 'all'}}
+        self.assertEqual([], self.stijl.find(query))
+        self.assertRaises(
+            ValueError, self.stijl.find, {'collection': {'id': 3}}
+        )
+
+    def test_clear_cache(self):
+        self.stijl.expand(2)
+        self.stijl.clear_cache()
+        self.assertEqual(0, len(self.stijl.closure))
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import unittest
+
+import requests
+
+from requests.models import Response
+
+from skosprovider_oe.http import (
+    DEFAULT_TIMEOUT,
+    CachingAdapter,
+    build_session
+)
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+from fake_service import (
+    BASE_URL,
+    FakeSession,
+    FakeTimer,
+    TERMS
+)
+
+
+class StubAdapter(CachingAdapter):
+    '''
+    A caching adapter that answers requests itself instead of sending them
+    to a service.
+    '''
+
+    def __init__(self, headers=None, **kwargs):
+        super(StubAdapter, self).__init__(**kwargs)
+        self.response_headers = headers or {}
+        self.requests = []
+        self.modified = False
+
+    def _send(self, request, **kwargs):
+        self.requests.append(request)
+        response = Response()
+        response.raw = io.BytesIO()
+        response.request = request
+        response.url = request.url
+        response.encoding = 'utf-8'
+        response.headers['ETag'] = '"v2"' if self.modified else '"v1"'
+        response.headers['Last-Modified'] = 'Mon, 10 Oct 2016 10:00:00 GMT'
+        response.headers.update(self.response_headers)
+        if request.headers.get('If-None-Match') == response.headers['ETag']:
+            response.status_code = 304
+            response._content = b''
+            return response
+        id = int(request.url.rsplit('/', 1)[1].split('.')[0])
+        response.status_code = 200
+        response._content = json.dumps(TERMS[id]).encode('utf-8')
+        return response
+
+
+class CachingAdapterTests(unittest.TestCase):
+
+    def _get_session(self, **kwargs):
+        self.timer = FakeTimer()
+        self.adapter = StubAdapter(timer=self.timer, **kwargs)
+        session = requests.Session()
+        session.mount('http://', self.adapter)
+        return session
+
+    def test_fresh_response_served_from_cache(self):
+        session = self._get_session(headers={'Cache-Control': 'max-age=60'})
+        first = session.get('http://thesaurus.test/stijl/3.json')
+        self.timer.now = 59
+        second = session.get('http://thesaurus.test/stijl/3.json')
+        self.assertEqual(1, len(self.adapter.requests))
+        self.assertTrue(second.from_cache)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(
+            {'fresh': 1, 'revalidated': 0, 'fetched': 1},
+            self.adapter.stats
+        )
+
+    def test_stale_response_is_revalidated(self):
+        session = self._get_session(headers={'Cache-Control': 'max-age=60'})
+        session.get('http://thesaurus.test/stijl/3.json')
+        self.timer.now = 61
+        response = session.get('http://thesaurus.test/stijl/3.json')
+        request = self.adapter.requests[-1]
+        self.assertEqual('"v1"', request.headers['If-None-Match'])
+        self.assertEqual(
+            'Mon, 10 Oct 2016 10:00:00 GMT',
+            request.headers['If-Modified-Since']
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('romaans', response.json()['term'])
+        self.assertEqual(1, self.adapter.stats['revalidated'])
+        self.timer.now = 62
+        session.get('http://thesaurus.test/stijl/3.json')
+        self.assertEqual(1, self.adapter.stats['fresh'])
+
+    def test_changed_response_is_fetched(self):
+        session = self._get_session()
+        session.get('http://thesaurus.test/stijl/3.json')
+        self.adapter.modified = True
+        session.get('http://thesaurus.test/stijl/3.json')
+        self.assertEqual(
+            {'fresh': 0, 'revalidated': 0, 'fetched': 2},
+            self.adapter.stats
+        )
+        self.assertEqual(
+            '"v2"',
+            self.adapter.responses.get('http://thesaurus.test/stijl/3.json').etag
+        )
+
+    def test_revalidate_fresh_response(self):
+        session = self._get_session(headers={'Cache-Control': 'max-age=60'})
+        session.get('http://thesaurus.test/stijl/3.json')
+        response = session.get(
+            'http://thesaurus.test/stijl/3.json',
+            headers={'Cache-Control': 'no-cache'}
+        )
+        self.assertEqual(2, len(self.adapter.requests))
+        self.assertEqual(1, self.adapter.stats['revalidated'])
+        self.assertTrue(response.from_cache)
+
+    def test_no_store(self):
+        session = self._get_session(headers={'Cache-Control': 'no-store'})
+        session.get('http://thesaurus.test/stijl/3.json')
+        self.assertEqual(0, len(self.adapter.responses))
+
+    def test_no_cache(self):
+        session = self._get_session(
+            headers={'Cache-Control': 'no-cache, max-age=60'}
+        )
+        session.get('http://thesaurus.test/stijl/3.json')
+        session.get('http://thesaurus.test/stijl/3.json')
+        self.assertEqual(1, self.adapter.stats['revalidated'])
+
+    def test_json_not_shared(self):
+        session = self._get_session(headers={'Cache-Control': 'max-age=60'})
+        first = session.get('http://thesaurus.test/stijl/3.json')
+        first.json()['narrower_terms'].append(999)
+        second = session.get('http://thesaurus.test/stijl/3.json')
+        self.assertEqual(first.json(), second.json())
+        self.assertNotIn(999, second.json()['narrower_terms'])
+
+    def test_provider(self):
+        adapter = StubAdapter(headers={'Cache-Control': 'max-age=60'})
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            http_cache=adapter
+        )
+        self.assertIs(adapter, stijl.http_cache)
+        stijl.get_by_id(3)
+        stijl.get_by_id(3)
+        self.assertEqual(6, adapter.stats['fetched'])
+        self.assertEqual(6, adapter.stats['fresh'])
+
+    def test_provider_results_not_shared(self):
+        terms = generate_thesaurus(size=20)
+        with FakeThesaurusServer({'stijl': terms}, max_age=60) as server:
+            stijl = OnroerendErfgoedProvider(
+                {'id': 'STIJL'},
+                base_url=server.base_url,
+                thesaurus='stijl',
+                http_cache=True
+            )
+            members = list(stijl.get_by_id(1).members)
+            stijl.get_by_id(1).members.append(999)
+            self.assertEqual(members, stijl.get_by_id(1).members)
+            self.assertTrue(stijl.http_cache.stats['fresh'])
+
+    def test_provider_iterates_cached_list(self):
+        terms = generate_thesaurus(size=20)
+        with FakeThesaurusServer({'stijl': terms}, max_age=60) as server:
+            stijl = OnroerendErfgoedProvider(
+                {'id': 'STIJL'},
+                base_url=server.base_url,
+                thesaurus='stijl',
+                http_cache=True
+            )
+            items = stijl.get_all()
+            self.assertEqual(items, list(stijl.iter_all()))
+            self.assertEqual(1, stijl.http_cache.stats['fresh'])
+
+
+class FlakyServer(FakeThesaurusServer):
+    '''
+    A server that answers the first requests with a `503 Service
+    Unavailable`.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.failures = kwargs.pop('failures')
+        super(FlakyServer, self).__init__(*args, **kwargs)
+
+    def handle(self, path, query):
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                return 503, {}
+        return super(FlakyServer, self).handle(path, query)
+
+
+class SessionTests(unittest.TestCase):
+
+    def test_build_session(self):
+        session = build_session(pool_maxsize=20, retries=5)
+        adapter = session.get_adapter('https://inventaris.onroerenderfgoed.be')
+        self.assertIs(adapter, session.get_adapter('http://localhost'))
+        self.assertNotIsInstance(adapter, CachingAdapter)
+        self.assertEqual(20, adapter._pool_maxsize)
+        self.assertEqual(5, adapter.max_retries.total)
+
+    def test_build_session_with_http_cache(self):
+        session = build_session(http_cache=True, maxsize=10)
+        adapter = session.get_adapter('http://localhost')
+        self.assertIsInstance(adapter, CachingAdapter)
+        self.assertEqual(3, adapter.max_retries.total)
+
+    def test_provider_defaults(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            thesaurus='stijl',
+            max_workers=16
+        )
+        adapter = stijl.session.get_adapter(stijl.url)
+        self.assertEqual(16, adapter._pool_maxsize)
+        self.assertEqual(3, adapter.max_retries.total)
+        self.assertEqual(DEFAULT_TIMEOUT, stijl.timeout)
+
+    def test_provider_timeout(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            timeout=2
+        )
+        calls = []
+
+        class TimeoutSession(FakeSession):
+            def get(self, url, params=None, **kwargs):
+                calls.append(kwargs.get('timeout'))
+                return super(TimeoutSession, self).get(url, params)
+
+        stijl.session = TimeoutSession()
+        stijl.get_by_id(1)
+        self.assertEqual([2], calls)
+
+    def test_shared_session(self):
+        adapter = StubAdapter()
+        session = build_session(adapter)
+        typologie = OnroerendErfgoedProvider(
+            {'id': 'TYPOLOGIE'},
+            thesaurus='typologie',
+            session=session
+        )
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            session=session,
+            http_cache=adapter
+        )
+        self.assertIs(session, typologie.session)
+        self.assertIs(session, stijl.session)
+        self.assertIs(adapter, session.get_adapter(stijl.url))
+        self.assertIs(adapter, stijl.http_cache)
+
+    def test_http_cache_not_mounted_on_session(self):
+        session = build_session()
+        adapter = session.get_adapter(BASE_URL)
+        for http_cache in (True, StubAdapter()):
+            self.assertRaises(
+                ValueError,
+                OnroerendErfgoedProvider,
+                {'id': 'STIJL'},
+                thesaurus='stijl',
+                session=session,
+                http_cache=http_cache
+            )
+        self.assertIs(adapter, session.get_adapter(BASE_URL))
+
+    def test_retry_server_errors(self):
+        server = FlakyServer(
+            {'stijl': generate_thesaurus(size=10)}, failures=2
+        )
+        with server:
+            stijl = OnroerendErfgoedProvider(
+                {'id': 'STIJL'},
+                base_url=server.base_url,
+                thesaurus='stijl',
+                backoff_factor=0
+            )
+            self.assertEqual(1, stijl.get_by_id(1).id)
+            self.assertEqual(3, len(server.requests))
+
+    def test_no_retries(self):
+        server = FlakyServer(
+            {'stijl': generate_thesaurus(size=10)}, failures=1
+        )
+        with server:
+            stijl = OnroerendErfgoedProvider(
+                {'id': 'STIJL'},
+                base_url=server.base_url,
+                thesaurus='stijl',
+                retries=0
+            )
+            stijl.get_by_id(1)
+            self.assertEqual(1, len(server.requests))
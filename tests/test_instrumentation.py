@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+import warnings
+
+from skosprovider_oe.instrumentation import (
+    CallStats,
+    Instrumentation
+)
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+from fake_service import (
+    BASE_URL,
+    FakeSession
+)
+
+
+class InstrumentationTests(unittest.TestCase):
+
+    def test_nested_calls_count_towards_outer_call(self):
+        instrumentation = Instrumentation()
+        with instrumentation.trace() as calls:
+            with instrumentation.call('outer'):
+                with instrumentation.call('inner') as inner:
+                    inner.add(requests=2)
+        self.assertEqual(1, len(calls))
+        self.assertEqual('outer', calls[0].method)
+        self.assertEqual(2, calls[0].requests)
+
+    def test_hooks(self):
+        seen = []
+        instrumentation = Instrumentation(hooks=[seen.append])
+        with instrumentation.call('get_by_id', 'STIJL'):
+            pass
+        instrumentation.remove_hook(seen.append)
+        with instrumentation.call('get_by_id', 'STIJL'):
+            pass
+        self.assertEqual(1, len(seen))
+        self.assertIsInstance(seen[0], CallStats)
+        self.assertEqual('STIJL', seen[0].as_dict()['vocabulary_id'])
+
+    def test_timer_without_call(self):
+        instrumentation = Instrumentation()
+        with instrumentation.timer('build_time'):
+            pass
+        self.assertIsNone(instrumentation.current)
+
+    def test_bind(self):
+        instrumentation = Instrumentation()
+
+        def work():
+            instrumentation.current.add(requests=1)
+
+        with instrumentation.call('outer') as stats:
+            t = threading.Thread(target=instrumentation.bind(work))
+            t.start()
+            t.join()
+        self.assertEqual(1, stats.requests)
+
+    def test_trace_is_per_thread(self):
+        instrumentation = Instrumentation()
+
+        def work():
+            with instrumentation.call('other'):
+                pass
+
+        with instrumentation.trace() as calls:
+            t = threading.Thread(target=work)
+            t.start()
+            t.join()
+        self.assertEqual([], calls)
+
+
+class InstrumentedProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            max_workers=4
+        )
+        self.stijl.session = FakeSession()
+
+    def tearDown(self):
+        self.stijl.close()
+
+    def test_failing_hook(self):
+        def hook(stats):
+            raise RuntimeError('statsd down')
+        seen = []
+        self.stijl.instrumentation.add_hook(hook)
+        self.stijl.instrumentation.add_hook(seen.append)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.assertEqual(3, self.stijl.get_by_id(3).id)
+        self.assertEqual(1, len(w))
+        self.assertIn('statsd down', str(w[0].message))
+        self.assertEqual(['get_by_id'], [s.method for s in seen])
+
+    def test_get_by_id(self):
+        with self.stijl.instrumentation.trace() as calls:
+            self.stijl.get_by_id(3)
+        self.assertEqual(1, len(calls))
+        stats = calls[0]
+        self.assertEqual('get_by_id', stats.method)
+        self.assertEqual('STIJL', stats.vocabulary_id)
+        self.assertEqual(len(self.stijl.session.requests), stats.requests)
+        self.assertGreater(stats.bytes, 0)
+        self.assertGreater(stats.wall_time, 0)
+        self.assertGreaterEqual(stats.wall_time, stats.build_time)
+
+    def test_get_children_display(self):
+        with self.stijl.instrumentation.trace() as calls:
+            self.stijl.get_children_display(1)
+        self.assertEqual(['get_children_display'], [c.method for c in calls])
+        self.assertEqual(len(self.stijl.session.requests), calls[0].requests)
+
+    def test_shared_instrumentation(self):
+        seen = []
+        instrumentation = Instrumentation(hooks=[seen.append])
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            instrumentation=instrumentation
+        )
+        provider.session = FakeSession()
+        provider.find({'label': 'gotiek'})
+        provider.expand(3)
+        self.assertEqual(['find', 'expand'], [s.method for s in seen])
+        self.assertEqual([1, 1], [s.requests for s in seen])
+
+    def test_http_cache(self):
+        thesauri = {'stijl': generate_thesaurus(size=10)}
+        for max_age in (60, 0):
+            with FakeThesaurusServer(thesauri, max_age=max_age) as server:
+                stijl = OnroerendErfgoedProvider(
+                    {'id': 'STIJL'},
+                    base_url=server.base_url,
+                    thesaurus='stijl',
+                    http_cache=True
+                )
+                stijl.get_by_id(2)
+                count = len(server.requests)
+                server.reset()
+                with stijl.instrumentation.trace() as calls:
+                    stijl.get_by_id(2)
+                self.assertEqual(len(server.requests), calls[0].requests)
+                self.assertEqual(count if max_age == 0 else 0,
+                                 calls[0].requests)
+                self.assertEqual(count, calls[0].cached)
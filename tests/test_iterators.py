@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+from skosprovider_oe.http import iter_json_array
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+from fake_service import (
+    BASE_URL,
+    FakeSession
+)
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterJsonArrayTests(unittest.TestCase):
+
+    def test_chunks(self):
+        data = [
+            {'id': i, 'omschrijving': u'Kérk %d' % i, 'type': 'PT'}
+            for i in range(20)
+        ] + [1, 23, u'x', [1, 2], None]
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        for size in (1, 2, 3, 16, len(body)):
+            self.assertEqual(data, list(iter_json_array(chunked(body, size))))
+
+    def test_number_split_in_chunks(self):
+        for chunks in ([b'[-2500.', b'0]'], [b'[1', b'e2 ]'], [b'[tr', b'ue]']):
+            self.assertEqual(
+                json.loads(b''.join(chunks).decode('utf-8')),
+                list(iter_json_array(chunks))
+            )
+
+    def test_empty(self):
+        self.assertEqual([], list(iter_json_array([b' [', b' ] '])))
+
+    def test_lazy(self):
+        def chunks():
+            yield b'[{"id": 1}, '
+            raise AssertionError('Read too much.')
+        self.assertEqual({'id': 1}, next(iter_json_array(chunks())))
+
+    def test_invalid(self):
+        for body in (b'{}', b'[1,', b'[1 2]', b'[{"id": 1}', b'',
+                     b'[1x]'):
+            self.assertRaises(ValueError, list, iter_json_array([body]))
+
+
+class IteratorProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl'
+        )
+        self.stijl.session = FakeSession()
+        self.stijl.stream_chunk_size = 7
+
+    def test_iter_all(self):
+        self.assertEqual(self.stijl.get_all(), list(self.stijl.iter_all()))
+
+    def test_iter_all_limit_offset(self):
+        all = self.stijl.get_all()
+        self.assertEqual(
+            all[2:5], list(self.stijl.iter_all(offset=2, limit=3))
+        )
+        self.assertEqual(all[8:], list(self.stijl.iter_all(offset=8)))
+
+    def test_iter_find(self):
+        query = {'type': 'concept', 'label': 'romaans'}
+        self.assertEqual(
+            self.stijl.find(query), list(self.stijl.iter_find(query))
+        )
+
+    def test_iter_find_collection(self):
+        query = {'collection': {'id': 1, 'depth': 'all'}}
+        self.assertEqual(
+            self.stijl.find(query), list(self.stijl.iter_find(query))
+        )
+
+    def test_iter_find_unexisting_collection(self):
+        result = self.stijl.iter_find({'collection': {'id': 3}})
+        self.assertRaises(ValueError, list, result)
+
+    def test_response_closed(self):
+        responses = []
+
+        class RecordingSession(FakeSession):
+            def get(self, url, params=None, **kwargs):
+                r = super(RecordingSession, self).get(url, params, **kwargs)
+                responses.append(r)
+                return r
+
+        self.stijl.session = RecordingSession()
+        result = self.stijl.iter_all()
+        next(result)
+        self.assertFalse(responses[0].closed)
+        result.close()
+        self.assertTrue(responses[0].closed)
+
+    def test_instrumentation(self):
+        with self.stijl.instrumentation.trace() as calls:
+            for item in self.stijl.iter_all(limit=2):
+                pass
+        self.assertEqual(['iter_all'], [c.method for c in calls])
+        self.assertEqual(1, calls[0].requests)
+        self.assertGreater(calls[0].bytes, 0)
+
+    def test_snapshot(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            snapshot=True
+        )
+        stijl.session = FakeSession()
+        stijl.refresh_snapshot()
+        requests = len(stijl.session.requests)
+        self.assertEqual(
+            stijl.find({'label': 'a'}),
+            list(stijl.iter_find({'label': 'a'}))
+        )
+        self.assertEqual(requests, len(stijl.session.requests))
+
+
+class StreamingServerTests(unittest.TestCase):
+
+    def test_iter_all(self):
+        terms = generate_thesaurus(size=300)
+        with FakeThesaurusServer({'stijl': terms}) as server:
+            stijl = OnroerendErfgoedProvider(
+                {'id': 'STIJL'},
+                base_url=server.base_url,
+                thesaurus='stijl'
+            )
+            stijl.stream_chunk_size = 256
+            self.assertEqual(stijl.get_all(), list(stijl.iter_all()))
+            self.assertEqual(
+                stijl.get_all()[:20], list(stijl.iter_all(limit=20))
+            )
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from skosprovider.skos import (
+    Collection,
+    Concept
+)
+from skosprovider.utils import dict_dumper
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from fake_service import (
+    BASE_URL,
+    FakeSession
+)
+
+
+class LazyTests(unittest.TestCase):
+
+    def _get_provider(self, **kwargs):
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            **kwargs
+        )
+        provider.session = FakeSession()
+        return provider
+
+    def setUp(self):
+        self.stijl = self._get_provider(lazy=True)
+
+    def test_label_needs_one_request(self):
+        romaans = self.stijl.get_by_id(3)
+        self.assertIsInstance(romaans, Concept)
+        self.assertEqual('romaans', romaans.label('nl').label)
+        self.assertEqual(1, len(self.stijl.session.requests))
+        self.assertFalse(romaans.is_resolved('labels'))
+
+    def test_resolved_on_first_access(self):
+        romaans = self.stijl.get_by_id(7)
+        self.assertEqual(3, romaans.id)
+        del self.stijl.session.requests[:]
+        self.assertEqual([5], romaans.narrower)
+        self.assertEqual(
+            ['/5.json', '/6.json'],
+            sorted(
+                url[len(self.stijl.url):]
+                for url, params in self.stijl.session.requests
+            )
+        )
+        self.assertTrue(romaans.is_resolved('subordinate_arrays'))
+        self.assertFalse(romaans.is_resolved('broader'))
+        del self.stijl.session.requests[:]
+        self.assertEqual([6], romaans.subordinate_arrays)
+        self.assertEqual([], self.stijl.session.requests)
+
+    def test_collection(self):
+        regio = self.stijl.get_by_id(6)
+        self.assertIsInstance(regio, Collection)
+        self.assertEqual([8], regio.members)
+        self.assertEqual([3], regio.superordinates)
+        self.assertEqual([], regio.member_of)
+
+    def test_same_as_eager(self):
+        eager = self._get_provider()
+        self.assertEqual(dict_dumper(eager), dict_dumper(self.stijl))
+
+    def test_resolving_is_instrumented(self):
+        romaans = self.stijl.get_by_id(3)
+        with self.stijl.instrumentation.trace() as calls:
+            romaans.labels
+        self.assertEqual(['resolve'], [c.method for c in calls])
+        self.assertEqual(1, calls[0].requests)
+
+    def test_unknown(self):
+        self.assertFalse(self.stijl.get_by_id(404))
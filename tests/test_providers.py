@@ -6,27 +6,41 @@ from skosprovider_oe.providers import (
     OnroerendErfgoedProvider
 )
 
+from skosprovider_oe.testing import generate_thesaurus
+
 from skosprovider.skos import (
     Concept,
     Collection
 )
 
+from fake_service import (
+    BASE_URL,
+    FakeSession
+)
+
+TYPOLOGIE = generate_thesaurus(size=60, seed=1)
+
+GEBEURTENIS = generate_thesaurus(size=30, seed=2)
+
 
 class OnroerendErfgoedProviderTests(unittest.TestCase):
     def setUp(self):
         self.typologie = OnroerendErfgoedProvider(
             {'id': 'TYPOLOGIE'},
-            url='https://inventaris.onroerenderfgoed.be/thesaurus/typologie'
+            url=BASE_URL % 'typologie'
         )
+        self.typologie.session = FakeSession(TYPOLOGIE, 'typologie')
         self.stijl = OnroerendErfgoedProvider(
             {'id': 'STIJL'},
-            url='https://inventaris.onroerenderfgoed.be/thesaurus/stijl'
+            url=BASE_URL % 'stijl'
         )
+        self.stijl.session = FakeSession()
         self.gebeurtenis = OnroerendErfgoedProvider(
             {'id': 'GEBEURTENIS'},
-            base_url='https://inventaris.onroerenderfgoed.be/thesaurus/%s',
+            base_url=BASE_URL,
             thesaurus='gebeurtenis'
         )
+        self.gebeurtenis.session = FakeSession(GEBEURTENIS, 'gebeurtenis')
 
     def tearDown(self):
         del self.typologie
@@ -86,7 +100,7 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
         ))
 
     def test_find(self):
-        result = self.typologie.find({'label': 'kerken'})
+        result = self.typologie.find({'label': 'kerk'})
         self.assertGreater(len(result), 0)
         for c in result:
             self.assertIn('id', c)
@@ -105,7 +119,7 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
         # Use stijl thesaurus to speed things up
         result = self.stijl.find({
             'type': 'concept',
-            'label': 'isme'
+            'label': 'romaans'
         })
         self.assertGreater(len(result), 0)
         for c in result:
@@ -117,26 +131,26 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
     def test_find_in_collection(self):
         result = self.stijl.find({
             'collection': {
-                'id': 62,
+                'id': 2,
                 'depth': 'all'
             }
         })
         self.assertGreater(len(result), 0)
         resultids = [s.get('id') for s in result]
-        expansion = self.stijl.expand(62)
+        expansion = self.stijl.expand(2)
         self.assertEqual(set(expansion),set(resultids))
 
     def test_find_in_collection_depth(self):
-        members = self.typologie.find({
+        members = self.stijl.find({
             'collection': {
-                'id': 1604,
+                'id': 2,
                 'depth': 'members'
-            }, 
+            },
             'type': 'concept'
         })
-        all = self.typologie.find({
+        all = self.stijl.find({
             'collection': {
-                'id': 1604,
+                'id': 2,
                 'depth': 'all'
             },
             'type': 'concept'
@@ -162,7 +176,7 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
             self.assertIsInstance(cc, Concept)
 
     def test_expand_concept(self):
-        result = self.typologie.expand_concept(100)
+        result = self.stijl.expand_concept(3)
         self.assertGreater(len(result), 0)
 
     def test_expand_unexisting(self):
@@ -174,7 +188,7 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
 
         Querying for hoeven gives us both concepts and collections to test.
         '''
-        kerken = self.typologie.find({'label': 'hoeven'})
+        kerken = self.typologie.find({'label': 'hoeve'})
         for k in kerken:
             result = self.typologie.get_by_id(k['id'])
             try:
@@ -183,11 +197,11 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
                 self.assertIsInstance(result, Collection)
 
     def test_get_by_id_returns_primary_term(self):
-        result = self.stijl.get_by_id(58)
-        self.assertNotEquals(58, result.id)
+        result = self.stijl.get_by_id(7)
+        self.assertNotEquals(7, result.id)
 
     def test_get_by_id_conceptscheme(self):
-        result = self.stijl.get_by_id(58)
+        result = self.stijl.get_by_id(7)
         self.assertEqual(result.concept_scheme, self.stijl.concept_scheme)
 
     def test_get_top_display(self):
@@ -195,26 +209,26 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
         self.assertGreater(len(top), 0)
 
     def test_get_children_display_concepts(self):
-        kapeltypes = self.typologie.get_children_display(513)
+        kapeltypes = self.stijl.get_children_display(3)
         self.assertGreater(len(kapeltypes), 0)
 
     def test_get_children_display_collections(self):
-        cult_metal = self.stijl.get_children_display(63)
+        cult_metal = self.stijl.get_children_display(10)
         self.assertGreater(len(cult_metal), 0)
 
     def test_member_of(self):
         romaans = self.stijl.get_by_id(3)
-        self.assertEquals([60], romaans.member_of)
+        self.assertEquals([2], romaans.member_of)
 
     def test_superordinates_of_collection(self):
-        opgravingen_naar_methode = self.gebeurtenis.get_by_id(67)
-        self.assertIn(38, opgravingen_naar_methode.superordinates)
-        self.assertEqual(len(opgravingen_naar_methode.superordinates), 1)
+        romaans_naar_regio = self.stijl.get_by_id(6)
+        self.assertIn(3, romaans_naar_regio.superordinates)
+        self.assertEqual(len(romaans_naar_regio.superordinates), 1)
 
     def test_subordinates_of_collection(self):
-        archeologische_opgravingen = self.gebeurtenis.get_by_id(38)
-        self.assertIn(67, archeologische_opgravingen.subordinate_arrays)
-        self.assertEqual(len(archeologische_opgravingen.subordinate_arrays), 3)
+        romaans = self.stijl.get_by_id(3)
+        self.assertIn(6, romaans.subordinate_arrays)
+        self.assertEqual(len(romaans.subordinate_arrays), 1)
 
     def test_notes(self):
         romaans = self.stijl.get_by_id(3)
@@ -222,23 +236,22 @@ class OnroerendErfgoedProviderTests(unittest.TestCase):
         self.assertIsInstance(romaans.notes, list)
         self.assertIsInstance(romaans.notes[0], Note)
         note_values = [note_element.note for note_element in romaans.notes]
-        note_1 = 'De romaanse bouwstijl wordt gekenmerkt door massieve stenen muren met kleine gevelopeningen, doorgaans met rondboog en soms gedeeld door middenzuiltjes. De overdekking gebeurde met een vlak houten gewelf, of - minder courant - met stenen ton-, kruis- en koepelgewelven. De decoratieve afwerking wordt gekarakteriseerd door rondboogfriezen, rondboognissen en lisenen. (ca. 10de eeuw tot 1200)'
+        note_1 = 'Massieve muren en rondbogen.'
         self.assertIn(note_1, note_values)
-        ad_hoc = self.gebeurtenis.get_by_id(66)
-        self.assertEqual(0, len(ad_hoc.notes))
-        actualisatie = self.gebeurtenis.get_by_id(120)
-        self.assertEqual(1, len(actualisatie.notes))
+        gotiek = self.stijl.get_by_id(4)
+        self.assertEqual(0, len(gotiek.notes))
+        self.assertEqual(1, len(romaans.notes))
 
     def test_source(self):
         romaans = self.stijl.get_by_id(3)
         self.assertIsInstance(romaans.sources, list)
-        source = 'HASLINGHUIS, E.J. en JANSE, H., Verklarend woordenboek van de westerse architectuur- en bouwhistorie: bouwkundige termen, Leiden, 2005.'
+        source = 'HASLINGHUIS, E.J., Bouwkundige termen, 2005.'
         sources = [s.citation for s in romaans.sources]
         assert source in sources
 
     def test_matches(self):
-        agr_ls = self.typologie.get_by_id(2103)
-        self.assertIsInstance(agr_ls.matches, dict)
-        assert 'https://id.erfgoed.net/thesauri/erfgoedtypes/2103' == agr_ls.uri
-        assert 'related' in agr_ls.matches
-        assert 'http://vocab.getty.edu/aat/300008631' in agr_ls.matches['related']
+        romaans = self.stijl.get_by_id(3)
+        self.assertIsInstance(romaans.matches, dict)
+        assert 'urn:x-oe:stijl:3' == romaans.uri
+        assert 'related' in romaans.matches
+        assert 'http://vocab.getty.edu/aat/300020775' in romaans.matches['related']
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import json
+import pickle
+import unittest
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.record import TermRecord
+
+from fake_service import (
+    BASE_URL,
+    FakeSession,
+    TERMS
+)
+
+
+class TermRecordTests(unittest.TestCase):
+
+    def setUp(self):
+        self.term = copy.deepcopy(TERMS[3])
+        self.record = TermRecord(self.term)
+
+    def test_behaves_like_dict(self):
+        self.assertEqual(self.term, self.record)
+        self.assertEqual(self.record, self.term)
+        self.assertEqual(self.term, self.record.as_dict())
+        self.assertEqual(sorted(self.term), sorted(self.record))
+        self.assertEqual(len(self.term), len(self.record))
+        self.assertEqual([5, 6], self.record['narrower_terms'])
+        self.assertIsInstance(self.record['narrower_terms'], list)
+        self.assertEqual('Massieve muren en rondbogen.',
+                         self.record['scope_note'])
+
+    def test_missing_keys(self):
+        self.assertNotIn('use', self.record)
+        self.assertNotIn('history_note', self.record)
+        self.assertIsNone(self.record.get('use'))
+        self.assertEqual([], self.record.get('related_terms', []))
+        self.assertRaises(KeyError, lambda: self.record['use'])
+
+    def test_compact(self):
+        self.assertFalse(hasattr(self.record, '__dict__'))
+        other = TermRecord(json.loads(json.dumps(TERMS[4])))
+        self.assertIs(self.record['language'], other['language'])
+        self.assertIs(self.record['term_type'], other['term_type'])
+
+    def test_read_only(self):
+        def assign():
+            self.record['term'] = 'gotiek'
+        self.assertRaises(TypeError, assign)
+
+    def test_other_ids(self):
+        record = TermRecord({'id': 'a', 'narrower_terms': ['b', 1]})
+        self.assertEqual(['b', 1], record['narrower_terms'])
+
+    def test_pickle(self):
+        self.assertEqual(
+            self.term, pickle.loads(pickle.dumps(self.record))
+        )
+
+    def test_from_dict(self):
+        self.assertIs(self.record, TermRecord.from_dict(self.record))
+        self.assertIs(False, TermRecord.from_dict(False))
+
+
+class ProviderRecordTests(unittest.TestCase):
+
+    def test_cache_keeps_records(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=True
+        )
+        stijl.session = FakeSession()
+        stijl.get_by_id(3)
+        cached = stijl.cache.get((stijl.url, '3'))
+        self.assertIsInstance(cached, TermRecord)
+        self.assertEqual(TERMS[3], cached)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import unittest
+
+from skosprovider_oe.cache import TermCache
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.refresh import RefreshWorker
+
+from fake_service import (
+    BASE_URL,
+    FakeSession,
+    FakeTimer
+)
+
+
+class UnreliableSession(FakeSession):
+    '''
+    A session for a service that can be taken down.
+    '''
+
+    down = False
+
+    def get(self, url, params=None, **kwargs):
+        if self.down:
+            raise IOError('Service unavailable.')
+        return super(UnreliableSession, self).get(url, params, **kwargs)
+
+
+class RefreshWorkerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = RefreshWorker(rate=None)
+
+    def tearDown(self):
+        self.worker.close()
+
+    def test_refresh(self):
+        done = []
+        self.assertTrue(self.worker.submit('a', done.append, 1))
+        self.assertTrue(self.worker.join(5))
+        self.assertEqual([1], done)
+        self.assertEqual(1, self.worker.stats['refreshed'])
+
+    def test_deduplicate(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        self.worker.submit('a', block)
+        started.wait(5)
+        self.assertTrue(self.worker.is_pending('a'))
+        self.assertFalse(self.worker.submit('a', block))
+        release.set()
+        self.worker.join(5)
+        self.assertEqual(
+            {'submitted': 1, 'deduplicated': 1, 'refreshed': 1,
+             'failed': 0, 'pending': 0},
+            self.worker.stats
+        )
+
+    def test_failure(self):
+        def fail():
+            raise IOError('Connection reset.')
+        self.worker.submit('a', fail)
+        self.worker.join(5)
+        self.assertEqual(1, self.worker.failed)
+        self.assertIsInstance(self.worker.last_error, IOError)
+        self.assertTrue(self.worker.submit('a', fail))
+
+    def test_rate(self):
+        worker = RefreshWorker(rate=50)
+        times = []
+        for key in range(3):
+            worker.submit(key, lambda: times.append(time.time()))
+        worker.join(5)
+        worker.close()
+        self.assertGreaterEqual(times[2] - times[0], 0.035)
+
+    def test_close(self):
+        self.worker.close()
+        self.assertFalse(self.worker.submit('a', lambda: None))
+
+
+class StaleWhileRevalidateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            cache=TermCache(ttl=60, timer=self.timer),
+            stale_while_revalidate=True,
+            max_stale=3600,
+            refresh_rate=None
+        )
+        self.stijl.session = UnreliableSession()
+
+    def tearDown(self):
+        self.stijl.close()
+
+    def test_serves_stale_while_refreshing(self):
+        self.assertEqual('gotiek', self.stijl.get_by_id(4).label().label)
+        self.stijl.session.terms[4]['term'] = 'gotische stijl'
+        self.timer.now = 120
+        self.assertEqual('gotiek', self.stijl.get_by_id(4).label().label)
+        self.assertTrue(self.stijl.refresher.join(5))
+        self.assertEqual(
+            'gotische stijl', self.stijl.get_by_id(4).label().label
+        )
+
+    def test_service_down(self):
+        self.stijl.get_by_id(4)
+        self.stijl.find({'type': 'concept'})
+        self.stijl.session.down = True
+        self.timer.now = 120
+        self.assertEqual('gotiek', self.stijl.get_by_id(4).label().label)
+        self.assertEqual(5, len(self.stijl.find({'type': 'concept'})))
+        self.stijl.refresher.join(5)
+        stats = self.stijl.refresher.stats
+        self.assertEqual(0, stats['refreshed'])
+        self.assertEqual(stats['submitted'], stats['failed'])
+        self.timer.now = 60 + 3600 + 1
+        self.assertRaises(IOError, self.stijl.get_by_id, 4)
+
+    def test_subtree(self):
+        self.stijl.session.down = False
+        self.stijl.expand(6)
+        self.stijl.closure.clear()
+        self.stijl.session.down = True
+        self.timer.now = 120
+        self.assertEqual([6, 8], self.stijl.expand(6))
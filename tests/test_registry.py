@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from skosprovider.registry import Registry
+
+from skosprovider_oe.registry import ProviderFactory
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+
+class ProviderFactoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeThesaurusServer({
+            'stijl': generate_thesaurus(size=40, seed=1),
+            'typologie': generate_thesaurus(size=60, seed=2)
+        })
+        self.server.start()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def _get_factory(self, **kwargs):
+        factory = ProviderFactory(base_url=self.server.base_url, **kwargs)
+        self.addCleanup(factory.close)
+        return factory
+
+    def test_shared_resources(self):
+        factory = self._get_factory(cache_maxsize=50)
+        providers = factory.build_all(['stijl', 'typologie'])
+        stijl = providers['stijl']
+        typologie = providers['typologie']
+        self.assertEqual('STIJL', stijl.get_vocabulary_id())
+        self.assertIs(stijl.session, typologie.session)
+        self.assertIs(stijl.cache, typologie.cache)
+        self.assertIs(stijl._get_executor(), typologie._get_executor())
+        self.assertIs(stijl.instrumentation, typologie.instrumentation)
+        self.assertNotEqual(stijl.url, typologie.url)
+        for id in range(1, 41):
+            stijl.get_by_id(id)
+            typologie.get_by_id(id)
+        self.assertEqual(50, len(factory.cache))
+        self.assertGreater(factory.cache.stats['evictions'], 0)
+
+    def test_clear_cache_keeps_other_thesauri(self):
+        factory = self._get_factory()
+        providers = factory.build_all(['stijl', 'typologie'])
+        providers['stijl'].get_by_id(1)
+        providers['typologie'].get_by_id(1)
+        providers['stijl'].clear_cache()
+        self.assertNotIn((providers['stijl'].url, '1'), factory.cache)
+        self.assertIn((providers['typologie'].url, '1'), factory.cache)
+
+    def test_metadata(self):
+        factory = self._get_factory()
+        providers = factory.build_all({'stijl': {'id': 'STIJLEN'}})
+        self.assertEqual('STIJLEN', providers['stijl'].get_vocabulary_id())
+        registry = Registry()
+        factory.register(registry)
+        self.assertIs(providers['stijl'], registry.get_provider('STIJLEN'))
+
+    def test_warm_up_snapshots(self):
+        snapshots = os.path.join(self.dir, 'snapshots')
+        factory = self._get_factory(snapshot_dir=snapshots)
+        factory.build_all(['stijl', 'typologie'])
+        timings = factory.warm_up()
+        self.assertEqual(set(['stijl', 'typologie']), set(timings))
+        self.assertEqual(
+            ['stijl.snapshot', 'typologie.snapshot'],
+            sorted(os.listdir(snapshots))
+        )
+        self.server.reset()
+        other = self._get_factory(snapshot_dir=snapshots)
+        other.build_all(['stijl', 'typologie'])
+        other.warm_up()
+        self.assertEqual([], self.server.requests)
+        self.assertTrue(other.providers['typologie'].get_by_id(1))
+
+    def test_warm_up_cache(self):
+        factory = self._get_factory()
+        factory.build_all(['stijl'])
+        factory.warm_up()
+        self.server.reset()
+        factory.providers['stijl'].get_top_display()
+        self.assertEqual([], self.server.requests)
+
+    def test_warm_up_failure(self):
+        factory = self._get_factory()
+        factory.build_all(['stijl', 'onbestaand'])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            timings = factory.warm_up()
+        self.assertEqual(['stijl'], list(timings))
+        self.assertEqual(1, len(w))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import unittest
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.search import (
+    LabelIndex,
+    normalize
+)
+
+from skosprovider_oe.snapshot import ThesaurusIndex
+
+from fake_service import (
+    BASE_URL,
+    TERMS,
+    FakeSession
+)
+
+
+def get_terms():
+    terms = copy.deepcopy(TERMS)
+    terms[12] = {
+        'id': 12, 'term': u'Art Déco', 'term_type': 'PT',
+        'language': 'nl', 'uri': 'urn:x-oe:stijl:12',
+        'broader_term': 10
+    }
+    terms[10]['narrower_terms'].append(12)
+    return terms
+
+
+class NormalizeTests(unittest.TestCase):
+
+    def test_normalize(self):
+        self.assertEqual(u'art deco', normalize(u'Art Déco'))
+        self.assertEqual(u'romaans', normalize(u' ROMAANS '))
+
+
+class LabelIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LabelIndex(ThesaurusIndex(get_terms().values()))
+
+    def _ids(self, *args, **kwargs):
+        return [x['id'] for x in self.index.search(*args, **kwargs)]
+
+    def test_len(self):
+        self.assertEqual(11, len(self.index))
+
+    def test_ranking(self):
+        self.assertEqual([3, 6, 8, 5], self._ids('romaans'))
+
+    def test_alternative_labels(self):
+        self.assertEqual([3], self._ids('romaanse stijl'))
+
+    def test_accents_and_case(self):
+        self.assertEqual([12], self._ids(u'DECO'))
+        self.assertEqual([12], self._ids(u'art déc'))
+
+    def test_types(self):
+        self.assertEqual([6], self._ids('romaans', types=['HR', 'NL']))
+
+    def test_limit(self):
+        self.assertEqual([3, 6], self._ids('romaans', limit=2))
+
+    def test_no_match(self):
+        self.assertEqual([], self._ids('barok'))
+
+    def test_result(self):
+        self.assertEqual(
+            [{'id': 4, 'omschrijving': 'gotiek', 'type': 'PT'}],
+            self.index.search('gotiek')
+        )
+
+
+class LocalSearchProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            local_search=True
+        )
+        self.stijl.session = FakeSession(get_terms())
+
+    def test_implies_snapshot(self):
+        self.assertTrue(self.stijl.snapshot)
+
+    def test_find(self):
+        self.assertEqual(
+            [{'id': 12, 'label': u'Art Déco'}],
+            self.stijl.find({'label': 'deco'})
+        )
+        count = len(self.stijl.session.requests)
+        self.stijl.find({'label': 'romaans', 'type': 'concept'})
+        self.assertEqual(count, len(self.stijl.session.requests))
+
+    def test_find_limit(self):
+        self.assertEqual(
+            [3, 6],
+            [x['id'] for x in self.stijl.find({'label': 'romaans'}, limit=2)]
+        )
+
+    def test_find_in_collection(self):
+        result = self.stijl.find({
+            'label': 'romaans',
+            'collection': {'id': 6, 'depth': 'all'}
+        })
+        self.assertEqual([6, 8], [x['id'] for x in result])
+        result = self.stijl.find({
+            'label': 'romaans',
+            'collection': {'id': 2}
+        })
+        self.assertEqual([3], [x['id'] for x in result])
+
+    def test_label_index_rebuilt_after_refresh(self):
+        self.stijl.find({'label': 'deco'})
+        self.stijl.session.terms[12]['term'] = 'Art Nouveau'
+        self.stijl.refresh_snapshot()
+        self.assertEqual([], self.stijl.find({'label': 'deco'}))
+        self.assertEqual(1, len(self.stijl.find({'label': 'nouveau'})))
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.snapshot import (
+    ThesaurusIndex,
+    read_snapshot,
+    write_snapshot
+)
+
+from skosprovider.skos import Concept
+
+from fake_service import (
+    BASE_URL,
+    TERMS,
+    FailingSession,
+    FakeSession
+)
+
+
+class ThesaurusIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ThesaurusIndex(TERMS.values(), fetched=100)
+
+    def test_len(self):
+        self.assertEqual(len(TERMS), len(self.index))
+        self.assertIn(3, self.index)
+        self.assertIn('3', self.index)
+        self.assertEqual(100, self.index.fetched)
+
+    def test_get_term(self):
+        self.assertEqual('romaans', self.index.get_term('3')['term'])
+        self.assertFalse(self.index.get_term(404))
+
+    def test_hierarchy(self):
+        self.assertEqual([5, 6], self.index.get_narrower(3))
+        self.assertEqual(2, self.index.get_broader(3))
+        self.assertIsNone(self.index.get_broader(1))
+
+    def test_resolve(self):
+        self.assertEqual(3, self.index.resolve(7))
+        self.assertEqual(3, self.index.resolve(3))
+        self.assertFalse(self.index.resolve(404))
+
+    def test_get_list(self):
+        self.assertEqual(
+            [{'id': 1, 'omschrijving': 'Stijlen en culturen', 'type': 'HR'}],
+            self.index.get_list(['HR'])
+        )
+        self.assertEqual(
+            [8, 3, 6, 7, 5],
+            [x['id'] for x in self.index.get_list(term='ROMAANS')]
+        )
+
+    def test_get_subtree(self):
+        self.assertEqual([3, 5, 6, 8], self.index.get_subtree(3))
+        self.assertFalse(self.index.get_subtree(404))
+
+    def test_updated(self):
+        terms = copy.deepcopy(TERMS)
+        del terms[4]
+        terms[2]['narrower_terms'] = [3]
+        terms[5]['term'] = 'vroeg romaans'
+        terms[12] = {
+            'id': 12, 'term': 'IJzertijd', 'term_type': 'PT',
+            'language': 'nl', 'broader_term': 10
+        }
+        terms[10]['narrower_terms'] = [11, 12]
+        updated = self.index.updated(
+            [terms[2], terms[5], terms[10], terms[12]], [4], fetched=200
+        )
+        expected = ThesaurusIndex(terms.values())
+        self.assertEqual(200, updated.fetched)
+        self.assertEqual(len(expected), len(updated))
+        self.assertNotIn(4, updated)
+        self.assertIn(4, self.index)
+        self.assertEqual(expected.get_list(), updated.get_list())
+        for id in terms:
+            self.assertEqual(expected.get_term(id), updated.get_term(id))
+            self.assertEqual(expected.get_subtree(id), updated.get_subtree(id))
+
+
+class SnapshotProviderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            snapshot=True
+        )
+        self.stijl.session = FakeSession()
+        self.remote = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl'
+        )
+        self.remote.session = FakeSession()
+
+    def test_loads_once(self):
+        self.assertIsNone(self.stijl.index)
+        self.stijl.get_by_id(3)
+        count = len(self.stijl.session.requests)
+        self.assertEqual(1 + len(TERMS), count)
+        self.stijl.get_by_id(6)
+        self.stijl.find({'label': 'romaans'})
+        self.stijl.expand(1)
+        self.stijl.get_top_concepts()
+        self.stijl.get_children_display(3)
+        self.assertEqual(count, len(self.stijl.session.requests))
+
+    def test_same_results_as_remote(self):
+        for id in TERMS:
+            local = self.stijl.get_by_id(id)
+            remote = self.remote.get_by_id(id)
+            self.assertEqual(type(remote), type(local))
+            self.assertEqual(remote.id, local.id)
+            self.assertEqual(remote.labels, local.labels)
+            self.assertEqual(remote.member_of, local.member_of)
+            if isinstance(local, Concept):
+                self.assertEqual(remote.broader, local.broader)
+                self.assertEqual(remote.narrower, local.narrower)
+                self.assertEqual(
+                    remote.subordinate_arrays, local.subordinate_arrays
+                )
+            else:
+                self.assertEqual(remote.members, local.members)
+            self.assertEqual(
+                sorted(self.remote.expand(id)),
+                sorted(self.stijl.expand(id))
+            )
+        self.assertEqual(
+            [x['id'] for x in self.remote.get_top_concepts()],
+            [x['id'] for x in self.stijl.get_top_concepts()]
+        )
+
+    def test_find(self):
+        result = self.stijl.find({'type': 'concept', 'label': 'romaans'})
+        self.assertEqual(set([3, 5, 8]), set([x['id'] for x in result]))
+        result = self.stijl.find({'collection': {'id': 2, 'depth': 'all'}})
+        self.assertEqual(set([2, 3, 4, 5, 6, 8]), set([x['id'] for x in result]))
+
+    def test_unexisting(self):
+        self.assertFalse(self.stijl.get_by_id(404))
+        self.assertFalse(self.stijl.expand(404))
+
+    def test_refresh_snapshot(self):
+        self.stijl.get_by_id(3)
+        self.stijl.session.terms[4]['term'] = 'gothiek'
+        self.assertEqual('gotiek', self.stijl.get_by_id(4).label().label)
+        self.stijl.refresh_snapshot()
+        self.assertEqual('gothiek', self.stijl.get_by_id(4).label().label)
+
+    def test_snapshot_ttl(self):
+        self.stijl.snapshot_ttl = 60
+        self.stijl.get_by_id(3)
+        expired = self.stijl.index
+        expired.fetched -= 61
+        self.stijl.session.terms[4]['term'] = 'gothiek'
+        self.assertEqual('gotiek', self.stijl.get_by_id(4).label().label)
+        self.stijl.close()
+        self.assertIsNot(expired, self.stijl.index)
+        self.assertEqual(2 * (1 + len(TERMS)), len(self.stijl.session.requests))
+        self.assertEqual('gothiek', self.stijl.get_by_id(4).label().label)
+
+    def test_failed_reload_keeps_snapshot(self):
+        self.stijl.snapshot_ttl = 60
+        self.stijl.get_by_id(3)
+        expired = self.stijl.index
+        expired.fetched -= 61
+        self.stijl.session = FailingSession()
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.assertEqual('romaans', self.stijl.get_by_id(3).label().label)
+            self.stijl.close()
+        self.assertEqual(1, len(w))
+        self.assertIs(expired, self.stijl.index)
+        self.assertEqual(1, len(self.stijl.session.requests))
+        self.assertEqual('romaans', self.stijl.get_by_id(3).label().label)
+        self.stijl.close()
+        self.assertEqual(1, len(self.stijl.session.requests))
+
+    def test_load_snapshot_in_parallel(self):
+        index = self.stijl.load_snapshot()
+        self.assertIsNotNone(self.stijl._executor)
+        self.assertEqual(
+            sorted(TERMS, key=lambda id: TERMS[id]['term'].lower()),
+            [e[0] for e in index.entries()]
+        )
+        self.stijl.close()
+
+    def test_load_snapshot_unexisting_thesaurus(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijlen',
+            snapshot=True
+        )
+        stijl.session = FakeSession()
+        self.assertRaises(LookupError, stijl.load_snapshot)
+
+
+class NoNetworkSession(object):
+
+    def get(self, url, params=None, **kwargs):
+        raise AssertionError('No network access expected: %s' % url)
+
+
+class SnapshotFileTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'stijl.snap')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _get_provider(self, session):
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            snapshot_file=self.path
+        )
+        provider.session = session
+        return provider
+
+    def test_write_read(self):
+        index = ThesaurusIndex(
+            TERMS.values(), fetched=100, thesaurus='stijl', url='http://x'
+        )
+        write_snapshot(index, self.path)
+        loaded = read_snapshot(self.path)
+        self.assertEqual(100, loaded.fetched)
+        self.assertEqual('stijl', loaded.thesaurus)
+        self.assertEqual('http://x', loaded.url)
+        self.assertEqual(len(index), len(loaded))
+        for id in TERMS:
+            self.assertEqual(index.get_term(id), loaded.get_term(id))
+            self.assertEqual(index.get_subtree(id), loaded.get_subtree(id))
+            self.assertEqual(index.resolve(id), loaded.resolve(id))
+        self.assertEqual(index.get_list(), loaded.get_list())
+        self.assertFalse(loaded.get_term(404))
+        self.assertEqual(
+            sorted(TERMS), sorted(t['id'] for t in loaded.terms())
+        )
+
+    def test_update_read_snapshot(self):
+        write_snapshot(ThesaurusIndex(TERMS.values()), self.path)
+        index = read_snapshot(self.path)
+        term = dict(TERMS[5], term='vroeg romaans')
+        updated = index.updated([term], [8])
+        self.assertEqual('vroeg romaans', updated.get_term(5)['term'])
+        self.assertEqual(TERMS[5]['term'], index.get_term(5)['term'])
+        self.assertFalse(updated.get_term(8))
+        self.assertEqual(len(TERMS) - 1, len(list(updated.terms())))
+        updated = updated.updated([], [5])
+        self.assertFalse(updated.get_term(5))
+        self.assertFalse(updated.get_term(8))
+        self.assertEqual('romaans', updated.get_term(3)['term'])
+
+    def test_read_invalid_file(self):
+        for data in (b'not a snapshot', b''):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            self.assertRaises(ValueError, read_snapshot, self.path)
+
+    def test_read_truncated_file(self):
+        write_snapshot(ThesaurusIndex(TERMS.values()), self.path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for size in (len(data) - 1, len(data) // 2, 20):
+            with open(self.path, 'wb') as f:
+                f.write(data[:size])
+            self.assertRaises(ValueError, read_snapshot, self.path)
+
+    def test_unreadable_snapshot_file_is_refetched(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'')
+        stijl = self._get_provider(FakeSession())
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.assertEqual('romaans', stijl.get_by_id(3).label().label)
+        self.assertEqual(1, len(w))
+        self.assertEqual(1 + len(TERMS), len(stijl.session.requests))
+        self.assertEqual(len(TERMS), len(read_snapshot(self.path)))
+
+    def test_provider_writes_and_reads_snapshot_file(self):
+        stijl = self._get_provider(FakeSession())
+        self.assertTrue(stijl.snapshot)
+        romaans = stijl.get_by_id(3)
+        self.assertTrue(os.path.exists(self.path))
+        offline = self._get_provider(NoNetworkSession())
+        offline_romaans = offline.get_by_id(3)
+        self.assertEqual(romaans.labels, offline_romaans.labels)
+        self.assertEqual(romaans.narrower, offline_romaans.narrower)
+        self.assertEqual(stijl.expand(1), offline.expand(1))
+        self.assertEqual(
+            stijl.find({'label': 'romaans'}),
+            offline.find({'label': 'romaans'})
+        )
+
+    def test_expired_snapshot_file_is_refetched(self):
+        index = ThesaurusIndex(TERMS.values(), fetched=100)
+        write_snapshot(index, self.path)
+        stijl = self._get_provider(FakeSession())
+        stijl.snapshot_ttl = 60
+        stijl.get_by_id(3)
+        stijl.close()
+        self.assertEqual(1 + len(TERMS), len(stijl.session.requests))
+        self.assertGreater(read_snapshot(self.path).fetched, 100)
+
+    def test_snapshot_file_of_other_thesaurus_is_refetched(self):
+        index = ThesaurusIndex(
+            TERMS.values(), thesaurus='typologie',
+            url=BASE_URL % 'typologie'
+        )
+        write_snapshot(index, self.path)
+        stijl = self._get_provider(FakeSession())
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            stijl.get_by_id(3)
+        self.assertEqual(1, len(w))
+        self.assertEqual(1 + len(TERMS), len(stijl.session.requests))
+        self.assertEqual(stijl.url, read_snapshot(self.path).url)
+
+    def test_save_snapshot(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'}, base_url=BASE_URL, thesaurus='stijl'
+        )
+        stijl.session = FakeSession()
+        stijl.save_snapshot(self.path)
+        self.assertFalse(stijl.snapshot)
+        self.assertEqual(len(TERMS), len(read_snapshot(self.path)))
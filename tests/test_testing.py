@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+from skosprovider.skos import (
+    Concept,
+    Collection
+)
+
+
+class GenerateThesaurusTests(unittest.TestCase):
+
+    def test_generate(self):
+        terms = generate_thesaurus(size=50, depth=3, branching=4)
+        types = [t['term_type'] for t in terms.values()]
+        self.assertEqual(1, types.count('HR'))
+        self.assertEqual(50, len([t for t in types if t != 'ND']))
+        self.assertIn('ND', types)
+        for term in terms.values():
+            for nid in term.get('narrower_terms', []):
+                self.assertEqual(term['id'], terms[nid]['broader_term'])
+            if term['term_type'] == 'ND':
+                self.assertIn(term['id'], terms[term['use']]['use_for'])
+
+    def test_depth(self):
+        terms = generate_thesaurus(size=1000, depth=2, branching=3)
+        self.assertEqual(1 + 3 + 9, len([
+            t for t in terms.values() if t['term_type'] != 'ND'
+        ]))
+
+    def test_seed(self):
+        self.assertEqual(
+            generate_thesaurus(seed=5),
+            generate_thesaurus(seed=5)
+        )
+
+
+class FakeThesaurusServerTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.terms = generate_thesaurus(size=60, depth=3, branching=4)
+        cls.server = FakeThesaurusServer({'stijl': cls.terms}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=self.server.base_url,
+            thesaurus='stijl'
+        )
+
+    def tearDown(self):
+        self.stijl.close()
+
+    def test_get_by_id(self):
+        top = self.stijl.get_by_id(1)
+        self.assertIsInstance(top, Collection)
+        self.assertEqual(self.terms[1]['narrower_terms'], top.members)
+        concept = self.stijl.get_by_id(top.members[0])
+        self.assertIsInstance(concept, Concept)
+        self.assertFalse(self.stijl.get_by_id(987654321))
+        self.assertTrue(self.server.requests)
+
+    def test_find(self):
+        result = self.stijl.find({'label': 'kerk'})
+        self.assertEqual(
+            sorted(
+                t['id'] for t in self.terms.values()
+                if 'kerk' in t['term'] and t['term_type'] != 'ND'
+            ),
+            sorted(x['id'] for x in result)
+        )
+
+    def test_expand(self):
+        self.assertEqual(
+            len([t for t in self.terms.values() if t['term_type'] != 'ND']),
+            len(self.stijl.expand(1))
+        )
+        self.assertFalse(self.stijl.expand(987654321))
+
+    def test_http_cache_revalidation(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=self.server.base_url,
+            thesaurus='stijl',
+            http_cache=True
+        )
+        stijl.get_all()
+        self.assertEqual(stijl.get_all(), list(stijl.iter_all()))
+        self.assertEqual(
+            {'fresh': 0, 'revalidated': 2, 'fetched': 1},
+            stijl.http_cache.stats
+        )
+
+    def test_snapshot(self):
+        stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=self.server.base_url,
+            thesaurus='stijl',
+            snapshot=True
+        )
+        self.assertEqual(len(self.terms), len(stijl.refresh_snapshot()))
+        self.server.reset()
+        stijl.get_top_concepts()
+        self.assertEqual([], self.server.requests)
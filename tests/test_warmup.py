@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from skosprovider_oe.cache import SQLiteCache
+
+from skosprovider_oe.providers import (
+    OnroerendErfgoedProvider
+)
+
+from skosprovider_oe.testing import (
+    FakeThesaurusServer,
+    generate_thesaurus
+)
+
+from skosprovider_oe.warmup import (
+    RateLimiter,
+    crawl,
+    main,
+    warm_up
+)
+
+from fake_service import (
+    BASE_URL,
+    FailingSession,
+    FakeSession,
+    TERMS
+)
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+class Capture(object):
+    '''
+    Collects what is written to a stream.
+    '''
+
+    def __init__(self):
+        self.data = []
+
+    def write(self, data):
+        self.data.append(data)
+
+    def flush(self):
+        pass
+
+    def __str__(self):
+        return ''.join(self.data)
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def test_spaces_out_requests(self):
+        clock = FakeClock()
+        limiter = RateLimiter(10, timer=clock, sleep=clock.sleep)
+        for i in range(3):
+            limiter.wait()
+        self.assertEqual(2, len(clock.slept))
+        self.assertAlmostEqual(0.1, clock.slept[0])
+        self.assertAlmostEqual(0.2, clock.slept[1])
+
+    def test_unlimited(self):
+        clock = FakeClock()
+        limiter = RateLimiter(None, timer=clock, sleep=clock.sleep)
+        for i in range(3):
+            limiter.wait()
+        self.assertEqual([], clock.slept)
+
+
+class CrawlTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stijl = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            max_workers=4
+        )
+        self.stijl.session = FakeSession()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.stijl.close()
+        shutil.rmtree(self.dir)
+
+    def test_crawl(self):
+        index, report = crawl(self.stijl)
+        self.assertEqual(len(TERMS), len(index))
+        self.assertEqual(len(TERMS), report.terms)
+        self.assertEqual(len(TERMS) + 1, report.requests)
+        self.assertEqual(5, report.levels)
+        self.assertEqual([], report.unreachable)
+        self.assertEqual({}, report.failed)
+        self.assertEqual([5, 6], index.get_narrower(3))
+
+    def test_crawl_breadth_first(self):
+        self.stijl.max_workers = 1
+        index, report = crawl(self.stijl)
+        fetched = [
+            url for url, params in self.stijl.session.requests
+            if not url.endswith('lijst.json')
+        ]
+        ids = [int(url.rsplit('/', 1)[1][:-len('.json')]) for url in fetched]
+        self.assertEqual(1, ids[0])
+        self.assertEqual(set([2, 10]), set(ids[1:3]))
+        self.assertEqual(set([3, 4, 11]), set(ids[3:6]))
+        self.assertEqual(8, ids[-1])
+
+    def test_unreachable(self):
+        self.stijl.session.terms[12] = {
+            'id': 12, 'term': 'neogotiek', 'term_type': 'PT',
+            'language': 'nl-BE', 'narrower_terms': []
+        }
+        index, report = crawl(self.stijl)
+        self.assertEqual([12], report.unreachable)
+        self.assertIn(12, index)
+
+    def test_missing(self):
+        self.stijl.session.terms[10]['narrower_terms'] = [11, 404]
+        index, report = crawl(self.stijl)
+        self.assertEqual({}, report.failed)
+        self.assertEqual(['404'], report.missing)
+        self.assertEqual(len(TERMS), len(index))
+        self.assertIn('1 missing', str(report))
+
+    def test_failed(self):
+        self.stijl.session = FailingSession([6])
+        index, report = crawl(self.stijl)
+        self.assertEqual(['6'], list(report.failed))
+        self.assertIsInstance(report.failed['6'], IOError)
+        self.assertNotIn(6, index)
+        self.assertEqual([8], report.unreachable)
+        self.assertIn('1 failed: 6', str(report))
+
+    def test_warm_up(self):
+        output = os.path.join(self.dir, 'stijl.snapshot')
+        cache = SQLiteCache(os.path.join(self.dir, 'cache.sqlite'))
+        report = warm_up(self.stijl, output=output, cache=cache)
+        self.assertEqual({}, report.failed)
+        self.assertTrue(self.stijl.snapshot)
+        self.assertEqual(TERMS[3], cache.get((self.stijl.url, '3')))
+        cache.close()
+
+        self.stijl.session.requests = []
+        self.assertEqual(
+            'gotiek', self.stijl.get_by_id(4).label().label
+        )
+        self.assertEqual(2, len(self.stijl.get_children_display(2)))
+        self.assertEqual([], self.stijl.session.requests)
+
+        provider = OnroerendErfgoedProvider(
+            {'id': 'STIJL'},
+            base_url=BASE_URL,
+            thesaurus='stijl',
+            snapshot_file=output
+        )
+        provider.session = FakeSession()
+        self.assertEqual([6, 8], provider.expand(6))
+        self.assertIn(
+            3, [c['id'] for c in provider.find({'label': 'romaans'})]
+        )
+        self.assertEqual([], provider.session.requests)
+
+    def test_warm_up_without_prepare(self):
+        output = os.path.join(self.dir, 'stijl.snapshot')
+        report = warm_up(self.stijl, output=output, prepare=False)
+        self.assertEqual({}, report.failed)
+        self.assertTrue(os.path.exists(output))
+        self.assertIsNone(self.stijl.index)
+
+    def test_warm_up_failed(self):
+        output = os.path.join(self.dir, 'stijl.snapshot')
+        self.stijl.session = FailingSession([6])
+        report = warm_up(self.stijl, output=output)
+        self.assertEqual(['6'], list(report.failed))
+        self.assertFalse(os.path.exists(output))
+        self.assertIsNone(self.stijl.index)
+
+
+class WarmUpCommandTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_main(self):
+        thesauri = {
+            'stijl': generate_thesaurus(size=50, seed=1),
+            'typologie': generate_thesaurus(size=30, seed=2)
+        }
+        config = os.path.join(self.dir, 'thesauri.json')
+        with FakeThesaurusServer(thesauri) as server:
+            with open(config, 'w') as f:
+                json.dump(
+                    [{'thesaurus': 'typologie',
+                      'base_url': server.base_url}], f
+                )
+            result = main([
+                'stijl',
+                '--base-url', server.base_url,
+                '--config', config,
+                '--output-dir', os.path.join(self.dir, 'snapshots'),
+                '--workers', '4',
+                '--rate', '1000',
+                '--quiet'
+            ])
+            self.assertEqual(0, result)
+            server.reset()
+            provider = OnroerendErfgoedProvider(
+                {'id': 'TYPOLOGIE'},
+                base_url=server.base_url,
+                thesaurus='typologie',
+                snapshot_file=os.path.join(
+                    self.dir, 'snapshots', 'typologie.snapshot'
+                )
+            )
+            self.assertEqual(
+                len(thesauri['typologie']),
+                len(provider._get_index())
+            )
+            self.assertEqual([], server.requests)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dir, 'snapshots', 'stijl.snapshot')
+        ))
+
+    def test_main_failed(self):
+        with FakeThesaurusServer({}) as server:
+            result = main([
+                'stijl',
+                '--base-url', server.base_url,
+                '--output-dir', self.dir,
+                '--quiet'
+            ])
+        self.assertEqual(1, result)
+        self.assertEqual([], os.listdir(self.dir))
+
+    def test_main_write_failed(self):
+        os.mkdir(os.path.join(self.dir, 'stijl.snapshot'))
+        stderr = sys.stderr
+        sys.stderr = Capture()
+        try:
+            with FakeThesaurusServer(
+                {'stijl': generate_thesaurus(size=10)}
+            ) as server:
+                result = main([
+                    'stijl',
+                    '--base-url', server.base_url,
+                    '--output-dir', self.dir,
+                    '--quiet'
+                ])
+            output = str(sys.stderr)
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(1, result)
+        self.assertIn(os.path.join(self.dir, 'stijl.snapshot'), output)
+        self.assertNotIn('lijst.json', output)